@@ -0,0 +1,268 @@
+"""
+Sentiment Engine Autotuning
+Pick the local model's batch size and torch thread count by measurement.
+
+- calibrate(): times the model on a sample of the real input, first over
+  thread counts (at the configured batch size), then over batch sizes (at the
+  best thread count), recording rows/second and peak memory of each setting
+- TuningStore: the chosen settings per (host, model), in one JSON file
+- AdaptiveBatchSize: at runtime, halves the batch size when a batch is much
+  slower than calibrated (e.g. a run of very long reviews) or grows memory past
+  the budget, and grows it back to the tuned size once batches are fast again
+
+SentimentAnalysis applies saved settings on start-up (SENTIMENT_AUTOTUNE=saved,
+the default) or calibrates on its first large input when none exist
+(SENTIMENT_AUTOTUNE=on).
+
+Usage:
+    python -m Scripts.cli autotune-sentiment --input data/processed/reviews_processed.csv
+"""
+
+import sys
+import os
+import json
+import time
+import random
+import socket
+import threading
+from datetime import datetime, timezone
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, AUTOTUNE_CONFIG
+from Scripts.metrics import metrics, peak_rss_bytes
+
+
+def host_key(model_name):
+    """Settings key: a host with different core counts (e.g. a resized VM) is retuned"""
+    return f"{socket.gethostname()}/{os.cpu_count()}cpu/{model_name}"
+
+
+def current_rss_bytes():
+    """Resident set size now (Linux); falls back to the process peak elsewhere"""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_bytes()
+
+
+class _MemorySampler:
+    """Highest RSS seen while the block runs, sampled from a background thread"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, current_rss_bytes())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = current_rss_bytes()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_bytes())
+
+
+# -----------------------------
+# Persisted settings
+# -----------------------------
+class TuningStore:
+    """{host/model: settings} JSON file"""
+
+    def __init__(self, path=None):
+        self.path = path or DATA_PATHS['autotune']
+
+    def _read(self):
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def get(self, model_name):
+        return self._read().get(host_key(model_name))
+
+    def save(self, model_name, settings):
+        entries = self._read()
+        entries[host_key(model_name)] = settings
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+# -----------------------------
+# Calibration
+# -----------------------------
+def _thread_candidates(cpu_count):
+    """1, 2, 4, ... up to the core count, plus the core count itself"""
+    counts = []
+    n = 1
+    while n < cpu_count:
+        counts.append(n)
+        n *= 2
+    counts.append(cpu_count)
+    return counts
+
+
+def _measure(analyzer, texts, batch_size, num_threads):
+    import torch
+
+    torch.set_num_threads(num_threads)
+    analyzer.model(texts[:batch_size], batch_size=batch_size, truncation=True)  # warm-up
+    with _MemorySampler() as memory:
+        start = time.perf_counter()
+        analyzer.model(texts, batch_size=batch_size, truncation=True)
+        seconds = time.perf_counter() - start
+    result = {
+        'batch_size': batch_size,
+        'num_threads': num_threads,
+        'rows_per_second': len(texts) / seconds,
+        'batch_seconds': seconds * batch_size / len(texts),
+        'peak_rss_mb': memory.peak / 2 ** 20
+    }
+    print(f"  threads={num_threads:<3} batch={batch_size:<4} "
+          f"{result['rows_per_second']:8.1f} rows/s  peak {result['peak_rss_mb']:.0f} MB")
+    return result
+
+
+def _best(results, max_memory_mb, tolerance):
+    """Fastest setting within the memory budget; near-ties go to the smaller batch / fewer threads"""
+    fitting = [r for r in results if not max_memory_mb or r['peak_rss_mb'] <= max_memory_mb] or results
+    top = max(r['rows_per_second'] for r in fitting)
+    close = [r for r in fitting if r['rows_per_second'] >= top * (1 - tolerance)]
+    return min(close, key=lambda r: (r['batch_size'], r['num_threads']))
+
+
+def calibrate(analyzer, texts, sample_size=None, batch_sizes=None, thread_counts=None,
+              max_memory_mb=None, seed=0):
+    """
+    Measure throughput of a local SentimentAnalysis on a sample of texts.
+
+    Args:
+        analyzer: SentimentAnalysis with a local model.
+        texts: the real input; a random sample keeps its length distribution.
+        sample_size (int): texts scored per setting.
+        batch_sizes, thread_counts: candidates (defaults from AUTOTUNE_CONFIG / core count).
+        max_memory_mb (float): settings peaking above this are not chosen.
+
+    Returns:
+        Settings dict: batch_size, num_threads, rows_per_second, batch_seconds,
+        peak_rss_mb, plus the measurements and when/where they were taken.
+    """
+    import torch
+
+    if analyzer.model is None:
+        raise ValueError("Autotuning needs a local model (server_url=False)")
+
+    sample_size = sample_size or AUTOTUNE_CONFIG['sample_size']
+    batch_sizes = sorted(batch_sizes or AUTOTUNE_CONFIG['batch_sizes'])
+    thread_counts = thread_counts or _thread_candidates(os.cpu_count() or 1)
+    max_memory_mb = AUTOTUNE_CONFIG['max_memory_mb'] if max_memory_mb is None else max_memory_mb
+    tolerance = AUTOTUNE_CONFIG['tolerance']
+
+    texts = [str(text)[:analyzer.max_chars] for text in texts]
+    sample = random.Random(seed).sample(texts, min(sample_size, len(texts)))
+    original_threads = torch.get_num_threads()
+
+    print(f"Autotuning sentiment model on {len(sample)} reviews...")
+    results = []
+    with metrics.timer("autotune_sentiment") as t:
+        try:
+            # Coordinate search: threads at the configured batch size, then batch sizes
+            start_batch = min(batch_sizes, key=lambda b: abs(b - analyzer.batch_size))
+            by_threads = [_measure(analyzer, sample, start_batch, n) for n in thread_counts]
+            results.extend(by_threads)
+            num_threads = _best(by_threads, max_memory_mb, tolerance)['num_threads']
+
+            by_batch = []
+            for batch_size in batch_sizes:
+                result = _measure(analyzer, sample, batch_size, num_threads)
+                by_batch.append(result)
+                if max_memory_mb and result['peak_rss_mb'] > max_memory_mb:
+                    break  # larger batches only use more
+                best_so_far = max(r['rows_per_second'] for r in by_batch)
+                if result['rows_per_second'] < best_so_far * (1 - tolerance):
+                    break  # past the peak
+            results.extend(by_batch)
+        finally:
+            torch.set_num_threads(original_threads)
+        t.rows_in = len(sample) * len(results)
+
+    settings = dict(_best(by_batch, max_memory_mb, tolerance))
+    settings.update({
+        'model': analyzer.model_name,
+        'host': socket.gethostname(),
+        'cpu_count': os.cpu_count(),
+        'tuned_at': datetime.now(timezone.utc).isoformat(),
+        'measurements': results
+    })
+    print(f"✅ Best: batch size {settings['batch_size']}, {settings['num_threads']} threads "
+          f"({settings['rows_per_second']:.1f} rows/s)")
+    return settings
+
+
+# -----------------------------
+# Runtime adjustment
+# -----------------------------
+class AdaptiveBatchSize:
+    """Shrinks the batch size on slow or memory-heavy batches, regrows it when they pass"""
+
+    def __init__(self, batch_size, batch_seconds, max_memory_mb=None, slow_factor=None, min_batch_size=1):
+        """
+        Args:
+            batch_size (int): tuned batch size; never exceeded.
+            batch_seconds (float): calibrated seconds per batch of that size (the latency target).
+            max_memory_mb (float): RSS above this halves the batch size while it is still rising.
+            slow_factor (float): a batch taking this many times the target halves the batch size.
+        """
+        self.max_batch_size = batch_size
+        self.batch_size = batch_size
+        self.target_seconds = batch_seconds
+        self.max_memory_mb = max_memory_mb
+        self.slow_factor = slow_factor or AUTOTUNE_CONFIG['slow_factor']
+        self.min_batch_size = min_batch_size
+        self._fast_batches = 0
+        self._memory_mb = current_rss_bytes() / 2 ** 20
+
+    def record(self, rows, seconds):
+        """Update the batch size after scoring `rows` texts in `seconds`; returns the new size"""
+        if not rows:
+            return self.batch_size
+        # Time a full batch would have taken (the last batch of an input is often short)
+        full_batch_seconds = seconds * self.batch_size / rows
+        memory_mb = current_rss_bytes() / 2 ** 20
+        # Freed memory is rarely returned to the OS, so RSS stays high after a spike;
+        # only a batch that grew it further over the budget is too large
+        memory_growing = memory_mb > self._memory_mb
+        self._memory_mb = memory_mb
+        previous = self.batch_size
+
+        if (full_batch_seconds > self.slow_factor * self.target_seconds
+                or (self.max_memory_mb and memory_mb > self.max_memory_mb and memory_growing)):
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+            self._fast_batches = 0
+        elif full_batch_seconds < 0.6 * self.target_seconds:
+            # Doubling keeps such batches near the target; wait for a few in a row so
+            # a mixed stream of long and short reviews does not oscillate
+            self._fast_batches += 1
+            if self._fast_batches >= 3 and self.batch_size < self.max_batch_size:
+                self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+                self._fast_batches = 0
+        else:
+            self._fast_batches = 0
+
+        if self.batch_size != previous:
+            direction = "down" if self.batch_size < previous else "up"
+            metrics.inc("batch_size_adjustments_total", direction=direction)
+            metrics.set_gauge("sentiment_batch_size", self.batch_size)
+        return self.batch_size
@@ -0,0 +1,220 @@
+"""
+In-Database Sentiment / Theme Backfill
+Enrich unscored rows of the `reviews` table in place.
+
+- reads rows WHERE sentiment_label IS NULL in review_id order, one chunk per
+  query (keyset on review_id within that set, via the partial index
+  reviews_unscored_idx)
+- scores each chunk in batches with SentimentAnalysis (or CascadeSentiment)
+- assigns themes with TopicModeling's keyword themes
+- writes each chunk back set-based: COPY into a temp table, then UPDATE ... FROM
+
+The unscored set itself is the resume point: every run starts from the lowest
+unscored review_id, so an interrupted run, a review committed after higher ids
+were scored, or a chunk that failed to score is picked up by the next run. A
+chunk whose scoring fails (e.g. the scoring server is down) is not written and
+stops the run. The checkpoint file only keeps progress counts.
+
+Usage:
+    python -m Scripts.cli backfill --chunk-size 1000
+"""
+
+import sys
+import os
+import io
+import csv
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, BACKFILL_CONFIG
+from config.db_config import get_connection
+from Scripts.metrics import metrics
+from Scripts.token_corpus import TokenCorpus
+from Scripts.query_cache import bump_table_version
+
+
+class SentimentBackfill:
+    """Chunked, resumable backfill of sentiment_label, sentiment_score, theme and theme_mask"""
+
+    def __init__(self, chunk_size=None, checkpoint_path=None, analyzer=None, topic_model=None,
+                 theme_registry=None):
+        """
+        Args:
+            chunk_size (int): rows fetched, scored and written per round trip.
+            checkpoint_path (str): JSON file recording progress.
+            analyzer: object with analyze_batch(texts) (default SentimentAnalysis()).
+            topic_model: TopicModeling instance providing theme_keywords.
+            theme_registry: theme bits of theme_mask (default the shared DatabaseThemeRegistry).
+        """
+        self.chunk_size = chunk_size or BACKFILL_CONFIG['chunk_size']
+        self.checkpoint_path = checkpoint_path or DATA_PATHS['backfill_checkpoint']
+        self._analyzer = analyzer
+        self._topic_model = topic_model
+        self._theme_registry = theme_registry
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            from Scripts.sentiment_analysis import SentimentAnalysis
+            self._analyzer = SentimentAnalysis()
+        return self._analyzer
+
+    @property
+    def topic_model(self):
+        if self._topic_model is None:
+            from Scripts.topic_modeling import TopicModeling
+            self._topic_model = TopicModeling()
+        return self._topic_model
+
+    @property
+    def theme_registry(self):
+        if self._theme_registry is None:
+            from Scripts.theme_bits import DatabaseThemeRegistry
+            self._theme_registry = DatabaseThemeRegistry.load()
+        return self._theme_registry
+
+    # -----------------------------
+    # Checkpoints
+    # -----------------------------
+    def load_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {'last_review_id': 0, 'rows_updated': 0}
+
+    def save_checkpoint(self, checkpoint):
+        os.makedirs(os.path.dirname(self.checkpoint_path) or ".", exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def reset_checkpoint(self):
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    def enrich(self, rows):
+        """
+        Score and theme one chunk of (review_id, review_text) rows.
+
+        Raises RuntimeError if any row fails to score; nothing of the chunk is
+        written then, so it stays unscored for the next run.
+        """
+        texts = [text or "" for _, text in rows]
+        sentiments = self.analyzer.analyze_batch(texts)
+
+        themes = list(self.topic_model.theme_keywords) + ["Other"]
+        masks = [self.theme_registry.mask_of([theme]) for theme in themes]
+        corpus = TokenCorpus.build(texts, stop_words=self.topic_model.stop_words)
+        matches = corpus.match_phrases(list(self.topic_model.theme_keywords.values()))
+
+        failed = sum(label == "ERROR" for label, _ in sentiments)
+        if failed:
+            raise RuntimeError(f"Scoring failed for {failed}/{len(rows)} reviews from review_id {rows[0][0]}; "
+                               f"stopping the backfill (they stay unscored for the next run)")
+        return [(review_id, label, round(float(score), 2), themes[match], masks[match])
+                for (review_id, _), (label, score), match in zip(rows, sentiments, matches)]
+
+    @staticmethod
+    def write_results(cur, results):
+        """COPY results into the temp table and apply them with one UPDATE"""
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(results)
+        buffer.seek(0)
+        cur.copy_expert(
+            "COPY backfill_results (review_id, sentiment_label, sentiment_score, theme, theme_mask) "
+            "FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+        cur.execute("""
+            UPDATE reviews r
+            SET sentiment_label = s.sentiment_label,
+                sentiment_score = s.sentiment_score,
+                theme = s.theme,
+                theme_mask = s.theme_mask
+            FROM backfill_results s
+            WHERE r.review_id = s.review_id
+              AND r.sentiment_label IS NULL
+        """)
+        return cur.rowcount
+
+    # -----------------------------
+    # Main loop
+    # -----------------------------
+    def fetch_unscored(self, cur, after):
+        """Next chunk of unscored (review_id, review_text) rows with review_id > after"""
+        cur.execute("""
+            SELECT review_id, review_text
+            FROM reviews
+            WHERE sentiment_label IS NULL AND review_id > %s
+            ORDER BY review_id
+            LIMIT %s
+        """, (after, self.chunk_size))
+        return cur.fetchall()
+
+    def run(self, limit=None):
+        """
+        Backfill unscored reviews.
+
+        Args:
+            limit (int): stop after roughly this many rows (whole chunks).
+
+        Returns:
+            Number of rows updated in this run.
+        """
+        checkpoint = self.load_checkpoint()
+        print(f"Backfilling unscored reviews ({checkpoint['rows_updated']} updated since the checkpoint was created)")
+
+        conn = get_connection()
+        updated = 0
+        seen = 0
+        after = 0
+
+        try:
+            cur = conn.cursor()
+            cur.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS backfill_results (
+                    review_id INT PRIMARY KEY,
+                    sentiment_label VARCHAR(20),
+                    sentiment_score NUMERIC(3,2),
+                    theme VARCHAR(50),
+                    theme_mask BIGINT
+                ) ON COMMIT DELETE ROWS
+            """)
+            conn.commit()
+
+            while True:
+                # A fresh query per chunk: each one sees rows committed since the last
+                rows = self.fetch_unscored(cur, after)
+                conn.commit()
+                if not rows:
+                    break
+
+                with metrics.timer("backfill_chunk") as t:
+                    results = self.enrich(rows)
+                    chunk_updated = self.write_results(cur, results)
+                    conn.commit()
+                    bump_table_version("reviews", conn=conn)
+                    t.rows_in = len(rows)
+                    t.rows_out = chunk_updated
+
+                updated += chunk_updated
+                seen += len(rows)
+                after = rows[-1][0]
+                checkpoint['last_review_id'] = after
+                checkpoint['rows_updated'] += chunk_updated
+                self.save_checkpoint(checkpoint)
+                print(f"  Updated {chunk_updated}/{len(rows)} rows (up to review_id {after})")
+
+                if limit and seen >= limit:
+                    break
+        finally:
+            conn.close()
+
+        print(f"✅ Backfill updated {updated} reviews in this run "
+              f"({checkpoint['rows_updated']} since the checkpoint was created)")
+        return updated
@@ -0,0 +1,248 @@
+"""
+Cascade Sentiment Scoring
+A cheap first-stage classifier decides obvious reviews; only uncertain ones reach DistilBERT.
+
+First stage (in order of preference):
+- HashedLogisticClassifier: hashed n-gram logistic regression trained offline on the
+  transformer's own labels (see CascadeSentiment.train_first_stage)
+- LexiconScorer: bundled positive/negative word lists with simple negation handling
+
+Reviews whose first-stage confidence is >= `threshold` keep the first-stage label.
+A small random `audit_rate` of those is also sent to the transformer to measure
+the agreement rate between the two stages.
+"""
+
+import sys
+import os
+import math
+import pickle
+import random
+import re
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SENTIMENT_CONFIG, DATA_PATHS
+from Scripts.metrics import metrics
+
+POSITIVE_WORDS = frozenset("""
+good great best excellent amazing awesome nice love loved like fast easy smooth
+perfect helpful wonderful fantastic super simple reliable convenient efficient
+useful thanks thank happy satisfied recommend brilliant cool fine quick secure
+friendly seamless impressive superb outstanding enjoy enjoyed work works working wow
+""".split())
+
+NEGATIVE_WORDS = frozenset("""
+bad worst poor terrible horrible awful slow crash crashes crashed crashing error
+errors bug bugs buggy fail fails failed failure problem problems issue issues
+useless annoying disappointed disappointing hate waste broken stuck freeze
+freezes frozen unable cannot can't doesn't don't won't never difficult hard
+rubbish boring fake scam stopped unreliable unresponsive lag laggy
+""".split())
+
+NEGATIONS = frozenset("not no never isn't wasn't aren't don't doesn't didn't can't cannot won't".split())
+
+TOKEN_PATTERN = re.compile(r"[a-z']+")
+
+
+class LexiconScorer:
+    """Word-count sentiment scorer; returns P(POSITIVE) per text"""
+
+    def __init__(self, scale=2.5, negation_window=3):
+        """
+        Args:
+            scale: how quickly confidence grows with the positive/negative word balance.
+            negation_window: a negation flips the polarity of words up to this many tokens later.
+        """
+        self.scale = scale
+        self.negation_window = negation_window
+
+    def score(self, text):
+        balance = 0
+        negate_until = -1
+        for i, token in enumerate(TOKEN_PATTERN.findall(str(text).lower())):
+            polarity = 0
+            if token in POSITIVE_WORDS:
+                polarity = 1
+            elif token in NEGATIVE_WORDS:
+                polarity = -1
+            if i <= negate_until:
+                polarity = -polarity
+            # Open the negation window after scoring so a negation word never flips itself
+            if token in NEGATIONS:
+                negate_until = i + self.negation_window
+            balance += polarity
+        return 1.0 / (1.0 + math.exp(-self.scale * balance))
+
+    def predict_proba(self, texts):
+        return [self.score(text) for text in texts]
+
+
+class HashedLogisticClassifier:
+    """Hashed n-gram logistic regression; returns P(POSITIVE) per text"""
+
+    def __init__(self, n_features=2 ** 18):
+        from sklearn.feature_extraction.text import HashingVectorizer
+        from sklearn.linear_model import LogisticRegression
+
+        self.vectorizer = HashingVectorizer(
+            ngram_range=(1, 2),
+            n_features=n_features,
+            alternate_sign=False
+        )
+        self.model = LogisticRegression(max_iter=1000)
+
+    def fit(self, texts, labels):
+        """Fit on texts and POSITIVE/NEGATIVE labels (e.g. from the transformer)"""
+        y = [1 if label == "POSITIVE" else 0 for label in labels]
+        self.model.fit(self.vectorizer.transform(texts), y)
+        return self
+
+    def predict_proba(self, texts):
+        positive = list(self.model.classes_).index(1)
+        return self.model.predict_proba(self.vectorizer.transform(texts))[:, positive].tolist()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(self, f)
+
+    @staticmethod
+    def load(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+
+class CascadeSentiment:
+    """Two-stage sentiment scorer with routing and agreement statistics"""
+
+    def __init__(self, threshold=None, audit_rate=None, first_stage=None, analyzer=None, seed=42):
+        """
+        Args:
+            threshold: first-stage confidence needed to skip the transformer (0.5-1.0).
+            audit_rate: fraction of confident reviews also scored by the transformer
+                to estimate the agreement rate.
+            first_stage: object with predict_proba(texts); defaults to the trained
+                classifier at DATA_PATHS['cascade_model'] if present, else LexiconScorer.
+            analyzer: SentimentAnalysis instance; created on first uncertain review.
+        """
+        self.threshold = threshold if threshold is not None else SENTIMENT_CONFIG['cascade_threshold']
+        self.audit_rate = audit_rate if audit_rate is not None else SENTIMENT_CONFIG['cascade_audit_rate']
+        self.first_stage = first_stage or self._default_first_stage()
+        self._analyzer = analyzer
+        self._random = random.Random(seed)
+        self.stats = {
+            'total': 0,
+            'first_stage': 0,
+            'transformer': 0,
+            'audited': 0,
+            'agreements': 0
+        }
+
+    @staticmethod
+    def _default_first_stage():
+        path = DATA_PATHS['cascade_model']
+        if os.path.exists(path):
+            print(f"Loading first-stage classifier from {path}")
+            return HashedLogisticClassifier.load(path)
+        return LexiconScorer()
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            from Scripts.sentiment_analysis import SentimentAnalysis
+            self._analyzer = SentimentAnalysis()
+        return self._analyzer
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
+    def analyze(self, text):
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts):
+        """
+        Score texts through the cascade.
+
+        Returns:
+            List of (label, score) tuples in input order, like SentimentAnalysis.analyze_batch.
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
+        to_transformer = []
+        audited = []
+
+        with metrics.timer("cascade_first_stage") as t:
+            probabilities = self.first_stage.predict_proba(texts)
+            for i, p_positive in enumerate(probabilities):
+                confidence = max(p_positive, 1.0 - p_positive)
+                if confidence >= self.threshold:
+                    results[i] = ("POSITIVE" if p_positive >= 0.5 else "NEGATIVE", confidence)
+                    if self._random.random() < self.audit_rate:
+                        audited.append(i)
+                else:
+                    to_transformer.append(i)
+            t.rows_in = len(texts)
+            t.rows_out = len(texts) - len(to_transformer)
+
+        if to_transformer or audited:
+            indices = to_transformer + audited
+            scored = self.analyzer.analyze_batch([texts[i] for i in indices])
+            for i, result in zip(to_transformer, scored):
+                results[i] = result
+            for i, (label, _) in zip(audited, scored[len(to_transformer):]):
+                if label == results[i][0]:
+                    self.stats['agreements'] += 1
+
+        self.stats['total'] += len(texts)
+        self.stats['first_stage'] += len(texts) - len(to_transformer)
+        self.stats['transformer'] += len(to_transformer)
+        self.stats['audited'] += len(audited)
+        metrics.inc("cascade_rows_total", len(texts) - len(to_transformer), stage="first_stage")
+        metrics.inc("cascade_rows_total", len(to_transformer), stage="transformer")
+        return results
+
+    def report(self):
+        """Fraction routed to each stage and first-stage agreement rate with the transformer"""
+        total = self.stats['total'] or 1
+        audited = self.stats['audited']
+        report = {
+            'total': self.stats['total'],
+            'first_stage_fraction': self.stats['first_stage'] / total,
+            'transformer_fraction': self.stats['transformer'] / total,
+            'audited': audited,
+            'agreement_rate': self.stats['agreements'] / audited if audited else None
+        }
+        metrics.set_gauge("cascade_transformer_fraction", report['transformer_fraction'])
+        if report['agreement_rate'] is not None:
+            metrics.set_gauge("cascade_agreement_rate", report['agreement_rate'])
+        return report
+
+    # -----------------------------
+    # Offline training
+    # -----------------------------
+    def train_first_stage(self, texts, save_path=None):
+        """
+        Label `texts` with the transformer and fit a hashed logistic regression on them.
+
+        Returns:
+            Held-out agreement rate of the new first stage with the transformer.
+        """
+        from sklearn.model_selection import train_test_split
+
+        texts = [str(text) for text in texts]
+        labels = [label for label, _ in self.analyzer.analyze_batch(texts)]
+        pairs = [(text, label) for text, label in zip(texts, labels) if label != "ERROR"]
+        train, test = train_test_split(pairs, test_size=0.2, random_state=42)
+
+        classifier = HashedLogisticClassifier().fit(*zip(*train))
+        predicted = classifier.predict_proba([text for text, _ in test])
+        agreement = sum(
+            ("POSITIVE" if p >= 0.5 else "NEGATIVE") == label
+            for p, (_, label) in zip(predicted, test)
+        ) / max(len(test), 1)
+
+        classifier.save(save_path or DATA_PATHS['cascade_model'])
+        self.first_stage = classifier
+        print(f"✅ First-stage classifier trained on {len(train)} reviews "
+              f"(held-out agreement with transformer: {agreement:.1%})")
+        return agreement
@@ -0,0 +1,208 @@
+"""
+Change-Data Export
+Export reviews inserted or updated since a consumer's last export.
+
+Every row of `reviews` carries `updated_xid`, the id of the transaction that
+last wrote it (models/tables.py). Every consumer (a downstream job, a warehouse
+loader, ...) has a mark `xid_bound` in the `export_watermarks` table: all
+changes by transactions below it have been exported. A run, in one
+REPEATABLE READ transaction:
+
+1. takes the xmin of its snapshot as the upper bound: every transaction with a
+   lower id has finished, so its rows are all visible now and none can commit
+   later (no role or pg_stat_activity access is needed)
+2. streams rows with mark <= updated_xid < bound through a server-side cursor,
+   ordered by the (updated_xid, review_id) index
+3. writes them as Parquet parts partitioned by bank into a staging directory,
+   which is renamed to <output_dir>/<consumer>/batch=NNNNNN when complete
+4. advances the mark to the bound in the same transaction that locked it
+
+A run that fails before step 4 leaves the mark untouched; the retry reuses the
+batch number and replaces that batch directory, so each batch is published
+once. Deleted rows are not exported. Needs PostgreSQL 13+ (xid8) and pyarrow.
+
+Usage:
+    python -m Scripts.cli export-changes --consumer warehouse
+"""
+
+import sys
+import os
+import shutil
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, CHANGE_EXPORT_CONFIG
+from config.db_config import get_connection
+from Scripts.metrics import metrics
+
+CHANGES_QUERY = """
+    SELECT
+        r.review_id,
+        r.bank_id,
+        b.bank_name,
+        r.review_text,
+        r.rating,
+        r.review_date,
+        r.sentiment_label,
+        r.sentiment_score,
+        r.theme,
+        r.theme_mask,
+        r.source,
+        r.updated_at
+    FROM reviews r
+    JOIN banks b ON r.bank_id = b.bank_id
+    WHERE r.updated_xid >= %s::xid8
+      AND r.updated_xid < %s::xid8
+    ORDER BY r.updated_xid, r.review_id
+    """
+
+# Oldest transaction still running when the snapshot was taken: all lower ids have finished
+UPPER_BOUND_QUERY = "SELECT pg_snapshot_xmin(pg_current_snapshot())::text"
+
+
+def _partition_value(value):
+    """Bank name usable as a Hive-style directory value"""
+    return str(value).replace("/", "_")
+
+
+class ChangeExporter:
+    """Incremental, watermark-based Parquet export of the reviews table"""
+
+    def __init__(self, consumer, output_dir=None, chunk_size=None, compression=None):
+        """
+        Args:
+            consumer (str): name the watermark is kept under.
+            output_dir (str): export root (default DATA_PATHS['change_exports']).
+            chunk_size (int): rows per fetch and per Parquet part.
+            compression (str): Parquet codec.
+        """
+        self.consumer = consumer
+        self.output_dir = os.path.join(output_dir or DATA_PATHS['change_exports'], consumer)
+        self.chunk_size = chunk_size or CHANGE_EXPORT_CONFIG['chunk_size']
+        self.compression = compression or CHANGE_EXPORT_CONFIG['compression']
+
+    def watermark(self):
+        """Current (xid_bound, batch) of this consumer; None before its first export"""
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "SELECT xid_bound::text, batch FROM export_watermarks WHERE consumer = %s",
+                (self.consumer,)
+            )
+            return cur.fetchone()
+        finally:
+            conn.close()
+
+    # -----------------------------
+    # Files
+    # -----------------------------
+    def _write_chunk(self, rows, columns, staging_dir, part):
+        import pandas as pd
+
+        df = pd.DataFrame(rows, columns=columns)
+        for bank, group in df.groupby("bank_name", sort=False):
+            bank_dir = os.path.join(staging_dir, f"bank_name={_partition_value(bank)}")
+            os.makedirs(bank_dir, exist_ok=True)
+            group.drop(columns="bank_name").to_parquet(
+                os.path.join(bank_dir, f"part-{part:05d}.parquet"),
+                index=False, compression=self.compression
+            )
+
+    def _publish(self, staging_dir, batch_dir):
+        """Move a complete staging directory into place, replacing a batch left by a failed run"""
+        if os.path.exists(batch_dir):
+            shutil.rmtree(batch_dir)
+        os.replace(staging_dir, batch_dir)
+
+    # -----------------------------
+    # Export
+    # -----------------------------
+    def export(self):
+        """
+        Export every change since the watermark as one batch.
+
+        Returns:
+            (number of rows exported, batch directory or None if nothing changed)
+        """
+        conn = get_connection()
+        staging_dir = None
+        try:
+            cur = conn.cursor()
+            cur.execute(
+                "INSERT INTO export_watermarks (consumer) VALUES (%s) ON CONFLICT (consumer) DO NOTHING",
+                (self.consumer,)
+            )
+            conn.commit()
+
+            conn.set_session(isolation_level="REPEATABLE READ")
+            # First statement: the snapshot (and its xmin) used by every query of this run
+            cur.execute(UPPER_BOUND_QUERY)
+            upper_bound = cur.fetchone()[0]
+            # Row lock: a concurrent export for the same consumer waits here (and then fails
+            # with a serialization error, leaving the mark to the first one)
+            cur.execute(
+                "SELECT xid_bound::text, batch, rows_exported FROM export_watermarks "
+                "WHERE consumer = %s FOR UPDATE",
+                (self.consumer,)
+            )
+            lower_bound, batch, rows_exported = cur.fetchone()
+            batch += 1
+            print(f"Exporting changes for '{self.consumer}' by transactions {lower_bound} to {upper_bound}")
+
+            os.makedirs(self.output_dir, exist_ok=True)
+            batch_dir = os.path.join(self.output_dir, f"batch={batch:06d}")
+            staging_dir = os.path.join(self.output_dir, f"_staging-{batch:06d}-{time.time_ns()}")
+
+            exported = 0
+            with metrics.timer("export_changes", consumer=self.consumer) as t:
+                read_cur = conn.cursor(name=f"export_changes_{os.getpid()}")
+                read_cur.itersize = self.chunk_size
+                read_cur.execute(CHANGES_QUERY, (lower_bound, upper_bound))
+                columns = None
+                part = 0
+                while True:
+                    rows = read_cur.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    if columns is None:
+                        columns = [column[0] for column in read_cur.description]
+                    self._write_chunk(rows, columns, staging_dir, part)
+                    part += 1
+                    exported += len(rows)
+                read_cur.close()
+                t.rows_out = exported
+
+            if exported:
+                self._publish(staging_dir, batch_dir)
+                staging_dir = None
+            else:
+                batch -= 1  # nothing to publish; the mark still moves past these transactions
+
+            # Files are in place; advancing the mark is the commit point of the export
+            cur.execute("""
+                UPDATE export_watermarks
+                SET xid_bound = %s::xid8, batch = %s,
+                    rows_exported = %s, exported_at = now()
+                WHERE consumer = %s
+            """, (upper_bound, batch, rows_exported + exported, self.consumer))
+            conn.commit()
+            metrics.inc("rows_exported_total", exported, consumer=self.consumer)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            if staging_dir and os.path.exists(staging_dir):
+                shutil.rmtree(staging_dir)
+            conn.close()
+
+        if not exported:
+            print(f"No changes for '{self.consumer}'")
+            return 0, None
+        print(f"✅ Exported {exported} changed reviews to {batch_dir}")
+        return exported, batch_dir
+
+
+def main(consumer, output_dir=None, chunk_size=None):
+    return ChangeExporter(consumer, output_dir, chunk_size).export()
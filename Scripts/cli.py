@@ -0,0 +1,388 @@
+"""
+Command-line entry point for the Bank Reviews pipeline
+
+Each subcommand imports only the modules it needs, so short jobs such as
+loading yesterday's CSV into Postgres never pay the import cost of torch,
+transformers or gensim. The time spent importing is reported against
+CLI_CONFIG['import_budget_seconds'].
+
+Usage:
+    python -m Scripts.cli scrape
+    python -m Scripts.cli scrape --from-archive --workers 8
+    python -m Scripts.cli preprocess
+    python -m Scripts.cli load --banks data/raw/app_info.csv --reviews data/final_reviews_analysis.csv
+    python -m Scripts.cli serve-sentiment --port 8765
+    python -m Scripts.cli top-phrases --bank "Dashen Bank" --start 2025-01-01 --end 2025-01-07
+"""
+
+import time
+
+_CLI_START = time.perf_counter()
+
+import sys
+import os
+import argparse
+import importlib
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import CLI_CONFIG
+from Scripts.metrics import metrics
+
+
+class ImportTimer:
+    """Accumulates the wall time spent importing modules for one command"""
+
+    def __init__(self):
+        self.seconds = time.perf_counter() - _CLI_START  # the CLI's own imports
+        self.modules = {}
+
+    def load(self, name):
+        """Import a module by dotted name and record how long it took"""
+        if name in sys.modules:
+            return sys.modules[name]
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = time.perf_counter() - start
+        self.modules[name] = elapsed
+        self.seconds += elapsed
+        return module
+
+    def report(self, command, budget):
+        """Print the import time against the budget; return True if within it"""
+        metrics.set_gauge("import_seconds", self.seconds, command=command)
+        within = self.seconds <= budget
+        status = "✓" if within else "⚠ OVER BUDGET"
+        print(f"\n⏱ Import time for '{command}': {self.seconds:.3f}s (budget {budget:.3f}s) {status}")
+        for name, seconds in sorted(self.modules.items(), key=lambda item: -item[1]):
+            print(f"  {name}: {seconds:.3f}s")
+        return within
+
+
+# -----------------------------
+# Subcommands
+# -----------------------------
+def cmd_scrape(args, imports):
+    scraper = imports.load("Scripts.scraper")
+    scraper.main(from_archive=args.from_archive, workers=args.workers)
+
+
+def cmd_preprocess(args, imports):
+    preprocessing = imports.load("Scripts.preprocessing")
+    preprocessor = preprocessing.ReviewPreprocessor(args.input, args.output, workers=args.workers)
+    return preprocessor.process()
+
+
+def cmd_load(args, imports):
+    tables = imports.load("models.tables")
+    csv_loader = imports.load("Scripts.csv_loader")
+
+    if args.create_tables:
+        tables.create_tables()
+
+    loader = csv_loader.BankReviewLoader()
+    try:
+        if args.banks:
+            loader.load_banks_csv(args.banks)
+        if args.reviews:
+            loader.load_reviews_csv(args.reviews)
+    finally:
+        loader.close()
+
+
+def cmd_serve_sentiment(args, imports):
+    server = imports.load("Scripts.sentiment_server")
+    imports.report(args.command, CLI_CONFIG['import_budget_seconds'])
+    server.serve(args.host, args.port, args.batch_size, args.max_wait_ms)
+
+
+def cmd_index_keywords(args, imports):
+    pd = imports.load("pandas")
+    keyword_index = imports.load("Scripts.keyword_index")
+    index = keyword_index.KeywordIndex(args.index_dir)
+    indexed = index.update(pd.read_csv(args.input))
+    print(f"Indexed {indexed} reviews into {index.index_dir}")
+
+
+def cmd_top_phrases(args, imports):
+    keyword_index = imports.load("Scripts.keyword_index")
+    index = keyword_index.KeywordIndex(args.index_dir)
+    phrases = index.top_phrases(args.bank, args.start, args.end, args.top_n, args.min_word_length)
+    print(phrases.to_string(index=False))
+
+
+def cmd_train_cascade(args, imports):
+    pd = imports.load("pandas")
+    cascade_sentiment = imports.load("Scripts.cascade_sentiment")
+    texts = pd.read_csv(args.input)['review_text'].dropna()
+    if args.sample and len(texts) > args.sample:
+        texts = texts.sample(args.sample, random_state=42)
+    cascade = cascade_sentiment.CascadeSentiment()
+    cascade.train_first_stage(texts.tolist(), args.output)
+
+
+def cmd_autotune_sentiment(args, imports):
+    pd = imports.load("pandas")
+    sentiment_analysis = imports.load("Scripts.sentiment_analysis")
+    texts = pd.read_csv(args.input)['review_text'].dropna().tolist()
+    analyzer = sentiment_analysis.SentimentAnalysis(server_url=False, autotune='off')
+    analyzer.autotune(texts, save=not args.dry_run)
+
+
+def cmd_enqueue_scrape(args, imports):
+    work_queue = imports.load("Scripts.work_queue")
+    queue = work_queue.WorkQueue(args.backend)
+    created = work_queue.enqueue_scrape_tasks(queue, args.output_dir, args.run_id)
+    print(f"Enqueued {created} scrape tasks")
+    queue.close()
+
+
+def cmd_enqueue_score(args, imports):
+    work_queue = imports.load("Scripts.work_queue")
+    queue = work_queue.WorkQueue(args.backend)
+    created = work_queue.enqueue_scoring_tasks(queue, args.chunk_size)
+    print(f"Enqueued {created} scoring tasks")
+    queue.close()
+
+
+def cmd_worker(args, imports):
+    work_queue = imports.load("Scripts.work_queue")
+    queue = work_queue.WorkQueue(args.backend)
+    kinds = args.kinds.split(",") if args.kinds else None
+    try:
+        work_queue.run_worker(queue, kinds, exit_when_empty=args.exit_when_empty)
+    finally:
+        queue.close()
+
+
+def cmd_queue_status(args, imports):
+    work_queue = imports.load("Scripts.work_queue")
+    queue = work_queue.WorkQueue(args.backend)
+    for (kind, status), count in queue.status_counts().items():
+        print(f"  {kind:<10} {status:<10} {count}")
+    queue.close()
+
+
+def cmd_backfill(args, imports):
+    backfill = imports.load("Scripts.backfill")
+    analyzer = None
+    if args.cascade:
+        analyzer = imports.load("Scripts.cascade_sentiment").CascadeSentiment()
+    job = backfill.SentimentBackfill(args.chunk_size, analyzer=analyzer)
+    if args.reset:
+        job.reset_checkpoint()
+    job.run(args.limit)
+    if args.cascade:
+        print(analyzer.report())
+
+
+def cmd_select_topics(args, imports):
+    pd = imports.load("pandas")
+    topic_modeling = imports.load("Scripts.topic_modeling")
+    df = pd.read_csv(args.input)
+    df = df[df['review_text'].notna()].reset_index(drop=True)
+    model = topic_modeling.TopicModeling()
+    ranking = model.select_num_topics(
+        df, range(args.min, args.max + 1, args.step),
+        workers=args.workers, coherence=args.coherence, output_dir=args.output_dir
+    )
+    print(ranking.to_string(index=False))
+
+
+def cmd_sketch_summary(args, imports):
+    streaming_stats = imports.load("Scripts.streaming_stats")
+    aggregator = streaming_stats.StreamingAggregator.load(args.stream)
+    if args.compact:
+        aggregator.compact()
+    for bank in ([args.bank] if args.bank else aggregator.banks()):
+        print(f"\n{bank}")
+        for key, value in aggregator.summary(bank, args.start, args.end, args.top_n).items():
+            print(f"  {key}: {value}")
+
+
+def cmd_embed_reviews(args, imports):
+    pd = imports.load("pandas")
+    embeddings = imports.load("Scripts.embeddings")
+    search = embeddings.SemanticSearch(args.store_dir)
+    added = search.add_dataframe(pd.read_csv(args.input))
+    print(f"Embedded {added} new reviews ({len(search.store)} in {search.store.store_dir})")
+
+
+def cmd_search_reviews(args, imports):
+    pd = imports.load("pandas")
+    embeddings = imports.load("Scripts.embeddings")
+    results = embeddings.SemanticSearch(args.store_dir).search(args.query, bank=args.bank, k=args.k)
+    if args.reviews:
+        texts = pd.read_csv(args.reviews, usecols=['review_id', 'review_text'])
+        texts['review_id'] = texts['review_id'].astype(str)
+        results = results.merge(texts, on='review_id', how='left')
+    print(results.to_string(index=False))
+
+
+def cmd_classify_themes(args, imports):
+    pd = imports.load("pandas")
+    theme_classifier = imports.load("Scripts.theme_classifier")
+    df = pd.read_csv(args.input)
+    classifier = theme_classifier.EmbeddingThemeClassifier.from_file(args.seeds, store_dir=args.store_dir)
+    df = classifier.assign_themes(df)
+    df['themes'] = df['themes'].str.join(";")
+    df.to_csv(args.output or args.input, index=False)
+    print(df['theme'].value_counts().to_string())
+
+
+def cmd_export_changes(args, imports):
+    cdc_export = imports.load("Scripts.cdc_export")
+    cdc_export.main(args.consumer, output_dir=args.output_dir, chunk_size=args.chunk_size)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Bank reviews pipeline")
+    parser.add_argument("--check-import-budget", action="store_true",
+                        help="exit with status 1 if imports exceed the configured budget")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    scrape = subparsers.add_parser("scrape", help="scrape Play Store reviews for all banks")
+    scrape.add_argument("--from-archive", action="store_true",
+                        help="rebuild the raw CSV from archived pages instead of the network")
+    scrape.add_argument("--workers", type=int, default=None, help="processes for --from-archive")
+    scrape.set_defaults(func=cmd_scrape)
+
+    preprocess = subparsers.add_parser("preprocess", help="clean the raw reviews CSV")
+    preprocess.add_argument("--input", default=None, help="raw reviews CSV")
+    preprocess.add_argument("--output", default=None, help="processed reviews CSV")
+    preprocess.add_argument("--workers", type=int, default=None, help="processes for the per-bank steps")
+    preprocess.set_defaults(func=cmd_preprocess)
+
+    load = subparsers.add_parser("load", help="load bank and review CSVs into Postgres")
+    load.add_argument("--banks", help="app info CSV for the banks table")
+    load.add_argument("--reviews", help="reviews CSV for the reviews table")
+    load.add_argument("--create-tables", action="store_true", help="create tables first")
+    load.set_defaults(func=cmd_load)
+
+    serve = subparsers.add_parser("serve-sentiment", help="run the shared sentiment scoring server")
+    serve.add_argument("--host", default=None)
+    serve.add_argument("--port", type=int, default=None)
+    serve.add_argument("--batch-size", type=int, default=None, help="max texts per model batch")
+    serve.add_argument("--max-wait-ms", type=float, default=None, help="max time to wait for a full batch")
+    serve.set_defaults(func=cmd_serve_sentiment)
+
+    index_keywords = subparsers.add_parser("index-keywords", help="add a reviews CSV to the keyword index")
+    index_keywords.add_argument("--input", required=True, help="reviews CSV with bank_name, review_text, review_date")
+    index_keywords.add_argument("--index-dir", default=None)
+    index_keywords.set_defaults(func=cmd_index_keywords)
+
+    top_phrases = subparsers.add_parser("top-phrases", help="query top phrases from the keyword index")
+    top_phrases.add_argument("--bank", default=None, help="bank name (default: all banks)")
+    top_phrases.add_argument("--start", default=None, help="YYYY-MM-DD, inclusive")
+    top_phrases.add_argument("--end", default=None, help="YYYY-MM-DD, inclusive")
+    top_phrases.add_argument("--top-n", type=int, default=15)
+    top_phrases.add_argument("--min-word-length", type=int, default=2)
+    top_phrases.add_argument("--index-dir", default=None)
+    top_phrases.set_defaults(func=cmd_top_phrases)
+
+    train_cascade = subparsers.add_parser("train-cascade",
+                                          help="train the cascade first stage on transformer labels")
+    train_cascade.add_argument("--input", required=True, help="reviews CSV with review_text")
+    train_cascade.add_argument("--sample", type=int, default=20000, help="max reviews to label")
+    train_cascade.add_argument("--output", default=None, help="where to save the classifier")
+    train_cascade.set_defaults(func=cmd_train_cascade)
+
+    autotune = subparsers.add_parser("autotune-sentiment",
+                                     help="measure and save the best batch size / threads for this host")
+    autotune.add_argument("--input", required=True, help="reviews CSV with review_text (sampled)")
+    autotune.add_argument("--dry-run", action="store_true", help="report the best settings without saving them")
+    autotune.set_defaults(func=cmd_autotune_sentiment)
+
+    enqueue_scrape = subparsers.add_parser("enqueue-scrape", help="queue one scrape task per app")
+    enqueue_scrape.add_argument("--output-dir", default=None, help="where workers write per-bank CSVs")
+    enqueue_scrape.add_argument("--run-id", default=None, help="run identifier (default: today's date)")
+
+    enqueue_score = subparsers.add_parser("enqueue-score", help="queue scoring tasks for unscored reviews")
+    enqueue_score.add_argument("--chunk-size", type=int, default=500, help="review ids per task")
+
+    worker = subparsers.add_parser("worker", help="claim and run queued tasks")
+    worker.add_argument("--kinds", default=None, help="comma separated task kinds (default: all)")
+    worker.add_argument("--exit-when-empty", action="store_true", help="stop once no task is runnable")
+
+    queue_status = subparsers.add_parser("queue-status", help="show task counts by kind and status")
+
+    backfill = subparsers.add_parser("backfill", help="score and theme unscored rows in the reviews table")
+    backfill.add_argument("--chunk-size", type=int, default=None, help="rows per fetch/score/update round")
+    backfill.add_argument("--limit", type=int, default=None, help="stop after about this many rows")
+    backfill.add_argument("--cascade", action="store_true", help="use the cascade sentiment scorer")
+    backfill.add_argument("--reset", action="store_true", help="reset the saved progress counts")
+    backfill.set_defaults(func=cmd_backfill)
+
+    select_topics = subparsers.add_parser("select-topics", help="choose the LDA topic count by coherence")
+    select_topics.add_argument("--input", required=True, help="reviews CSV with a review_text column")
+    select_topics.add_argument("--min", type=int, default=2, help="smallest topic count")
+    select_topics.add_argument("--max", type=int, default=12, help="largest topic count")
+    select_topics.add_argument("--step", type=int, default=1)
+    select_topics.add_argument("--workers", type=int, default=None)
+    select_topics.add_argument("--coherence", choices=["c_v", "u_mass"], default=None)
+    select_topics.add_argument("--output-dir", default=None, help="where the best model is saved")
+    select_topics.set_defaults(func=cmd_select_topics)
+
+    sketch_summary = subparsers.add_parser("sketch-summary", help="per-bank dashboard numbers from the sketches")
+    sketch_summary.add_argument("--stream", default="loaded", help="'scraped' or 'loaded'")
+    sketch_summary.add_argument("--bank", default=None, help="bank name (default: every bank)")
+    sketch_summary.add_argument("--start", default=None, help="first day, YYYY-MM-DD")
+    sketch_summary.add_argument("--end", default=None, help="last day, YYYY-MM-DD")
+    sketch_summary.add_argument("--top-n", type=int, default=10)
+    sketch_summary.add_argument("--compact", action="store_true", help="merge the stream's shards into one")
+    sketch_summary.set_defaults(func=cmd_sketch_summary)
+
+    embed_reviews = subparsers.add_parser("embed-reviews", help="add a reviews CSV to the semantic search index")
+    embed_reviews.add_argument("--input", required=True, help="CSV with review_id, review_text, bank_name")
+    embed_reviews.add_argument("--store-dir", default=None)
+    embed_reviews.set_defaults(func=cmd_embed_reviews)
+
+    search_reviews = subparsers.add_parser("search-reviews", help="find reviews similar to a query")
+    search_reviews.add_argument("query")
+    search_reviews.add_argument("--bank", default=None)
+    search_reviews.add_argument("-k", type=int, default=10)
+    search_reviews.add_argument("--reviews", default=None, help="reviews CSV to show the matching texts")
+    search_reviews.add_argument("--store-dir", default=None)
+    search_reviews.set_defaults(func=cmd_search_reviews)
+
+    classify_themes = subparsers.add_parser("classify-themes", help="assign themes by embedding similarity")
+    classify_themes.add_argument("--input", required=True, help="CSV with review_id, review_text, bank_name")
+    classify_themes.add_argument("--output", default=None, help="output CSV (default: overwrite input)")
+    classify_themes.add_argument("--seeds", default=None, help="theme seeds JSON")
+    classify_themes.add_argument("--store-dir", default=None, help="embedding cache directory")
+    classify_themes.set_defaults(func=cmd_classify_themes)
+
+    export_changes = subparsers.add_parser("export-changes",
+                                           help="export reviews changed since a consumer's watermark to Parquet")
+    export_changes.add_argument("--consumer", required=True, help="name the watermark is kept under")
+    export_changes.add_argument("--output-dir", default=None, help="export root directory")
+    export_changes.add_argument("--chunk-size", type=int, default=None, help="rows per fetch / Parquet part")
+    export_changes.set_defaults(func=cmd_export_changes)
+
+    for queue_parser, func in ((enqueue_scrape, cmd_enqueue_scrape), (enqueue_score, cmd_enqueue_score),
+                               (worker, cmd_worker), (queue_status, cmd_queue_status)):
+        queue_parser.add_argument("--backend", choices=["sqlite", "postgres"], default=None)
+        queue_parser.set_defaults(func=func)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    imports = ImportTimer()
+    start = time.perf_counter()
+    result = args.func(args, imports)
+    print(f"\nCommand '{args.command}' finished in {time.perf_counter() - start:.2f}s")
+
+    within_budget = imports.report(args.command, CLI_CONFIG['import_budget_seconds'])
+    metrics.flush()
+
+    if args.check_import_budget and not within_budget:
+        return 1
+    return 0 if result is not False else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
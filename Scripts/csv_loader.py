@@ -7,14 +7,40 @@ project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.append(project_root)
 
 # Import get_connection from db_config
+from config import SKETCH_CONFIG
 from config.db_config import get_connection
+from Scripts.metrics import metrics
+from Scripts.streaming_stats import StreamingAggregator
+from Scripts.theme_bits import DatabaseThemeRegistry
+from Scripts.query_cache import bump_table_version
+
+
 class BankReviewLoader:
-    def __init__(self):
+    def __init__(self, sketches=None):
+        """
+        Args:
+            sketches: StreamingAggregator updated with every inserted review (default:
+                the 'loaded' stream if SKETCH_CONFIG['enabled']; False disables).
+        """
         self.conn = get_connection()
         self.cur = self.conn.cursor()
+        if sketches is None and SKETCH_CONFIG['enabled']:
+            sketches = StreamingAggregator("loaded")
+        self.sketches = sketches or None
+        # Bits shared through Postgres, so masks agree with every other loader
+        self.theme_registry = DatabaseThemeRegistry.load()
+
+    def theme_mask(self, row):
+        """
+        Mask of a CSV row, encoded from its themes / theme columns. A theme_mask
+        column in the CSV used the local registry of the machine that wrote it,
+        so it is not trusted.
+        """
+        return self.theme_registry.mask_of(row.get("themes") or row.get("theme"))
 
     def load_banks_csv(self, csv_path):
-        with open(csv_path, "r", encoding="utf-8") as f:
+        with metrics.timer("db_load", table="banks") as t, \
+                open(csv_path, "r", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             count = 0
             for row in reader:
@@ -27,11 +53,14 @@ class BankReviewLoader:
                     row["title"]       # mapped to app_name column
                 ))
                 count += 1
-        self.conn.commit()
+            self.conn.commit()
+            bump_table_version("banks", conn=self.conn)
+            t.rows_in = t.rows_out = count
         print(f"Inserted {count} rows into banks table.")
 
     def load_reviews_csv(self, csv_path):
-        with open(csv_path, "r", encoding="utf-8") as f:
+        with metrics.timer("db_load", table="reviews") as t, \
+                open(csv_path, "r", encoding="utf-8") as f:
             reader = csv.DictReader(f)
             count = 0
             skipped = 0
@@ -55,9 +84,9 @@ class BankReviewLoader:
                 self.cur.execute("""
                     INSERT INTO reviews (
                         bank_id, review_text, rating, review_date,
-                        sentiment_label, sentiment_score,theme, source
+                        sentiment_label, sentiment_score, theme, theme_mask, source
                     )
-                    VALUES (%s, %s, %s, %s, %s, %s,%s, %s)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (
                     bank_id,
                     row.get("review_text"),
@@ -66,11 +95,31 @@ class BankReviewLoader:
                     row.get("sentiment_label"),
                     row.get("sentiment_score"),
                     row.get("theme"),
+                    self.theme_mask(row),
                     row.get("source"),
                 ))
                 count += 1
 
-        self.conn.commit()
+                if self.sketches is not None:
+                    self.sketches.add(
+                        row["bank_name"], row.get("review_date"),
+                        review_id=row.get("review_id"),
+                        text=row.get("review_text"),
+                        user=row.get("user_name"),
+                        rating=row.get("rating"),
+                        sentiment_label=row.get("sentiment_label"),
+                        sentiment_score=row.get("sentiment_score"),
+                        theme=row.get("theme")
+                    )
+
+            self.conn.commit()
+            bump_table_version("reviews", conn=self.conn)
+            if self.sketches is not None:
+                self.sketches.flush()  # only count rows that were committed
+            t.rows_in = count + skipped
+            t.rows_out = count
+
+        metrics.inc("db_rows_skipped_total", skipped, table="reviews")
         print(f"Inserted {count} reviews.")
         print(f"Skipped {skipped} reviews due to unknown bank.")
 
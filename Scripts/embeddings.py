@@ -0,0 +1,411 @@
+"""
+Review Embeddings and Semantic Search
+Find reviews by meaning instead of by substring.
+
+- ReviewEmbedder: batch-encodes texts on CPU with a small sentence model
+  (mean-pooled transformer output, L2-normalised)
+- EmbeddingStore: float16 vectors in an append-only, memory-mapped file,
+  row-aligned with review ids, bank names and text hashes; a review whose text
+  changed is embedded again and its newest row supersedes the old one
+- SemanticSearch: incremental adds plus `search(query, bank=None, k=10)` over an
+  HNSW index (hnswlib) or, when hnswlib is not installed, a NumPy brute-force scan
+
+Layout of an embedding directory:
+    vectors.f16   float16, rows x dim
+    ids.txt       review id of each row
+    banks.txt     bank name of each row
+    hashes.txt    hash of the text each row was embedded from
+    meta.json     model, dim, rows, committed text file sizes
+    hnsw.bin      HNSW graph (labels = row numbers)
+
+Usage:
+    python -m Scripts.cli embed-reviews --input data/processed/reviews_final.csv
+    python -m Scripts.cli search-reviews "cannot transfer money to telebirr" --bank "Dashen Bank"
+"""
+
+import sys
+import os
+import json
+import time
+from collections import Counter
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, EMBEDDING_CONFIG
+from Scripts.metrics import metrics
+from Scripts.sketches import hash64
+
+try:
+    import hnswlib
+except ImportError:  # optional: fall back to brute-force search
+    hnswlib = None
+
+
+class ReviewEmbedder:
+    """Sentence embeddings from a local transformer model (CPU)"""
+
+    def __init__(self, model_name=None, batch_size=None, max_length=None):
+        # transformers/torch take seconds to import, so defer them until a model is built
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        self.model_name = model_name or EMBEDDING_CONFIG['model']
+        self.batch_size = batch_size or EMBEDDING_CONFIG['batch_size']
+        self.max_length = max_length or EMBEDDING_CONFIG['max_length']
+
+        print(f"Loading embedding model {self.model_name}...")
+        self.torch = torch
+        self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+        self.model = AutoModel.from_pretrained(self.model_name).eval()
+        self.dim = self.model.config.hidden_size
+
+    def encode(self, texts, batch_size=None):
+        """
+        Embed texts.
+
+        Returns:
+            float32 array (len(texts), dim) of unit-length vectors.
+        """
+        import numpy as np
+
+        texts = ["" if text is None else str(text) for text in texts]
+        batch_size = batch_size or self.batch_size
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for start in range(0, len(texts), batch_size):
+            batch = texts[start:start + batch_size]
+            began = time.perf_counter()
+            encoded = self.tokenizer(batch, padding=True, truncation=True,
+                                     max_length=self.max_length, return_tensors="pt")
+            with self.torch.inference_mode():
+                output = self.model(**encoded).last_hidden_state
+            # Mean pooling over real (non-padding) tokens
+            mask = encoded['attention_mask'].unsqueeze(-1).to(output.dtype)
+            pooled = (output * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+            pooled = self.torch.nn.functional.normalize(pooled, dim=1)
+            vectors[start:start + len(batch)] = pooled.numpy()
+            metrics.observe("model_batch_seconds", time.perf_counter() - began,
+                            model="embedding", batch_size=batch_size)
+
+        metrics.inc("model_rows_total", len(texts), model="embedding")
+        return vectors
+
+
+class EmbeddingStore:
+    """Append-only float16 vectors aligned with review ids and banks"""
+
+    def __init__(self, store_dir=None):
+        self.store_dir = store_dir or DATA_PATHS['embeddings']
+        self.meta_path = os.path.join(self.store_dir, "meta.json")
+        self.vectors_path = os.path.join(self.store_dir, "vectors.f16")
+        self.ids_path = os.path.join(self.store_dir, "ids.txt")
+        self.banks_path = os.path.join(self.store_dir, "banks.txt")
+        self.hashes_path = os.path.join(self.store_dir, "hashes.txt")
+
+        # *_bytes: committed length of the text files (later bytes are from an interrupted append)
+        self.meta = {'model': None, 'dim': None, 'rows': 0, 'ids_bytes': 0, 'banks_bytes': 0, 'hashes_bytes': 0}
+        self.ids = []
+        self.banks = []
+        self.text_hashes = []
+        if os.path.exists(self.meta_path):
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                self.meta = json.load(f)
+            with open(self.ids_path, "rb") as f:
+                self.ids = f.read(self.meta['ids_bytes']).decode("utf-8").splitlines()
+            with open(self.banks_path, "rb") as f:
+                self.banks = f.read(self.meta['banks_bytes']).decode("utf-8").splitlines()
+            if 'hashes_bytes' in self.meta:
+                with open(self.hashes_path, "rb") as f:
+                    self.text_hashes = f.read(self.meta['hashes_bytes']).decode("utf-8").splitlines()
+            else:
+                # Store written before text hashes: its rows are re-embedded when next used
+                self.text_hashes = [""] * len(self.ids)
+        # Newest row of every review; older rows of the same review are superseded
+        self._row_of = {review_id: row for row, review_id in enumerate(self.ids)}
+        self.bank_counts = Counter(self.banks[row] for row in self._row_of.values())
+        self._bank_rows = None
+        self._vectors = None
+
+    def __len__(self):
+        return self.meta['rows']
+
+    def __contains__(self, review_id):
+        return str(review_id) in self._row_of
+
+    def row_of(self, review_id):
+        return self._row_of.get(str(review_id))
+
+    @staticmethod
+    def text_hash(text):
+        return f"{hash64('' if text is None else text):016x}"
+
+    def is_current(self, review_id, text):
+        """True if the review is stored with an embedding of this text"""
+        row = self._row_of.get(str(review_id))
+        return row is not None and self.text_hashes[row] == self.text_hash(text)
+
+    def missing(self, review_ids, texts):
+        """Positions of the reviews not stored, or stored with a different text"""
+        return [i for i, (review_id, text) in enumerate(zip(review_ids, texts))
+                if not self.is_current(review_id, text)]
+
+    def live_count(self, bank=None):
+        """Number of reviews (not rows: superseded rows are not counted)"""
+        return len(self._row_of) if bank is None else self.bank_counts.get(bank, 0)
+
+    def current_rows(self, bank=None):
+        """Rows that are the newest row of their review, optionally of one bank"""
+        import numpy as np
+
+        if self._bank_rows is None:
+            # Per-bank row index, rebuilt only after an append
+            rows = np.array(sorted(self._row_of.values()), dtype=np.int64)
+            banks = np.array([self.banks[row] for row in rows], dtype=object)
+            self._bank_rows = {None: rows}
+            for name in self.bank_counts:
+                self._bank_rows[name] = rows[banks == name]
+        return self._bank_rows.get(bank, np.empty(0, dtype=np.int64))
+
+    @property
+    def vectors(self):
+        """Memory-mapped (rows, dim) float16 array"""
+        import numpy as np
+
+        if not len(self):
+            return np.zeros((0, self.meta['dim'] or 0), dtype=np.float16)
+        if self._vectors is None or len(self._vectors) != len(self):
+            self._vectors = np.memmap(self.vectors_path, dtype=np.float16, mode="r",
+                                      shape=(len(self), self.meta['dim']))
+        return self._vectors
+
+    def append(self, review_ids, banks, vectors, model_name, texts=None):
+        """
+        Append rows; the vector file is written before the metadata that makes them visible.
+        `texts` (the embedded texts) are hashed so later text changes are detected.
+        """
+        import numpy as np
+
+        if self.meta['dim'] is None:
+            self.meta['dim'] = int(vectors.shape[1])
+            self.meta['model'] = model_name
+        elif self.meta['model'] != model_name or self.meta['dim'] != vectors.shape[1]:
+            raise ValueError(f"Store was built with {self.meta['model']} ({self.meta['dim']} dims), "
+                             f"not {model_name}")
+
+        os.makedirs(self.store_dir, exist_ok=True)
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(len(self) * self.meta['dim'] * 2)  # drop rows of an interrupted append
+            f.write(np.ascontiguousarray(vectors, dtype=np.float16).tobytes())
+        text_hashes = [self.text_hash(text) for text in texts] if texts is not None else [""] * len(review_ids)
+        written_hashes = text_hashes
+        if 'hashes_bytes' not in self.meta:
+            # Older store: write the unknown hashes of its rows first to keep the file row-aligned
+            self.meta['hashes_bytes'] = 0
+            written_hashes = self.text_hashes + text_hashes
+        for path, key, values in ((self.ids_path, 'ids_bytes', review_ids),
+                                  (self.banks_path, 'banks_bytes', banks),
+                                  (self.hashes_path, 'hashes_bytes', written_hashes)):
+            data = "".join(f"{value}\n" for value in values).encode("utf-8")
+            with open(path, "ab") as f:
+                f.truncate(self.meta.get(key, 0))
+                f.write(data)
+            self.meta[key] = self.meta.get(key, 0) + len(data)
+
+        start = len(self)
+        self.ids.extend(str(review_id) for review_id in review_ids)
+        self.banks.extend(str(bank) for bank in banks)
+        self.text_hashes.extend(text_hashes)
+        for row in range(start, len(self.ids)):
+            previous = self._row_of.get(self.ids[row])
+            if previous is not None:
+                self.bank_counts[self.banks[previous]] -= 1
+            self._row_of[self.ids[row]] = row
+            self.bank_counts[self.banks[row]] += 1
+        self._bank_rows = None
+        self.meta['rows'] = len(self.ids)
+
+        tmp_path = self.meta_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f)
+        os.replace(tmp_path, self.meta_path)
+        return range(start, len(self))
+
+
+class SemanticSearch:
+    """Incremental nearest-neighbour search over an EmbeddingStore"""
+
+    def __init__(self, store_dir=None, embedder=None):
+        """
+        Args:
+            store_dir (str): embedding directory (default DATA_PATHS['embeddings']).
+            embedder: ReviewEmbedder; created on first use.
+        """
+        self.store = EmbeddingStore(store_dir)
+        self.index_path = os.path.join(self.store.store_dir, "hnsw.bin")
+        self._embedder = embedder
+        self._index = None
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = ReviewEmbedder(self.store.meta['model'])
+        return self._embedder
+
+    # -----------------------------
+    # HNSW index
+    # -----------------------------
+    @property
+    def index(self):
+        """hnswlib index covering every stored row, or None without hnswlib"""
+        if hnswlib is None or not len(self.store):
+            return None
+        if self._index is None:
+            self._index = hnswlib.Index(space="ip", dim=self.store.meta['dim'])
+            if os.path.exists(self.index_path):
+                self._index.load_index(self.index_path, max_elements=len(self.store))
+            else:
+                self._index.init_index(max_elements=len(self.store),
+                                       ef_construction=EMBEDDING_CONFIG['hnsw_ef_construction'],
+                                       M=EMBEDDING_CONFIG['hnsw_m'])
+            self._sync_index()
+        return self._index
+
+    def _sync_index(self):
+        """Add rows the index has not seen yet (e.g. after an interrupted run)"""
+        indexed = self._index.get_current_count()
+        if indexed >= len(self.store):
+            return
+        import numpy as np
+
+        if self._index.get_max_elements() < len(self.store):
+            self._index.resize_index(max(len(self.store), 2 * self._index.get_max_elements()))
+        rows = np.arange(indexed, len(self.store))
+        self._index.add_items(np.asarray(self.store.vectors[indexed:], dtype=np.float32), rows)
+        for row in self._superseded_since(indexed):
+            self._index.mark_deleted(row)
+        self._index.save_index(self.index_path)
+
+    def _superseded_since(self, indexed):
+        """
+        Rows superseded by rows from `indexed` on: the row that was current when the
+        index was last synced, and new rows that are not the newest of their review
+        """
+        ids = self.store.ids
+        new_ids = set(ids[indexed:])
+        latest = {}
+        superseded = []
+        for row, review_id in enumerate(ids):
+            if review_id not in new_ids:
+                continue
+            previous = latest.get(review_id)
+            if previous is not None and (row >= indexed or previous >= indexed):
+                superseded.append(previous)
+            latest[review_id] = row
+        return superseded
+
+    # -----------------------------
+    # Adding reviews
+    # -----------------------------
+    def add(self, review_ids, texts, banks):
+        """Embed and index reviews not stored yet (or whose text changed); returns the number added"""
+        new = {
+            str(review_ids[i]): (texts[i], banks[i])
+            for i in self.store.missing(review_ids, texts)
+        }
+        if not new:
+            return 0
+
+        with metrics.timer("embed_reviews") as t:
+            new_ids = list(new)
+            new_texts, new_banks = zip(*new.values())
+            vectors = self.embedder.encode(new_texts)
+            self.store.append(new_ids, new_banks, vectors, self.embedder.model_name, new_texts)
+            if self._index is not None:
+                self._sync_index()
+            t.rows_in = len(review_ids)
+            t.rows_out = len(new)
+        return len(new)
+
+    def add_dataframe(self, df, id_col='review_id', text_col='review_text', bank_col='bank_name'):
+        df = df[df[text_col].notna()]
+        return self.add(df[id_col].tolist(), df[text_col].tolist(), df[bank_col].tolist())
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def _brute_force(self, query, rows, k):
+        import numpy as np
+
+        vectors = self.store.vectors
+        chunk = EMBEDDING_CONFIG['scan_chunk_rows']
+        best_rows, best_scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        for start in range(0, len(rows), chunk):
+            block = rows[start:start + chunk]
+            scores = np.asarray(vectors[block], dtype=np.float32) @ query
+            best_rows = np.concatenate([best_rows, block])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_rows) > k:
+                keep = np.argpartition(-best_scores, k)[:k]
+                best_rows, best_scores = best_rows[keep], best_scores[keep]
+        order = np.argsort(-best_scores)
+        return best_rows[order], best_scores[order]
+
+    def _knn(self, index, query, bank, k):
+        """
+        HNSW query restricted to a bank. A selective filter can leave fewer than k
+        results reachable from the entry points, which hnswlib reports as a
+        RuntimeError; retry with a wider search, then scan the bank's rows exactly.
+        """
+        import numpy as np
+
+        bank_filter = None
+        if bank is not None:
+            banks = self.store.banks
+            bank_filter = lambda row: banks[row] == bank  # noqa: E731
+        ef = max(EMBEDDING_CONFIG['hnsw_ef'], k)
+        for attempt_ef in (ef, 4 * ef):
+            index.set_ef(attempt_ef)
+            try:
+                labels, distances = index.knn_query(query, k=k, filter=bank_filter)
+                return labels[0].astype(np.int64), 1.0 - distances[0]
+            except RuntimeError:
+                metrics.inc("semantic_search_retries_total", bank=bank)
+        return self._brute_force(query, self.store.current_rows(bank), k)
+
+    def search(self, query, bank=None, k=10):
+        """
+        Most similar stored reviews to a free-text query.
+
+        Args:
+            query (str): text to search for.
+            bank (str): restrict results to one bank.
+            k (int): number of results.
+
+        Returns:
+            DataFrame with review_id, bank_name and score (cosine similarity), best first.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if not len(self.store):
+            return pd.DataFrame(columns=['review_id', 'bank_name', 'score'])
+
+        with metrics.timer("semantic_search") as t:
+            query_vector = self.embedder.encode([query])[0]
+            index = self.index
+            if index is not None:
+                rows = np.empty(0, dtype=np.int64)
+                scores = np.empty(0, dtype=np.float32)
+                available = self.store.live_count(bank)
+                if available:
+                    rows, scores = self._knn(index, query_vector, bank, min(k, available))
+            else:
+                rows, scores = self._brute_force(query_vector, self.store.current_rows(bank), k)
+            t.rows_in = len(self.store)
+            t.rows_out = len(rows)
+
+        return pd.DataFrame({
+            'review_id': [self.store.ids[row] for row in rows],
+            'bank_name': [self.store.banks[row] for row in rows],
+            'score': scores
+        })
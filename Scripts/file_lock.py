@@ -0,0 +1,35 @@
+"""
+Cross-Process File Lock
+Serialise read-modify-write updates of the small JSON state files
+(table versions, theme registry) between processes on one machine.
+
+    with file_lock(path):
+        state = read(path)
+        ...
+        write(path, state)
+
+The lock is an flock on `<path>.lock`; where fcntl is unavailable (Windows)
+the block runs unlocked.
+"""
+
+import os
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock on `path`.lock for the duration of the block"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path + ".lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
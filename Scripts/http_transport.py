@@ -0,0 +1,275 @@
+"""
+Pooled HTTP Transport for the Play Store scraper
+
+google_play_scraper opens a fresh urllib connection (and TLS handshake) for
+every request. HttpTransport replaces its `get`/`post` while installed:
+- keep-alive connection pool per host (http.client)
+- redirects followed the way urllib follows them
+- gzip-compressed responses
+- on-disk cache for app-info GETs (200 responses only) with a TTL and
+  ETag / If-Modified-Since revalidation
+- per-request latency and byte counts recorded in metrics
+- `base_url` rewrites https://play.google.com to another origin, so a local
+  fake server can stand in for the Play Store
+"""
+
+import sys
+import os
+import json
+import gzip
+import time
+import queue
+import hashlib
+import importlib
+import http.client
+from contextlib import contextmanager
+from urllib.parse import urlsplit, urljoin
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import HTTP_CONFIG
+from Scripts.metrics import metrics
+
+PLAY_STORE_BASE_URL = "https://play.google.com"
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+MAX_REDIRECTS = 10  # same limit as urllib's HTTPRedirectHandler
+
+
+class ResponseCache:
+    """On-disk cache of GET responses keyed by URL"""
+
+    def __init__(self, cache_dir, ttl):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        base = os.path.join(self.cache_dir, key[:2], key)
+        return base + ".json", base + ".body"
+
+    def get(self, url):
+        """Return (meta, body) or (None, None)"""
+        meta_path, body_path = self._paths(url)
+        if not (os.path.exists(meta_path) and os.path.exists(body_path)):
+            return None, None
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        with open(body_path, "r", encoding="utf-8") as f:
+            return meta, f.read()
+
+    def is_fresh(self, meta):
+        return time.time() - meta['fetched_at'] < self.ttl
+
+    def put(self, url, body, etag=None, last_modified=None):
+        meta_path, body_path = self._paths(url)
+        os.makedirs(os.path.dirname(meta_path), exist_ok=True)
+        with open(body_path + ".tmp", "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(body_path + ".tmp", body_path)
+        self.touch(url, etag, last_modified)
+
+    def touch(self, url, etag=None, last_modified=None):
+        """Mark a cached entry as freshly validated"""
+        meta_path, _ = self._paths(url)
+        meta = {'url': url, 'etag': etag, 'last_modified': last_modified, 'fetched_at': time.time()}
+        with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        os.replace(meta_path + ".tmp", meta_path)
+
+
+class HttpTransport:
+    """Keep-alive, gzip-aware HTTP client that google_play_scraper can be pointed at"""
+
+    def __init__(self, base_url=None, timeout=None, pool_size=None, cache_dir=None, cache_ttl=None):
+        """
+        Args:
+            base_url: origin replacing https://play.google.com (e.g. http://127.0.0.1:9000).
+            timeout: socket timeout in seconds.
+            pool_size: idle connections kept per host.
+            cache_dir: directory for cached app-info responses (None disables caching).
+            cache_ttl: seconds a cached response is served without revalidation.
+        """
+        self.base_url = (base_url or HTTP_CONFIG['base_url'] or "").rstrip("/") or None
+        self.timeout = timeout or HTTP_CONFIG['timeout']
+        self.pool_size = pool_size or HTTP_CONFIG['pool_size']
+        cache_dir = cache_dir if cache_dir is not None else HTTP_CONFIG['cache_dir']
+        self.cache = ResponseCache(cache_dir, cache_ttl or HTTP_CONFIG['app_info_ttl']) if cache_dir else None
+        self._pools = {}
+
+    # -----------------------------
+    # Connection pool
+    # -----------------------------
+    def _rewrite(self, url):
+        if self.base_url and url.startswith(PLAY_STORE_BASE_URL):
+            return self.base_url + url[len(PLAY_STORE_BASE_URL):]
+        return url
+
+    def _pool(self, origin):
+        if origin not in self._pools:
+            self._pools[origin] = queue.LifoQueue(maxsize=self.pool_size)
+        return self._pools[origin]
+
+    def _acquire(self, origin):
+        scheme, host, port = origin
+        try:
+            return self._pool(origin).get_nowait()
+        except queue.Empty:
+            metrics.inc("http_connections_opened_total", host=host)
+            if scheme == "https":
+                return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+            return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    def _release(self, origin, conn):
+        try:
+            self._pool(origin).put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self):
+        for pool in self._pools.values():
+            while not pool.empty():
+                pool.get_nowait().close()
+
+    # -----------------------------
+    # Requests
+    # -----------------------------
+    def request(self, method, url, body=None, headers=None):
+        """
+        Send a request over pooled connections, following redirects like urllib:
+        301/302/303 turn a POST into a body-less GET, 307/308 are only followed
+        for GET/HEAD (otherwise the 3xx status is returned).
+
+        Returns:
+            (status, response headers dict (lower-case keys), decoded text body)
+        """
+        headers = dict(headers or {})
+        for _ in range(MAX_REDIRECTS + 1):
+            status, response_headers, text = self._send(method, url, body, headers)
+            location = response_headers.get("location")
+            if status not in REDIRECT_STATUSES or not location:
+                return status, response_headers, text
+            if status in (307, 308) and method not in ("GET", "HEAD"):
+                return status, response_headers, text
+
+            metrics.inc("http_redirects_total", status=status)
+            url = urljoin(self._rewrite(url), location)
+            if status in (301, 302, 303) and method not in ("GET", "HEAD"):
+                method, body = "GET", None
+                headers = {key: value for key, value in headers.items()
+                           if key.lower() not in ("content-type", "content-length")}
+        raise http.client.HTTPException(f"Too many redirects fetching {url}")
+
+    def _send(self, method, url, body=None, headers=None):
+        """Send one request over a pooled connection (no redirect handling)"""
+        url = self._rewrite(url)
+        parts = urlsplit(url)
+        origin = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        headers = dict(headers or {})
+        headers.setdefault("Accept-Encoding", "gzip")
+        headers.setdefault("Connection", "keep-alive")
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+
+        start = time.perf_counter()
+        for attempt in range(2):
+            conn = self._acquire(origin)
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                raw = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError, OSError):
+                conn.close()
+                if attempt == 1:
+                    raise
+                # A kept-alive connection may have been closed by the server; retry on a new one
+        response_headers = {key.lower(): value for key, value in response.getheaders()}
+        if response.will_close:
+            conn.close()
+        else:
+            self._release(origin, conn)
+
+        text = raw
+        if response_headers.get("content-encoding") == "gzip":
+            text = gzip.decompress(raw)
+        text = text.decode("utf-8")
+
+        metrics.observe("http_request_seconds", time.perf_counter() - start,
+                        buckets=LATENCY_BUCKETS, method=method, host=parts.hostname)
+        metrics.inc("http_response_bytes_total", len(raw), host=parts.hostname)
+        metrics.inc("http_decoded_bytes_total", len(text), host=parts.hostname)
+        return response.status, response_headers, text
+
+    @staticmethod
+    def _raise_for_status(status):
+        from google_play_scraper.exceptions import ExtraHTTPError, NotFoundError
+
+        if status == 404:
+            raise NotFoundError("App not found(404).")
+        if status >= 300:  # includes redirects that were not followed
+            raise ExtraHTTPError(f"App not found. Status code {status} returned.")
+
+    def get(self, url):
+        """Drop-in for google_play_scraper.utils.request.get, with response caching"""
+        meta, cached = self.cache.get(url) if self.cache else (None, None)
+        if meta and self.cache.is_fresh(meta):
+            metrics.cache_hit("http")
+            return cached
+
+        headers = {}
+        if meta:
+            if meta.get('etag'):
+                headers["If-None-Match"] = meta['etag']
+            if meta.get('last_modified'):
+                headers["If-Modified-Since"] = meta['last_modified']
+
+        status, response_headers, text = self.request("GET", url, headers=headers)
+        if status == 304 and meta:
+            metrics.cache_hit("http")
+            self.cache.touch(url, meta.get('etag'), meta.get('last_modified'))
+            return cached
+
+        metrics.cache_hit("http", hit=False)
+        self._raise_for_status(status)
+        if self.cache and status == 200:
+            self.cache.put(url, text, response_headers.get("etag"), response_headers.get("last-modified"))
+        return text
+
+    def post(self, url, data, headers):
+        """Drop-in for google_play_scraper.utils.request.post (same rate-limit retries)"""
+        from google_play_scraper.utils.request import MAX_RETRIES, RATE_LIMIT_DELAY
+
+        last_exception = None
+        rate_exceeded_count = 0
+        for _ in range(MAX_RETRIES):
+            try:
+                status, _, text = self.request("POST", url, body=data, headers=headers)
+                self._raise_for_status(status)
+            except Exception as e:
+                last_exception = e
+                continue
+            if "com.google.play.gateway.proto.PlayGatewayError" in text:
+                rate_exceeded_count += 1
+                last_exception = Exception("com.google.play.gateway.proto.PlayGatewayError")
+                time.sleep(RATE_LIMIT_DELAY * rate_exceeded_count)
+                continue
+            return text
+        raise last_exception
+
+    # -----------------------------
+    # Injection
+    # -----------------------------
+    @contextmanager
+    def install(self):
+        """Route google_play_scraper's app() and reviews() requests through this transport"""
+        app_feature = importlib.import_module("google_play_scraper.features.app")
+        reviews_feature = importlib.import_module("google_play_scraper.features.reviews")
+
+        original_get, original_post = app_feature.get, reviews_feature.post
+        app_feature.get, reviews_feature.post = self.get, self.post
+        try:
+            yield self
+        finally:
+            app_feature.get, reviews_feature.post = original_get, original_post
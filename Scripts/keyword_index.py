@@ -0,0 +1,307 @@
+"""
+Incremental Keyword Index
+Persistent hashed n-gram counts per bank and per day, for fast top-phrase queries.
+
+Everything lives in one SQLite file (<index_dir>/index.db):
+    buckets     (bank, day) -> number of reviews and the bucket's n-gram counts:
+                sorted feature ids with their term counts and document frequencies
+    phrases     feature id -> phrase, looked up only for a query's candidates
+    review_ids  ids of the indexed reviews
+N-grams are hashed into a 63-bit feature space, so buckets can be summed without
+aligning vocabularies and nothing grows with the vocabulary but the phrases
+table (two distinct phrases share an id with probability ~n^2 / 2^64, i.e.
+about once in 10^5 indexes of 10M phrases).
+
+Re-indexing the same or an overlapping CSV only adds the reviews that are new,
+and an update (bucket counts, phrases and review ids together) is one SQLite
+transaction, so an interrupted update leaves nothing behind to double-count.
+
+Adding reviews only touches the buckets they fall into. A query for any bank
+and date range sums the bucket rows and scores them as tf * idf, keeping the
+GENERIC_WORDS filter and `min_word_length` semantics of extract_keywords.
+Because per-document normalisation is not stored, scores approximate (and rank
+very close to) the summed TF-IDF of a full refit.
+"""
+
+import sys
+import os
+import io
+import json
+import sqlite3
+from collections import Counter
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS
+from Scripts.metrics import metrics
+from Scripts.sentiment_analysis import rank_phrases
+from Scripts.sketches import hash64
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS buckets (
+        bank TEXT NOT NULL,
+        day TEXT NOT NULL,
+        reviews INTEGER NOT NULL,
+        counts BLOB NOT NULL,
+        PRIMARY KEY (bank, day)
+    );
+    CREATE TABLE IF NOT EXISTS phrases (feature_id INTEGER PRIMARY KEY, phrase TEXT NOT NULL);
+    CREATE TABLE IF NOT EXISTS review_ids (review_id TEXT PRIMARY KEY);
+"""
+
+
+def day_key(value):
+    """'YYYY-MM-DD' for a date, datetime, pandas Timestamp or date-like string"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    return str(value)[:10]
+
+
+def _pack(ids, term_counts, doc_counts):
+    import numpy as np
+
+    buffer = io.BytesIO()
+    np.savez(buffer, ids=ids, tf=term_counts, df=doc_counts)
+    return buffer.getvalue()
+
+
+def _unpack(blob):
+    import numpy as np
+
+    arrays = np.load(io.BytesIO(blob))
+    return arrays['ids'], arrays['tf'], arrays['df']
+
+
+def _sum_counts(parts):
+    """Sum (ids, term counts, doc frequencies) triples over the same feature space"""
+    import numpy as np
+
+    ids = np.concatenate([part[0] for part in parts])
+    ids, inverse = np.unique(ids, return_inverse=True)
+    term_counts = np.bincount(inverse, np.concatenate([part[1] for part in parts])).astype(np.int64)
+    doc_counts = np.bincount(inverse, np.concatenate([part[2] for part in parts])).astype(np.int64)
+    return ids, term_counts, doc_counts
+
+
+class KeywordIndex:
+    """Hashed n-gram count index partitioned by bank and day"""
+
+    def __init__(self, index_dir=None, ngram_range=(1, 3), max_features=1000):
+        """
+        Args:
+            index_dir (str): directory holding the index (created on first update).
+            ngram_range (tuple): n-gram sizes, same as extract_keywords (fixed when
+                the index is created).
+            max_features (int): candidates kept per query (most frequent first),
+                mirroring TfidfVectorizer(max_features=1000).
+        """
+        self.index_dir = index_dir or DATA_PATHS['keyword_index']
+        self.db_path = os.path.join(self.index_dir, "index.db")
+        self.max_features = max_features
+        self.ngram_range = tuple(ngram_range)
+        self._conn = None
+        self._analyzer = None
+        self._bucket_cache = {}
+
+    # -----------------------------
+    # Helpers
+    # -----------------------------
+    @property
+    def conn(self):
+        if self._conn is None:
+            os.makedirs(self.index_dir, exist_ok=True)
+            # Autocommit; update() manages its own transaction
+            self._conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            self._conn.executescript(SCHEMA)
+            # An existing index keeps the n-gram sizes it was built with
+            self._conn.execute(
+                "INSERT OR IGNORE INTO meta VALUES ('ngram_range', ?)", (json.dumps(self.ngram_range),)
+            )
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @property
+    def analyzer(self):
+        """Same tokenisation and stop words as extract_keywords' TfidfVectorizer"""
+        if self._analyzer is None:
+            from sklearn.feature_extraction.text import CountVectorizer
+
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'ngram_range'").fetchone()
+            self.ngram_range = tuple(json.loads(row[0]))
+            self._analyzer = CountVectorizer(
+                stop_words='english',
+                ngram_range=self.ngram_range
+            ).build_analyzer()
+        return self._analyzer
+
+    @staticmethod
+    def feature_id(phrase):
+        """63-bit hash id of a phrase (fits a SQLite INTEGER)"""
+        return hash64(phrase) >> 1
+
+    def phrases_of(self, feature_ids):
+        """{feature id: phrase} for the given ids"""
+        feature_ids = [int(feature_id) for feature_id in feature_ids]
+        phrases = {}
+        for i in range(0, len(feature_ids), 500):
+            chunk = feature_ids[i:i + 500]
+            phrases.update(self.conn.execute(
+                f"SELECT feature_id, phrase FROM phrases WHERE feature_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            ).fetchall())
+        return phrases
+
+    def _indexed_ids(self, ids):
+        """The subset of `ids` that is already indexed"""
+        self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming (review_id TEXT PRIMARY KEY)")
+        self.conn.execute("DELETE FROM incoming")
+        self.conn.executemany("INSERT OR IGNORE INTO incoming VALUES (?)", ((i,) for i in ids))
+        return {row[0] for row in self.conn.execute(
+            "SELECT review_id FROM incoming JOIN review_ids USING (review_id)"
+        )}
+
+    def _read_bucket(self, bank, day):
+        row = self.conn.execute(
+            "SELECT counts FROM buckets WHERE bank = ? AND day = ?", (bank, day)
+        ).fetchone()
+        return _unpack(row[0]) if row else None
+
+    def _load_bucket(self, bank, day):
+        """Bucket counts for queries, cached per instance"""
+        key = (bank, day)
+        if key not in self._bucket_cache:
+            self._bucket_cache[key] = self._read_bucket(bank, day)
+        return self._bucket_cache[key]
+
+    # -----------------------------
+    # Incremental updates
+    # -----------------------------
+    def update(self, df, bank_col='bank_name', text_col='review_text', date_col='review_date',
+               id_col='review_id'):
+        """
+        Add reviews to the index. Only the (bank, day) buckets they touch are rewritten;
+        reviews already indexed (by id_col) are skipped, so updates are idempotent.
+
+        Returns:
+            Number of reviews indexed.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if id_col not in df:
+            raise ValueError(f"Reviews need an '{id_col}' column to be indexed")
+
+        rows_in = len(df)
+        ids = df[id_col].astype(str)
+        phrases = {}
+        indexed = 0
+
+        # One write transaction: the id check, bucket counts, phrases and ids commit together
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            df = df[~ids.isin(self._indexed_ids(ids.tolist())) & ~ids.duplicated()]
+            days = pd.to_datetime(df[date_col]).dt.date.astype(str)
+            with metrics.timer("keyword_index_update") as t:
+                for (bank, day), group in df.groupby([df[bank_col], days], sort=False, observed=True):
+                    term_counts = Counter()
+                    doc_counts = Counter()
+                    for text in group[text_col].fillna(""):
+                        feature_ids = []
+                        for phrase in self.analyzer(str(text)):
+                            feature_id = self.feature_id(phrase)
+                            phrases[feature_id] = phrase
+                            feature_ids.append(feature_id)
+                        term_counts.update(feature_ids)
+                        doc_counts.update(set(feature_ids))
+
+                    n = len(term_counts)
+                    delta = (
+                        np.fromiter(term_counts.keys(), dtype=np.int64, count=n),
+                        np.fromiter(term_counts.values(), dtype=np.int64, count=n),
+                        np.fromiter((doc_counts[c] for c in term_counts), dtype=np.int64, count=n)
+                    )
+                    current = self._read_bucket(bank, day)  # under the write lock: never stale
+                    bucket = _sum_counts([current, delta] if current is not None else [delta])
+                    self.conn.execute("""
+                        INSERT INTO buckets (bank, day, reviews, counts) VALUES (?, ?, ?, ?)
+                        ON CONFLICT (bank, day) DO UPDATE
+                            SET reviews = reviews + excluded.reviews, counts = excluded.counts
+                    """, (bank, day, len(group), _pack(*bucket)))
+                    self._bucket_cache[(bank, day)] = bucket
+                    indexed += len(group)
+
+                self.conn.executemany("INSERT OR IGNORE INTO phrases VALUES (?, ?)", phrases.items())
+                self.conn.executemany(
+                    "INSERT INTO review_ids VALUES (?)", ((i,) for i in df[id_col].astype(str))
+                )
+                t.rows_in = rows_in
+                t.rows_out = indexed
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            self._bucket_cache = {}
+            raise
+
+        return indexed
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def buckets(self, bank=None, start=None, end=None):
+        """{(bank, day): number of reviews} for a bank and inclusive date range"""
+        query = "SELECT bank, day, reviews FROM buckets WHERE 1 = 1"
+        params = []
+        if bank is not None:
+            query += " AND bank = ?"
+            params.append(bank)
+        if start is not None:
+            query += " AND day >= ?"
+            params.append(day_key(start))
+        if end is not None:
+            query += " AND day <= ?"
+            params.append(day_key(end))
+        return {(b, d): reviews for b, d, reviews in self.conn.execute(query, params)}
+
+    def top_phrases(self, bank=None, start=None, end=None, top_n=15, min_word_length=2):
+        """
+        Top phrases for a bank (None = all banks) between two dates (inclusive).
+
+        Args:
+            start, end: date, datetime or 'YYYY-MM-DD' strings; None leaves the range open.
+
+        Returns:
+            DataFrame with `word` and `tfidf` columns, like extract_keywords.
+        """
+        import numpy as np
+
+        selected = self.buckets(bank, start, end)
+        if not selected:
+            return rank_phrases([], [], top_n, min_word_length)
+
+        candidates, counts, doc_freq = _sum_counts([self._load_bucket(b, d) for b, d in selected])
+        n_docs = sum(selected.values())
+        if len(candidates) > self.max_features:
+            keep = np.argsort(-counts, kind="stable")[:self.max_features]
+            candidates, counts, doc_freq = candidates[keep], counts[keep], doc_freq[keep]
+
+        idf = np.log((1 + n_docs) / (1 + doc_freq)) + 1
+        scores = counts * idf
+        phrases = self.phrases_of(candidates)
+        words = [phrases.get(int(c), "") for c in candidates]
+        return rank_phrases(words, scores, top_n, min_word_length)
+
+    def top_keywords_per_bank(self, start=None, end=None, top_n=15, min_word_length=2):
+        """Dictionary bank -> top phrases, matching extract_keywords' return format"""
+        banks = sorted({bank for bank, _ in self.buckets(start=start, end=end)})
+        return {
+            bank: self.top_phrases(bank, start, end, top_n, min_word_length)
+            for bank in banks
+        }
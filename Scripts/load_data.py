@@ -6,10 +6,9 @@ from config.db_config import get_connection
 project_root = os.path.abspath(os.path.join(os.getcwd(), ".."))
 sys.path.append(project_root)
 
-def load_reviews():
-    conn = get_connection()
+from Scripts.query_cache import QueryCache
 
-    query = """
+REVIEWS_QUERY = """
     SELECT 
         r.review_id,
         r.bank_id,
@@ -21,12 +20,32 @@ def load_reviews():
         r.sentiment_label,
         r.sentiment_score,
         r.source,
-        r.themes   -- if you stored themes
+        r.theme,
+        r.theme_mask   -- bitmask of all themes (see Scripts.theme_bits)
     FROM reviews r
     JOIN banks b ON r.bank_id = b.bank_id
     ORDER BY r.review_id;
     """
 
-    df = pd.read_sql(query, conn)
+
+def _query_reviews():
+    conn = get_connection()
+    df = pd.read_sql(REVIEWS_QUERY, conn)
     conn.close()
     return df
+
+
+def load_reviews(use_cache=True, refresh=False):
+    """
+    All reviews joined with their bank.
+
+    Results are cached locally until `reviews` or `banks` are written, from any
+    node (see Scripts.query_cache); pass use_cache=False to always query Postgres,
+    or refresh=True to re-query and replace the cached result.
+    """
+    if not use_cache:
+        return _query_reviews()
+    return QueryCache().get_or_compute(
+        "load_reviews", {'query': REVIEWS_QUERY}, ["reviews", "banks"],
+        _query_reviews, refresh=refresh
+    )
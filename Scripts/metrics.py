@@ -0,0 +1,319 @@
+"""
+Pipeline Instrumentation
+Lightweight per-stage metrics for the scraper, preprocessing, loaders and models.
+
+- counters, gauges and histograms (rows in/out, rows/sec, cache hit rate,
+  model batch latency, DB rows/sec, peak RSS)
+- stage timers usable as context managers or decorators
+- emission to structured JSON logs and a Prometheus text-format file
+- opt-in cProfile / pyinstrument profiling per stage (PROFILE_STAGES env var)
+
+Everything is controlled from METRICS_CONFIG, so production runs can be
+profiled without editing code.
+"""
+
+import sys
+import os
+import json
+import time
+import atexit
+import functools
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import METRICS_CONFIG
+
+
+# Default histogram buckets (seconds) - covers a single model batch up to a full stage
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def peak_rss_bytes():
+    """Return the peak resident set size of this process in bytes (0 if unknown)"""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class Histogram:
+    """Cumulative histogram with fixed upper bounds (Prometheus semantics)"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+class StageTimer:
+    """
+    Handle returned by MetricsRegistry.timer().
+
+    Set `rows_in` / `rows_out` inside the block; rows/sec is derived on exit.
+    """
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+        self.rows_in = None
+        self.rows_out = None
+        self.start = None
+        self.elapsed = None
+
+
+class MetricsRegistry:
+    """In-process metrics registry shared by every pipeline stage"""
+
+    def __init__(self, config=None):
+        config = config or METRICS_CONFIG
+        self.enabled = config.get('enabled', True)
+        self.json_log = config.get('json_log')
+        self.prometheus_file = config.get('prometheus_file')
+        self.profiler = config.get('profiler', 'cprofile')
+        self.profile_dir = config.get('profile_dir')
+        stages = config.get('profile_stages') or ''
+        self.profile_stages = {s.strip() for s in stages.split(',') if s.strip()}
+
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    # -----------------------------
+    # Primitive metrics
+    # -----------------------------
+    @staticmethod
+    def _key(name, labels):
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        """Increment a counter"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to an absolute value"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.gauges[self._key(name, labels)] = value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        """Record one observation into a histogram"""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram(buckets)
+            self.histograms[key].observe(value)
+
+    def cache_hit(self, cache, hit=True):
+        """Count a cache lookup; hit rate is exported as a gauge"""
+        if not self.enabled:
+            return
+        self.inc("cache_hits_total" if hit else "cache_misses_total", cache=cache)
+        hits = self.counters.get(self._key("cache_hits_total", {'cache': cache}), 0)
+        misses = self.counters.get(self._key("cache_misses_total", {'cache': cache}), 0)
+        self.set_gauge("cache_hit_rate", hits / (hits + misses), cache=cache)
+
+    def cache_hit_rate(self, cache):
+        return self.gauges.get(self._key("cache_hit_rate", {'cache': cache}), 0.0)
+
+    # -----------------------------
+    # Stage timers
+    # -----------------------------
+    @contextmanager
+    def timer(self, stage, **labels):
+        """
+        Time a pipeline stage.
+
+        Usage:
+            with metrics.timer("scrape", bank="CBE") as t:
+                ...
+                t.rows_in, t.rows_out = fetched, kept
+        """
+        handle = StageTimer(stage, labels)
+        with self.profile(stage):
+            handle.start = time.perf_counter()
+            try:
+                yield handle
+            finally:
+                handle.elapsed = time.perf_counter() - handle.start
+                self._finish_stage(handle)
+
+    def timed(self, stage=None, **labels):
+        """Decorator form of timer(); defaults the stage name to the function name"""
+        def decorator(func):
+            name = stage or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish_stage(self, handle):
+        labels = dict(handle.labels, stage=handle.stage)
+        self.observe("stage_seconds", handle.elapsed, **labels)
+        event = {'stage': handle.stage, 'seconds': round(handle.elapsed, 6), **handle.labels}
+
+        if handle.rows_in is not None:
+            self.inc("rows_in_total", handle.rows_in, **labels)
+            event['rows_in'] = handle.rows_in
+        if handle.rows_out is not None:
+            self.inc("rows_out_total", handle.rows_out, **labels)
+            event['rows_out'] = handle.rows_out
+            if handle.elapsed > 0:
+                rate = handle.rows_out / handle.elapsed
+                self.set_gauge("rows_per_second", rate, **labels)
+                event['rows_per_sec'] = round(rate, 2)
+
+        rss = peak_rss_bytes()
+        self.set_gauge("peak_rss_bytes", rss)
+        event['peak_rss_bytes'] = rss
+        self.emit("stage", **event)
+
+    def record_stats(self, stage, stats):
+        """Export a plain stats dict (e.g. ReviewPreprocessor.stats) as gauges"""
+        numeric = {}
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                for sub_key, sub_value in value.items():
+                    if isinstance(sub_value, (int, float)):
+                        self.set_gauge(f"{stage}_{key}", sub_value, column=sub_key)
+                numeric[key] = {k: v for k, v in value.items() if isinstance(v, (int, float))}
+            elif isinstance(value, (int, float)):
+                self.set_gauge(f"{stage}_{key}", value)
+                numeric[key] = value
+        self.emit("stats", stage=stage, stats=numeric)
+
+    # -----------------------------
+    # Profiling hook
+    # -----------------------------
+    def profiling_enabled(self, stage):
+        return 'all' in self.profile_stages or stage in self.profile_stages
+
+    @contextmanager
+    def profile(self, stage):
+        """Profile the block with cProfile or pyinstrument if the stage is opted in"""
+        if not self.profiling_enabled(stage):
+            yield
+            return
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.profile_dir, f"{stage}-{stamp}-{os.getpid()}")
+
+        if self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(base + ".html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+                self.emit("profile", stage=stage, path=base + ".html")
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                profiler.dump_stats(base + ".prof")
+                self.emit("profile", stage=stage, path=base + ".prof")
+
+    # -----------------------------
+    # Emission
+    # -----------------------------
+    def emit(self, event, **fields):
+        """Append one structured JSON record to the metrics log"""
+        if not self.enabled or not self.json_log:
+            return
+        record = {
+            'ts': datetime.now(timezone.utc).isoformat(),
+            'event': event,
+            'pid': os.getpid(),
+            **fields
+        }
+        line = json.dumps(record, default=str)
+        with self._lock:
+            os.makedirs(os.path.dirname(self.json_log) or ".", exist_ok=True)
+            with open(self.json_log, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    @staticmethod
+    def _format_labels(labels, extra=None):
+        items = list(labels) + list(extra or [])
+        if not items:
+            return ""
+        body = ",".join(f'{k}="{str(v)}"' for k, v in items)
+        return "{" + body + "}"
+
+    def to_prometheus(self, prefix="webscraper"):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for kind, store in (("counter", self.counters), ("gauge", self.gauges)):
+                seen = set()
+                for (name, labels), value in sorted(store.items()):
+                    metric = f"{prefix}_{name}"
+                    if metric not in seen:
+                        lines.append(f"# TYPE {metric} {kind}")
+                        seen.add(metric)
+                    lines.append(f"{metric}{self._format_labels(labels)} {value}")
+
+            seen = set()
+            for (name, labels), hist in sorted(self.histograms.items()):
+                metric = f"{prefix}_{name}"
+                if metric not in seen:
+                    lines.append(f"# TYPE {metric} histogram")
+                    seen.add(metric)
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append(f"{metric}_bucket{self._format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{metric}_bucket{self._format_labels(labels, [('le', '+Inf')])} {hist.count}")
+                lines.append(f"{metric}_sum{self._format_labels(labels)} {hist.sum}")
+                lines.append(f"{metric}_count{self._format_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        """Write the Prometheus text file (atomically, for node_exporter's textfile collector)"""
+        if not self.enabled or not self.prometheus_file:
+            return
+        if not (self.counters or self.gauges or self.histograms):
+            return
+        os.makedirs(os.path.dirname(self.prometheus_file) or ".", exist_ok=True)
+        tmp_path = self.prometheus_file + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, self.prometheus_file)
+
+
+# Shared registry used by every stage
+metrics = MetricsRegistry()
+atexit.register(metrics.flush)
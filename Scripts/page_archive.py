@@ -0,0 +1,132 @@
+"""
+Raw Review Page Archive
+Append-only, compressed copy of every review page fetched from the Play Store.
+
+Layout:
+    <root>/<app_id>/<YYYY-MM-DD>.jsonl.zst   (or .jsonl.gz without zstandard)
+
+Each fetched page is appended to the app's segment for the day as one JSON
+line, compressed as its own zstd frame / gzip member. Concatenated frames are
+still a valid stream, so appends never rewrite earlier data.
+
+The archive lets the raw dataset be rebuilt offline (see
+PlayStoreScraper.scrape_from_archive) when cleaning or language filtering
+changes, without going back to the network.
+"""
+
+import sys
+import os
+import json
+import gzip
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS
+from Scripts.metrics import metrics
+
+try:
+    import zstandard
+except ImportError:  # optional: fall back to gzip
+    zstandard = None
+
+# Review fields returned by google_play_scraper as datetimes
+DATETIME_FIELDS = ('at', 'repliedAt')
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive value of type {type(value).__name__}")
+
+
+def decode_review(review):
+    """Restore the datetime fields of an archived review dict"""
+    for field in DATETIME_FIELDS:
+        if review.get(field):
+            review[field] = datetime.fromisoformat(review[field])
+    return review
+
+
+class PageArchive:
+    """Per-app, per-day append-only segments of raw review pages"""
+
+    def __init__(self, root=None, codec=None):
+        """
+        Args:
+            root (str): archive directory (default DATA_PATHS['page_archive']).
+            codec (str): 'zstd' or 'gzip' for new segments (default: zstd if installed).
+        """
+        self.root = root or DATA_PATHS['page_archive']
+        self.codec = codec or ("zstd" if zstandard is not None else "gzip")
+        if self.codec == "zstd" and zstandard is None:
+            raise ImportError("zstandard is required for the zstd archive codec")
+        self.extension = ".jsonl.zst" if self.codec == "zstd" else ".jsonl.gz"
+
+    # -----------------------------
+    # Writing
+    # -----------------------------
+    def segment_path(self, app_id, day=None):
+        day = day or datetime.now().strftime("%Y-%m-%d")
+        return os.path.join(self.root, app_id, day + self.extension)
+
+    def _compress(self, data):
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=3).compress(data)
+        return gzip.compress(data, compresslevel=6)
+
+    def append(self, app_id, page):
+        """Append one raw review page (list of review dicts) to today's segment"""
+        record = {
+            'app_id': app_id,
+            'fetched_at': datetime.now().isoformat(),
+            'reviews': page
+        }
+        line = json.dumps(record, default=_encode, ensure_ascii=False).encode("utf-8") + b"\n"
+        frame = self._compress(line)
+
+        path = self.segment_path(app_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            f.write(frame)
+        metrics.inc("archive_bytes_total", len(frame), app_id=app_id)
+        metrics.inc("archive_pages_total", app_id=app_id)
+
+    # -----------------------------
+    # Reading
+    # -----------------------------
+    def segments(self, app_id):
+        """Segment files of one app, oldest first"""
+        app_dir = os.path.join(self.root, app_id)
+        if not os.path.isdir(app_dir):
+            return []
+        names = sorted(
+            name for name in os.listdir(app_dir)
+            if name.endswith(".jsonl.zst") or name.endswith(".jsonl.gz")
+        )
+        return [os.path.join(app_dir, name) for name in names]
+
+    @staticmethod
+    def read_records(path):
+        """Raw JSON lines of one segment (one per fetched page), in the order they were fetched"""
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise ImportError(f"zstandard is required to read {path}")
+            with open(path, "rb") as f:
+                reader = zstandard.ZstdDecompressor().stream_reader(f, read_across_frames=True)
+                data = reader.read()
+        else:
+            with gzip.open(path, "rb") as f:
+                data = f.read()
+        return [line for line in data.splitlines() if line.strip()]
+
+    @staticmethod
+    def decode_page(record):
+        """Review page stored in one raw JSON line"""
+        return [decode_review(review) for review in json.loads(record)['reviews']]
+
+    @staticmethod
+    def iter_pages(path):
+        """Yield the review pages stored in one segment, in the order they were fetched"""
+        for record in PageArchive.read_records(path):
+            yield PageArchive.decode_page(record)
@@ -0,0 +1,55 @@
+"""
+Per-Bank Partitioned Execution
+Run per-bank analytics once per partition instead of re-filtering the whole
+DataFrame with a boolean mask for every bank.
+
+- bank_groups(): row positions of every bank from a single groupby pass
+- map_partitions(): calls func(bank, bank_df, **kwargs) for each bank, in a
+  process pool when workers > 1, and returns {bank: result}
+
+Banks are independent, so with one worker per bank the per-bank stages scale
+with cores as more banks are tracked. func must be a module-level function
+(it is pickled to the workers).
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import ANALYTICS_CONFIG
+from Scripts.metrics import metrics
+
+
+def bank_groups(df, bank_col='bank_name'):
+    """{bank: array of row positions}, banks in order of first appearance"""
+    return df.groupby(bank_col, sort=False, observed=True).indices
+
+
+def map_partitions(func, df, bank_col='bank_name', workers=None, **kwargs):
+    """
+    Apply func to every bank's rows.
+
+    Args:
+        func: module-level callable func(bank, bank_df, **kwargs).
+        df: DataFrame to partition; pass only the columns func needs, since each
+            partition is pickled to a worker process.
+        bank_col (str): partition column.
+        workers (int): processes (default ANALYTICS_CONFIG['workers']); 1 runs in-process.
+
+    Returns:
+        Dictionary bank -> func result, banks in order of first appearance.
+    """
+    groups = bank_groups(df, bank_col)
+    workers = min(workers or ANALYTICS_CONFIG['workers'], len(groups))
+
+    with metrics.timer("partitions", func=func.__name__, workers=max(workers, 1)) as t:
+        t.rows_in = len(df)
+        if workers <= 1:
+            return {bank: func(bank, df.iloc[rows], **kwargs) for bank, rows in groups.items()}
+
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {bank: pool.submit(func, bank, df.iloc[rows], **kwargs) for bank, rows in groups.items()}
+            return {bank: future.result() for bank, future in futures.items()}
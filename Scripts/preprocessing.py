@@ -28,25 +28,35 @@ import numpy as np
 from datetime import datetime
 # Import re module for regular expression operations (used for text cleaning)
 import re
+# Import io and contextlib to capture the output of per-bank worker processes
+import io
+import contextlib
 # Import DATA_PATHS dictionary from the local config module
-from config import DATA_PATHS
+from config import DATA_PATHS, ANALYTICS_CONFIG
+# Import the shared metrics registry for per-stage timings and counters
+from Scripts.metrics import metrics
+# Import the per-bank partition runner (one task per bank, optionally in a process pool)
+from Scripts.partitions import map_partitions
 
 
 class ReviewPreprocessor:
     """Preprocessor class for review data"""
 
-    def __init__(self, input_path=None, output_path=None):
+    def __init__(self, input_path=None, output_path=None, workers=None):
         """
         Initialize preprocessor
 
         Args:
             input_path (str): Path to raw reviews CSV
             output_path (str): Path to save processed reviews
+            workers (int): Processes for the per-bank steps (default ANALYTICS_CONFIG['workers'])
         """
         # Set the input path: use the provided argument, or default to DATA_PATHS['raw_reviews'] from config
         self.input_path = input_path or DATA_PATHS['raw_reviews']
         # Set the output path: use the provided argument, or default to DATA_PATHS['processed_reviews'] from config
         self.output_path = output_path or DATA_PATHS['processed_reviews']
+        # Number of processes for steps 3-5; 1 runs them in this process on the whole DataFrame
+        self.workers = workers or ANALYTICS_CONFIG['workers']
         # Initialize an empty DataFrame attribute to hold our data
         self.df = None
         # Initialize a dictionary to keep track of processing statistics (counts, errors, etc.)
@@ -230,6 +240,35 @@ class ReviewPreprocessor:
         # Record the number of invalid ratings removed
         self.stats['invalid_ratings_removed'] = len(invalid)
 
+    def process_partitions(self):
+        """Run steps 3-5 (dates, text, ratings) per bank in a process pool"""
+        # Print a single header for the combined steps
+        print(f"\n[3-5/6] Normalizing dates, cleaning text and validating ratings "
+              f"per bank ({self.workers} workers)...")
+
+        # Split by bank once and process every bank independently; results are {bank: (df, stats, log)}
+        results = map_partitions(_preprocess_bank, self.df, 'bank_name', self.workers)
+        if not results:
+            return
+
+        # Merge the per-bank DataFrames back together, in the original row order so ties in
+        # prepare_final_output's sort come out exactly as in the sequential steps
+        self.df = pd.concat([bank_df for bank_df, _, _ in results.values()]).sort_index(kind='mergesort')
+
+        # Add up the per-bank statistics
+        for key in ('empty_reviews_removed', 'count_after_cleaning', 'invalid_ratings_removed'):
+            self.stats[key] = sum(bank_stats.get(key, 0) for _, bank_stats, _ in results.values())
+
+        # Show the warnings the workers printed, labelled with their bank
+        for bank, (_, _, log) in results.items():
+            for line in log.splitlines():
+                if line.startswith("WARNING"):
+                    print(f"{bank}: {line}")
+
+        # Print the same summary lines as the sequential steps
+        print(f"Date range: {self.df['review_date'].min()} to {self.df['review_date'].max()}")
+        print(f"Removed {self.stats['empty_reviews_removed']} reviews with empty text")
+
     def prepare_final_output(self):
         """Prepare final output format"""
         # Print a header for this step [6/6]
@@ -258,7 +297,8 @@ class ReviewPreprocessor:
         self.df = self.df[output_columns]
 
         # Sort the DataFrame first by 'bank_code' (ascending) and then by 'review_date' (descending/newest first)
-        self.df = self.df.sort_values(['bank_code', 'review_date'], ascending=[True, False])
+        # mergesort is stable: reviews of the same bank and day keep their input order
+        self.df = self.df.sort_values(['bank_code', 'review_date'], ascending=[True, False], kind='mergesort')
 
         # Reset the index of the DataFrame so it starts from 0 to N-1 cleanly
         # drop=True prevents the old index from being added as a new column
@@ -364,21 +404,40 @@ class ReviewPreprocessor:
         print("STARTING DATA PREPROCESSING")
         print("=" * 60)
 
-        # Attempt to load data. If it fails, return False immediately.
-        if not self.load_data():
-            return False
-
-        # Run each step of the pipeline in sequence
-        self.check_missing_data()
-        # self.remove_duplicates() - REMOVED AS REQUESTED
-        self.handle_missing_values()
-        self.normalize_dates()
-        self.clean_text()
-        self.validate_ratings()
-        self.prepare_final_output()
+        # Time the whole pipeline as the "preprocess" stage (rows in / rows out / rows per second)
+        with metrics.timer("preprocess") as t:
+            # Attempt to load data. If it fails, return False immediately.
+            if not self.load_data():
+                return False
+            # Record how many rows entered the pipeline
+            t.rows_in = self.stats['original_count']
+
+            # Run each step of the pipeline in sequence, timing every step individually
+            with metrics.timer("preprocess_check_missing"):
+                self.check_missing_data()
+            # self.remove_duplicates() - REMOVED AS REQUESTED
+            with metrics.timer("preprocess_handle_missing"):
+                self.handle_missing_values()
+            if self.workers > 1:
+                # Row-wise steps are independent per bank: run them partition-parallel
+                with metrics.timer("preprocess_partitions"):
+                    self.process_partitions()
+            else:
+                with metrics.timer("preprocess_normalize_dates"):
+                    self.normalize_dates()
+                with metrics.timer("preprocess_clean_text"):
+                    self.clean_text()
+                with metrics.timer("preprocess_validate_ratings"):
+                    self.validate_ratings()
+            with metrics.timer("preprocess_prepare_output"):
+                self.prepare_final_output()
+            # Record how many rows survived the pipeline
+            t.rows_out = len(self.df)
 
         # Attempt to save the data. If successful, generate the report.
         if self.save_data():
+            # Feed the collected statistics into the metrics registry
+            metrics.record_stats("preprocessing", self.stats)
             self.generate_report()
             return True
 
@@ -386,6 +445,20 @@ class ReviewPreprocessor:
         return False
 
 
+def _preprocess_bank(bank, bank_df):
+    """Process-pool worker: steps 3-5 for one bank's reviews"""
+    # A fresh preprocessor holding only this bank's rows
+    preprocessor = ReviewPreprocessor(workers=1)
+    preprocessor.df = bank_df.copy()
+    # Capture the step output; the parent prints one combined summary instead
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        preprocessor.normalize_dates()
+        preprocessor.clean_text()
+        preprocessor.validate_ratings()
+    # Return the cleaned rows, the step statistics and the captured output
+    return preprocessor.df, preprocessor.stats, log.getvalue()
+
 
 def main():
     """Main execution function"""
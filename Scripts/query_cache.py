@@ -0,0 +1,258 @@
+"""
+Query Result Cache
+Reuse the results of analytical queries until the tables they read change.
+
+Each cached result is keyed by the query name, its parameters and the current
+version of every table it reads.
+
+With the default 'postgres' backend a table's version is the value of its
+sequence (`reviews_version_seq`, `banks_version_seq`; models/tables.py). The
+writers (BankReviewLoader, SentimentBackfill, queue scoring workers) call
+nextval() after each commit. That never blocks another writer, and a load on
+any node makes older results unreachable everywhere. Readers check the
+sequences at most once per QUERY_CACHE_CONFIG['versions_ttl'] seconds per
+machine (the values seen are kept in DATA_PATHS['table_versions_seen']), so
+repeated sessions within that window do not connect to Postgres. Bumps made on
+this machine are seen at once. Writes made outside these loaders (e.g. manual
+SQL) are not versioned: call bump_table_version() or pass refresh=True.
+
+The 'local' backend (TABLE_VERSIONS_BACKEND=local) keeps the versions in a
+JSON file (DATA_PATHS['table_versions']); only writes made on this machine are
+seen.
+
+Results are stored as Parquet when pyarrow/fastparquet is available, otherwise
+as pickles.
+"""
+
+import sys
+import os
+import glob
+import json
+import time
+import hashlib
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, QUERY_CACHE_CONFIG
+from Scripts.metrics import metrics
+from Scripts.file_lock import file_lock
+
+# Tables with a version sequence (models/tables.py)
+VERSIONED_TABLES = ("banks", "reviews")
+
+
+# -----------------------------
+# Table versions
+# -----------------------------
+def _read_versions(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_versions(path, versions):
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(versions, f)
+    os.replace(tmp_path, path)
+
+
+def _sequence(table):
+    if table not in VERSIONED_TABLES:
+        raise ValueError(f"No version sequence for table '{table}' (known: {', '.join(VERSIONED_TABLES)})")
+    return f"{table}_version_seq"
+
+
+def _postgres_versions(tables):
+    """Current value of each table's version sequence (a plain read: takes no locks)"""
+    from config.db_config import get_connection
+
+    query = " UNION ALL ".join(
+        f"SELECT '{table}', CASE WHEN is_called THEN last_value ELSE 0 END FROM {_sequence(table)}"
+        for table in tables
+    )
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(query)
+        return dict(cur.fetchall())
+    finally:
+        conn.close()
+
+
+def _remember_versions(versions, path, checked_at=None):
+    """Merge versions read from (or just bumped in) Postgres into this machine's snapshot"""
+    with file_lock(path):
+        snapshot = _read_versions(path)
+        seen = snapshot.get('versions', {})
+        for table, version in versions.items():
+            seen[table] = max(version, seen.get(table, 0))
+        snapshot['versions'] = seen
+        if checked_at is not None:
+            snapshot['checked_at'] = {**snapshot.get('checked_at', {}), **{t: checked_at for t in versions}}
+        _write_versions(path, snapshot)
+
+
+def table_versions(tables, path=None, backend=None, max_age=None):
+    """
+    {table: version} for the given tables (0 if never bumped).
+
+    With the 'postgres' backend the sequences are read at most once per
+    `max_age` seconds (QUERY_CACHE_CONFIG['versions_ttl']) per machine; in
+    between, the last values seen (plus bumps made here) are used.
+    """
+    backend = backend or QUERY_CACHE_CONFIG['versions']
+    if backend != "postgres":
+        versions = _read_versions(path or DATA_PATHS['table_versions'])
+        return {table: versions.get(table, 0) for table in tables}
+
+    path = path or DATA_PATHS['table_versions_seen']
+    max_age = QUERY_CACHE_CONFIG['versions_ttl'] if max_age is None else max_age
+    snapshot = _read_versions(path)
+    now = time.time()
+    checked_at = snapshot.get('checked_at', {})
+    stale = [table for table in tables if now - checked_at.get(table, 0) >= max_age]
+    if stale:
+        fetched = _postgres_versions(stale)
+        _remember_versions({table: fetched.get(table, 0) for table in stale}, path, checked_at=now)
+        snapshot = _read_versions(path)
+    versions = snapshot.get('versions', {})
+    return {table: versions.get(table, 0) for table in tables}
+
+
+def bump_table_version(*tables, conn=None, path=None, backend=None):
+    """
+    Mark tables as changed; call after committing writes to them.
+
+    Args:
+        conn: open Postgres connection of the writer (postgres backend; a new
+            one is opened otherwise). Its transaction must be committed.
+    """
+    backend = backend or QUERY_CACHE_CONFIG['versions']
+    if backend == "postgres":
+        from config.db_config import get_connection
+
+        own_conn = conn is None
+        conn = get_connection() if own_conn else conn
+        try:
+            cur = conn.cursor()
+            # nextval() never blocks and is not rolled back: concurrent writers do not wait
+            # on each other, and the bump is visible at once (after the data it announces)
+            versions = {}
+            for table in tables:
+                cur.execute("SELECT nextval(%s)", (_sequence(table),))
+                versions[table] = cur.fetchone()[0]
+            conn.commit()
+        finally:
+            if own_conn:
+                conn.close()
+        _remember_versions(versions, path or DATA_PATHS['table_versions_seen'])
+        return
+
+    path = path or DATA_PATHS['table_versions']
+    # Read-modify-write under the lock: concurrent writers must not drop each other's bumps
+    with file_lock(path):
+        versions = _read_versions(path)
+        # A timestamp rather than a counter: a version is never reused, even after the file is lost
+        version = time.time_ns()
+        for table in tables:
+            versions[table] = max(version, versions.get(table, 0) + 1)
+        _write_versions(path, versions)
+
+
+# -----------------------------
+# Result cache
+# -----------------------------
+def _parquet_available():
+    for engine in ("pyarrow", "fastparquet"):
+        try:
+            __import__(engine)
+            return True
+        except ImportError:
+            continue
+    return False
+
+
+class QueryCache:
+    """DataFrame results on disk, keyed by (name, parameters, table versions)"""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or DATA_PATHS['query_cache']
+        self.use_parquet = _parquet_available()
+
+    @staticmethod
+    def _digest(value):
+        payload = json.dumps(value, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def key(self, name, params, tables):
+        """'<name>-<params digest>-<table versions digest>'"""
+        return f"{name}-{self._digest(params)}-{self._digest(table_versions(tables))}"
+
+    def _find(self, key):
+        for extension in (".parquet", ".pkl"):
+            path = os.path.join(self.cache_dir, key + extension)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _read(self, path):
+        import pandas as pd
+
+        if path.endswith(".parquet"):
+            return pd.read_parquet(path)
+        return pd.read_pickle(path)
+
+    def _write(self, df, key):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        if self.use_parquet:
+            path = os.path.join(self.cache_dir, key + ".parquet")
+            try:
+                df.to_parquet(path + ".tmp", index=False)
+                os.replace(path + ".tmp", path)
+                return path
+            except Exception as e:  # e.g. column types Parquet cannot represent
+                print(f"Parquet cache write failed ({e}); using pickle")
+                if os.path.exists(path + ".tmp"):
+                    os.remove(path + ".tmp")
+        path = os.path.join(self.cache_dir, key + ".pkl")
+        df.to_pickle(path + ".tmp")
+        os.replace(path + ".tmp", path)
+        return path
+
+    def _prune(self, key):
+        """Remove results for the same query and parameters at older table versions"""
+        prefix = key.rsplit("-", 1)[0]
+        for path in glob.glob(os.path.join(self.cache_dir, f"{prefix}-*")):
+            if not os.path.basename(path).startswith(key):
+                os.remove(path)
+
+    def get_or_compute(self, name, params, tables, compute, refresh=False):
+        """
+        Cached result of compute() for these parameters and table versions.
+
+        Args:
+            name (str): query name (file prefix).
+            params (dict): everything the result depends on besides the tables.
+            tables (list): tables the query reads.
+            compute: callable returning a DataFrame, run on a cache miss.
+            refresh (bool): ignore any cached result.
+        """
+        key = self.key(name, params, tables)
+        path = None if refresh else self._find(key)
+        if path is not None:
+            metrics.cache_hit("query_results")
+            with metrics.timer("query_cache_read", query=name) as t:
+                df = self._read(path)
+                t.rows_out = len(df)
+            return df
+
+        metrics.cache_hit("query_results", hit=False)
+        df = compute()
+        with metrics.timer("query_cache_write", query=name) as t:
+            self._prune(key)
+            self._write(df, key)
+            t.rows_in = len(df)
+        return df
@@ -0,0 +1,144 @@
+"""
+Columnar Review Buffer
+Compact in-memory representation of scraped reviews.
+
+Instead of one 11-key dict per review, reviews are appended page by page into
+typed column buffers:
+- numeric fields (rating, thumbs up, review timestamp) live in packed `array`s
+- bank and source are stored as 1-byte codes into small lookup tables
+- repeated short strings (app version) are interned
+
+`to_dataframe()` produces the same columns the scraper has always written,
+with bank/source as pandas categoricals.
+"""
+
+import sys
+from array import array
+from datetime import datetime
+
+EPOCH = datetime(1970, 1, 1)
+DEFAULT_SOURCE = 'Google Play'
+
+COLUMNS = [
+    'review_id', 'review_text', 'rating', 'review_date', 'user_name', 'thumbs_up',
+    'reply_content', 'bank_code', 'bank_name', 'app_version', 'source'
+]
+
+
+class ReviewColumns:
+    """Append-only columnar buffer of reviews for one or more banks"""
+
+    def __init__(self, bank_names, sources=(DEFAULT_SOURCE,)):
+        """
+        Args:
+            bank_names (dict): bank_code -> bank name (e.g. config.BANK_NAMES).
+            sources (tuple): known review sources; index = stored code.
+        """
+        self.bank_names = dict(bank_names)
+        self.bank_codes = list(self.bank_names)
+        self._bank_index = {code: i for i, code in enumerate(self.bank_codes)}
+        self.sources = list(sources)
+        self._source_index = {source: i for i, source in enumerate(self.sources)}
+
+        self.review_id = []
+        self.review_text = []
+        self.rating = array('b')
+        self.review_ts = array('q')     # seconds since epoch (naive, as returned by the store)
+        self.user_name = []
+        self.thumbs_up = array('q')
+        self.reply_content = []
+        self.bank = array('B')          # index into self.bank_codes
+        self.app_version = []
+        self.source = array('B')        # index into self.sources
+
+    def __len__(self):
+        return len(self.review_id)
+
+    # -----------------------------
+    # Building
+    # -----------------------------
+    def _source_code(self, source):
+        code = self._source_index.get(source)
+        if code is None:
+            code = len(self.sources)
+            self.sources.append(source)
+            self._source_index[source] = code
+        return code
+
+    def append(self, review_id, review_text, rating, review_date, bank_code,
+               user_name='Anonymous', thumbs_up=0, reply_content=None,
+               app_version='N/A', source=DEFAULT_SOURCE):
+        """Append one review"""
+        if review_date is None:
+            review_date = datetime.now()
+        if review_date.tzinfo is not None:
+            review_date = review_date.replace(tzinfo=None)
+
+        self.review_id.append(review_id)
+        self.review_text.append(review_text)
+        self.rating.append(int(rating or 0))
+        self.review_ts.append(int((review_date - EPOCH).total_seconds()))
+        self.user_name.append(user_name)
+        self.thumbs_up.append(int(thumbs_up or 0))
+        self.reply_content.append(reply_content)
+        self.bank.append(self._bank_index[bank_code])
+        self.app_version.append(sys.intern(app_version) if app_version else app_version)
+        self.source.append(self._source_code(source))
+
+    def append_store_review(self, review, bank_code, review_text):
+        """Append one review dict as returned by google_play_scraper"""
+        self.append(
+            review_id=review.get('reviewId'),
+            review_text=review_text,
+            rating=review.get('score', 0),
+            review_date=review.get('at') or datetime.now(),
+            bank_code=bank_code,
+            user_name=review.get('userName', 'Anonymous'),
+            thumbs_up=review.get('thumbsUpCount', 0),
+            reply_content=review.get('replyContent', None),
+            app_version=review.get('reviewCreatedVersion', 'N/A') or 'N/A'
+        )
+
+    def extend(self, other):
+        """Append all rows of another buffer (built from the same bank table)"""
+        if other.bank_codes != self.bank_codes:
+            raise ValueError("Cannot merge review buffers with different bank tables")
+        source_map = array('B', (self._source_code(source) for source in other.sources))
+
+        self.review_id.extend(other.review_id)
+        self.review_text.extend(other.review_text)
+        self.rating.extend(other.rating)
+        self.review_ts.extend(other.review_ts)
+        self.user_name.extend(other.user_name)
+        self.thumbs_up.extend(other.thumbs_up)
+        self.reply_content.extend(other.reply_content)
+        self.bank.extend(other.bank)
+        self.app_version.extend(other.app_version)
+        self.source.extend(source_map[code] for code in other.source)
+
+    # -----------------------------
+    # Export
+    # -----------------------------
+    def to_dataframe(self):
+        """Materialise the buffer as a DataFrame with the scraper's column layout"""
+        import numpy as np
+        import pandas as pd
+
+        bank_codes = np.frombuffer(self.bank, dtype=np.uint8) if len(self) else np.array([], dtype=np.uint8)
+        source_codes = np.frombuffer(self.source, dtype=np.uint8) if len(self) else np.array([], dtype=np.uint8)
+
+        return pd.DataFrame({
+            'review_id': self.review_id,
+            'review_text': self.review_text,
+            'rating': np.array(self.rating, dtype=np.int8),
+            'review_date': pd.to_datetime(np.array(self.review_ts, dtype=np.int64), unit='s'),
+            'user_name': self.user_name,
+            'thumbs_up': np.array(self.thumbs_up, dtype=np.int64),
+            'reply_content': self.reply_content,
+            'bank_code': pd.Categorical.from_codes(bank_codes, self.bank_codes),
+            'bank_name': pd.Categorical.from_codes(
+                bank_codes, [self.bank_names[code] for code in self.bank_codes]
+            ),
+            'app_version': self.app_version,
+            'source': pd.Categorical.from_codes(source_codes, self.sources)
+        }, columns=COLUMNS)
@@ -6,24 +6,46 @@ Target: 400+ meaningful English reviews per bank
 import sys
 import os
 import re
-from langdetect import detect, LangDetectException
-from google_play_scraper import app, reviews_all
-import pandas as pd
-from datetime import datetime
-from tqdm import tqdm
-from config import APP_IDS, BANK_NAMES, SCRAPING_CONFIG, DATA_PATHS
+from config import APP_IDS, BANK_NAMES, SCRAPING_CONFIG, DATA_PATHS, SKETCH_CONFIG
+from Scripts.metrics import metrics
+from Scripts.review_buffer import ReviewColumns
+from Scripts.http_transport import HttpTransport
+from Scripts.page_archive import PageArchive
+from Scripts.streaming_stats import StreamingAggregator
+from Scripts.partitions import bank_groups
 import time
+from datetime import datetime
 
 
 class PlayStoreScraper:
     """Scraper class for Google Play Store reviews"""
 
-    def __init__(self):
+    def __init__(self, transport=None, archive=None, sketches=None, raise_errors=False):
+        """
+        Args:
+            transport: HttpTransport used for all Play Store requests
+                (default: pooled transport configured from HTTP_CONFIG).
+            archive: PageArchive receiving every fetched page (default: one at
+                DATA_PATHS['page_archive'] if SCRAPING_CONFIG['archive_pages']; False disables).
+            sketches: StreamingAggregator updated with every collected review (default:
+                the 'scraped' stream if SKETCH_CONFIG['enabled']; False disables).
+            raise_errors: re-raise scrape failures instead of logging them and returning
+                no reviews (for callers with their own retries, e.g. queue workers).
+        """
+        self.transport = transport or HttpTransport()
+        if archive is None and SCRAPING_CONFIG['archive_pages']:
+            archive = PageArchive()
+        self.archive = archive or None
+        if sketches is None and SKETCH_CONFIG['enabled']:
+            sketches = StreamingAggregator("scraped")
+        self.sketches = sketches or None
+        self.raise_errors = raise_errors
         self.app_ids = APP_IDS
         self.bank_names = BANK_NAMES
         self.min_reviews_per_bank = SCRAPING_CONFIG['reviews_per_bank'] or 400
         self.lang = SCRAPING_CONFIG['lang']
         self.country = SCRAPING_CONFIG['country']
+        self.page_size = SCRAPING_CONFIG['page_size']
 
     # -----------------------------
     # Text Cleaning
@@ -39,6 +61,8 @@ class PlayStoreScraper:
     # -----------------------------
     def is_meaningful_english(self, text):
         """Return True if the text is English and meaningful"""
+        from langdetect import detect, LangDetectException
+
         text = self.clean_text(text)
         if len(text) < 8:  # skip very short reviews
             return False
@@ -51,8 +75,11 @@ class PlayStoreScraper:
     # Fetch App Info
     # -----------------------------
     def get_app_info(self, app_id):
+        from google_play_scraper import app
+
         try:
-            result = app(app_id, lang=self.lang, country=self.country)
+            with metrics.timer("app_info", app_id=app_id), self.transport.install():
+                result = app(app_id, lang=self.lang, country=self.country)
             return {
                 'app_id': app_id,
                 'title': result.get('title', 'N/A'),
@@ -62,56 +89,94 @@ class PlayStoreScraper:
                 'installs': result.get('installs', 'N/A')
             }
         except Exception as e:
+            metrics.inc("app_info_errors_total", app_id=app_id)
             print(f"Error getting app info for {app_id}: {e}")
             return None
 
+    # -----------------------------
+    # Fetch raw review pages
+    # -----------------------------
+    def iter_review_pages(self, app_id):
+        """Yield raw review pages (lists of dicts) until the store runs out"""
+        from google_play_scraper import reviews
+
+        token = None
+        while True:
+            with self.transport.install():
+                page, token = reviews(
+                    app_id,
+                    lang=self.lang,
+                    country=self.country,
+                    count=self.page_size,
+                    continuation_token=token
+                )
+            if page:
+                if self.archive is not None:
+                    self.archive.append(app_id, page)
+                yield page
+            if not page or token is None or token.token is None:
+                return
+
     # -----------------------------
     # Scrape meaningful English reviews for a bank
     # -----------------------------
     def scrape_reviews_for_bank(self, app_id, bank_code):
+        """Scrape one bank page by page into a columnar ReviewColumns buffer"""
         print(f"\n🔍 Scraping reviews for {self.bank_names[bank_code]}...")
 
-        collected = []
+        collected = ReviewColumns(self.bank_names)
+        fetched = 0
 
         try:
-            all_reviews = reviews_all(app_id, lang=self.lang, country=self.country)
-            print(f"Total raw reviews fetched: {len(all_reviews)}")
-
-            for review in all_reviews:
-                text = review.get("content", "")
-                if not self.is_meaningful_english(text):
-                    continue
-
-                collected.append({
-                    'review_id': review.get('reviewId'),
-                    'review_text': self.clean_text(text),
-                    'rating': review.get('score', 0),
-                    'review_date': review.get('at', datetime.now()),
-                    'user_name': review.get('userName', 'Anonymous'),
-                    'thumbs_up': review.get('thumbsUpCount', 0),
-                    'reply_content': review.get('replyContent', None),
-                    'bank_code': bank_code,
-                    'bank_name': self.bank_names[bank_code],
-                    'app_version': review.get('reviewCreatedVersion', 'N/A'),
-                    'source': 'Google Play'
-                    
-                })
-
-                if len(collected) >= self.min_reviews_per_bank:
-                    break  # stop when we reach target
+            with metrics.timer("scrape", bank=bank_code) as t:
+                for page in self.iter_review_pages(app_id):
+                    fetched += len(page)
+                    for review in page:
+                        text = review.get("content", "") or ""
+                        if not self.is_meaningful_english(text):
+                            continue
+
+                        cleaned = self.clean_text(text)
+                        collected.append_store_review(review, bank_code, cleaned)
+                        if self.sketches is not None:
+                            self.sketches.add(
+                                self.bank_names[bank_code], review.get("at") or datetime.now(),
+                                review_id=review.get("reviewId"), text=cleaned, user=review.get("userName"), rating=review.get("score")
+                            )
+
+                        if len(collected) >= self.min_reviews_per_bank:
+                            break  # stop when we reach target
 
+                    if len(collected) >= self.min_reviews_per_bank:
+                        break  # no need to fetch further pages
+
+                t.rows_in = fetched
+                t.rows_out = len(collected)
+
+            if self.sketches is not None:
+                self.sketches.flush()
+            print(f"Total raw reviews fetched: {fetched}")
             print(f"✅ Collected {len(collected)} meaningful English reviews for {self.bank_names[bank_code]}")
             return collected
 
         except Exception as e:
+            metrics.inc("scrape_errors_total", bank=bank_code)
             print(f"Error scraping {self.bank_names[bank_code]}: {e}")
-            return []
+            if self.sketches is not None:
+                self.sketches.discard()  # the next bank's flush must not persist them
+            if self.raise_errors:
+                raise
+            # A truncated scrape is not returned as if it were complete
+            return ReviewColumns(self.bank_names)
 
     # -----------------------------
     # Scrape all banks
     # -----------------------------
     def scrape_all_banks(self):
-        final_reviews = []
+        import pandas as pd
+        from tqdm import tqdm
+
+        final_reviews = ReviewColumns(self.bank_names)
         app_info_list = []
 
         print("\n==============================================")
@@ -135,13 +200,13 @@ class PlayStoreScraper:
         # Scrape reviews
         print("[2/2] Scraping reviews...")
         for bank_code, app_id in tqdm(self.app_ids.items(), desc="Banks"):
-            reviews_list = self.scrape_reviews_for_bank(app_id, bank_code)
-            final_reviews.extend(reviews_list)
+            bank_reviews = self.scrape_reviews_for_bank(app_id, bank_code)
+            final_reviews.extend(bank_reviews)
             time.sleep(2)  # polite delay
 
         # Save all reviews
-        if final_reviews:
-            df = pd.DataFrame(final_reviews)
+        if len(final_reviews):
+            df = final_reviews.to_dataframe()
             os.makedirs(DATA_PATHS['raw'], exist_ok=True)
             df.to_csv(DATA_PATHS['raw_reviews'], index=False)
             print("\n==============================================")
@@ -153,6 +218,73 @@ class PlayStoreScraper:
         print("ERROR: No reviews collected!")
         return pd.DataFrame()
 
+    # -----------------------------
+    # Rebuild from the raw page archive
+    # -----------------------------
+    def parse_pages(self, pages, bank_code):
+        """Filter and clean raw review pages into a ReviewColumns buffer"""
+        collected = ReviewColumns(self.bank_names)
+        for page in pages:
+            for review in page:
+                text = review.get("content", "") or ""
+                if self.is_meaningful_english(text):
+                    collected.append_store_review(review, bank_code, self.clean_text(text))
+        return collected
+
+    def archive_tasks(self, archive, pages_per_task=None):
+        """
+        Yield (bank_code, raw page records) worker tasks in fetch order: segments
+        oldest first, and at most `pages_per_task` pages of one segment per task,
+        so a busy day is spread over several workers.
+        """
+        pages_per_task = pages_per_task or SCRAPING_CONFIG['archive_pages_per_task']
+        for bank_code, app_id in self.app_ids.items():
+            for path in archive.segments(app_id):
+                records = archive.read_records(path)
+                for i in range(0, len(records), pages_per_task):
+                    yield bank_code, records[i:i + pages_per_task]
+
+    def scrape_from_archive(self, workers=None, pages_per_task=None):
+        """
+        Rebuild reviews_raw.csv by re-parsing archived pages instead of the network.
+
+        Pages are parsed in parallel (see archive_tasks) and combined in fetch order.
+        A review fetched more than once keeps its latest copy; each bank is then
+        capped at its `min_reviews_per_bank` newest reviews, as a live scrape
+        (newest first) would.
+        """
+        import pandas as pd
+        from concurrent.futures import ProcessPoolExecutor
+
+        archive = self.archive or PageArchive()
+        workers = workers or SCRAPING_CONFIG['archive_workers'] or os.cpu_count()
+        tasks = list(self.archive_tasks(archive, pages_per_task))
+        if not tasks:
+            print(f"ERROR: No archived pages found under {archive.root}")
+            return pd.DataFrame()
+
+        print(f"Re-parsing {sum(len(records) for _, records in tasks)} archived pages "
+              f"in {len(tasks)} tasks with {workers} workers...")
+        final_reviews = ReviewColumns(self.bank_names)
+        with metrics.timer("archive_reparse") as t:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for bank_reviews in pool.map(_parse_archived_pages, tasks):
+                    final_reviews.extend(bank_reviews)
+
+            df = final_reviews.to_dataframe().drop_duplicates("review_id", keep="last")
+            df = df.sort_values(
+                ["bank_code", "review_date"], ascending=[True, False], kind="mergesort"
+            )
+            df = df.groupby("bank_code", observed=True, sort=False).head(self.min_reviews_per_bank)
+            df = df.reset_index(drop=True)
+            t.rows_in = len(final_reviews)
+            t.rows_out = len(df)
+
+        os.makedirs(DATA_PATHS['raw'], exist_ok=True)
+        df.to_csv(DATA_PATHS['raw_reviews'], index=False)
+        print(f"✅ Rebuilt {len(df)} reviews from the archive into {DATA_PATHS['raw_reviews']}")
+        return df
+
     # -----------------------------
     # Display sample reviews
     # -----------------------------
@@ -160,25 +292,37 @@ class PlayStoreScraper:
         print("\n==============================================")
         print("Sample Reviews")
         print("==============================================")
+        # Row positions per bank from one groupby pass instead of a mask per bank
+        groups = bank_groups(df, 'bank_code')
         for bank_code in self.bank_names:
-            bank_df = df[df['bank_code'] == bank_code]
-            if not bank_df.empty:
+            if bank_code in groups:
                 print(f"\n{self.bank_names[bank_code]}")
                 print("-" * 60)
-                for _, row in bank_df.head(n).iterrows():
+                for _, row in df.iloc[groups[bank_code][:n]].iterrows():
                     print(f"\n⭐ Rating: {row['rating']}")
                     print(f"Review: {row['review_text'][:200]}...")
                     print(f"Date: {row['review_date']}")
 
 
+def _parse_archived_pages(task):
+    """Process-pool worker: parse a run of archived pages for one bank"""
+    bank_code, records = task
+    scraper = PlayStoreScraper(archive=False, sketches=False)
+    return scraper.parse_pages((PageArchive.decode_page(record) for record in records), bank_code)
+
+
 # -----------------------------
 # Main
 # -----------------------------
-def main():
+def main(from_archive=False, workers=None):
     scraper = PlayStoreScraper()
-    df = scraper.scrape_all_banks()
+    if from_archive:
+        df = scraper.scrape_from_archive(workers)
+    else:
+        df = scraper.scrape_all_banks()
     if not df.empty:
         scraper.display_sample_reviews(df)
+    metrics.flush()
     return df
 
 
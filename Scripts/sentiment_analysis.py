@@ -1,24 +1,238 @@
 
-from transformers import pipeline
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
+import sys
+import os
+import json
+import time
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SENTIMENT_CONFIG, AUTOTUNE_CONFIG
+from Scripts.metrics import metrics
+
+# Words too common in banking-app reviews to be informative keywords
+GENERIC_WORDS = {'app', 'bank', 'use', 'good', 'mobile', 'service', 'application'}
+
+
+def rank_phrases(words, scores, top_n=15, min_word_length=2):
+    """
+    Rank candidate phrases by score, dropping generic words and short phrases.
+
+    Args:
+        words: sequence of phrases.
+        scores: sequence of scores aligned with `words`.
+        top_n: number of phrases to keep.
+        min_word_length: minimum number of words in a phrase.
+
+    Returns:
+        DataFrame with `word` and `tfidf` columns, best first.
+    """
+    import pandas as pd
+
+    tfidf_df = pd.DataFrame({
+        'word': words,
+        'tfidf': scores
+    }).sort_values(by='tfidf', ascending=False)
+
+    # Filter out generic/common words
+    tfidf_df = tfidf_df[~tfidf_df['word'].isin(GENERIC_WORDS)]
+
+    # Keep only phrases with at least `min_word_length` words
+    tfidf_df = tfidf_df[tfidf_df['word'].str.split().str.len() >= min_word_length]
+
+    # Take top_n phrases
+    return tfidf_df.head(top_n).reset_index(drop=True)
+
+
+def bank_tfidf_keywords(bank, bank_df, text_col='review_text', top_n=15, min_word_length=2):
+    """Top TF-IDF phrases of one bank's reviews (a map_partitions task)"""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer(
+        stop_words='english',
+        ngram_range=(1, 3),  # unigrams, bigrams, trigrams
+        max_features=1000
+    )
+
+    X = vectorizer.fit_transform(bank_df[text_col].values)
+    tfidf_scores = X.sum(axis=0).A1
+    feature_names = vectorizer.get_feature_names_out()
+
+    return rank_phrases(feature_names, tfidf_scores, top_n, min_word_length)
+
+
+def tfidf_column_sums(counts, max_features=1000):
+    """
+    Summed TF-IDF per column of a document x term count matrix, computed the way
+    TfidfVectorizer(max_features=...) does (smooth idf, L2-normalised rows).
+
+    Returns:
+        (column indices kept, summed TF-IDF scores)
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import TfidfTransformer
+
+    totals = np.asarray(counts.sum(axis=0)).ravel()
+    columns = np.argsort(-totals, kind="stable")[:max_features]
+    X = TfidfTransformer().fit_transform(counts[:, columns])
+    return columns, np.asarray(X.sum(axis=0)).ravel()
+
+
+class SentimentClient:
+    """Client for the shared scoring server started with `python -m Scripts.cli serve-sentiment`"""
+
+    def __init__(self, server_url, timeout=None):
+        self.server_url = server_url.rstrip("/")
+        self.timeout = timeout or SENTIMENT_CONFIG['request_timeout']
+
+    def score(self, texts):
+        """Score a list of texts remotely; returns a list of (label, score) tuples"""
+        body = json.dumps({'texts': list(texts)}).encode("utf-8")
+        request = urllib.request.Request(
+            f"{self.server_url}/score",
+            data=body,
+            headers={'Content-Type': 'application/json'}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            payload = json.loads(response.read().decode("utf-8"))
+        return [(label, score) for label, score in payload['results']]
+
+
 class SentimentAnalysis:
-    def __init__(self):
+    def __init__(self, server_url=None, batch_size=None, autotune=None):
+        """
+        Args:
+            server_url: URL of a running scoring server. Defaults to SENTIMENT_SERVER_URL;
+                when set, no model is loaded in this process and scoring is remote.
+                Pass False to force a local model.
+            batch_size: batch size for local pipeline calls; disables autotuned settings.
+            autotune: 'off', 'saved' or 'on' (default SENTIMENT_CONFIG['autotune']);
+                see Scripts.autotune.
+        """
+        self.batch_size = batch_size or SENTIMENT_CONFIG['batch_size']
+        self.max_chars = SENTIMENT_CONFIG['max_chars']
+        self.model_name = SENTIMENT_CONFIG['model']
+        self.server_url = SENTIMENT_CONFIG['server_url'] if server_url is None else server_url
+        self.autotune_mode = SENTIMENT_CONFIG['autotune'] if autotune is None else autotune
+        if batch_size:
+            self.autotune_mode = 'off'
+        self.adaptive = None
+        self.client = None
+        self.model = None
+
+        if self.server_url:
+            print(f"Using shared sentiment server at {self.server_url}")
+            self.client = SentimentClient(self.server_url)
+            return
+
         print("Initializing DistilBERT sentiment pipeline...")
+        # transformers/torch take seconds to import, so defer them until a model is built
+        from transformers import pipeline
+
         self.model = pipeline(
             "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english"
+            model=self.model_name
         )
 
+        if self.autotune_mode != 'off':
+            from Scripts.autotune import TuningStore
+
+            settings = TuningStore().get(self.model_name)
+            if settings:
+                self.apply_tuning(settings)
+
+    # -----------------------------
+    # Autotuning
+    # -----------------------------
+    def apply_tuning(self, settings):
+        """Use tuned batch size / thread count, adapting the batch size at runtime"""
+        import torch
+        from Scripts.autotune import AdaptiveBatchSize
+
+        torch.set_num_threads(settings['num_threads'])
+        self.batch_size = settings['batch_size']
+        self.adaptive = AdaptiveBatchSize(settings['batch_size'], settings['batch_seconds'],
+                                          max_memory_mb=AUTOTUNE_CONFIG['max_memory_mb'] or None)
+        print(f"Using tuned sentiment settings: batch size {self.batch_size}, "
+              f"{settings['num_threads']} threads")
+
+    def autotune(self, texts, save=True):
+        """Calibrate on a sample of texts, apply the best settings and save them for this host"""
+        from Scripts.autotune import TuningStore, calibrate
+
+        settings = calibrate(self, texts)
+        if save:
+            TuningStore().save(self.model_name, settings)
+        self.apply_tuning(settings)
+        return settings
+
+    # -----------------------------
+    # Scoring
+    # -----------------------------
     def analyze(self, text):
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts, batch_size=None):
+        """
+        Score many texts at once.
+
+        Returns:
+            List of (label, score) tuples in input order; ("ERROR", 0.0) for failures.
+        """
+        texts = [str(text)[:self.max_chars] for text in texts]
+        if not texts:
+            return []
+
+        if self.client is not None:
+            try:
+                return self.client.score(texts)
+            except Exception as e:
+                metrics.inc("model_errors_total", len(texts), model="remote")
+                print(f"Sentiment server error: {e}")
+                return [("ERROR", 0.0)] * len(texts)
+
+        if batch_size:
+            return self._score(texts, batch_size)
+
+        if (self.autotune_mode == 'on' and self.adaptive is None
+                and len(texts) >= AUTOTUNE_CONFIG['sample_size']):
+            self.autotune(texts)
+
+        if self.adaptive is None or len(texts) == 1:
+            return self._score(texts, self.batch_size)
+
+        # One pipeline call per batch so each batch can pick up a new size
+        results = []
+        start = 0
+        while start < len(texts):
+            size = self.adaptive.batch_size
+            chunk = texts[start:start + size]
+            began = time.perf_counter()
+            results.extend(self._score(chunk, size))
+            self.adaptive.record(len(chunk), time.perf_counter() - began)
+            start += len(chunk)
+        self.batch_size = self.adaptive.batch_size
+        return results
+
+    def _score(self, texts, batch_size):
         try:
-            result = self.model(text[:512])[0]
-            return result['label'], result['score']
+            start = time.perf_counter()
+            results = self.model(texts, batch_size=batch_size, truncation=True)
+            metrics.observe("model_batch_seconds", time.perf_counter() - start,
+                            model="distilbert", batch_size=batch_size)
+            metrics.inc("model_rows_total", len(texts), model="distilbert")
+            return [(result['label'], result['score']) for result in results]
         except Exception:
-            return "ERROR", 0.0
+            if len(texts) == 1:
+                metrics.inc("model_errors_total", model="distilbert")
+                return [("ERROR", 0.0)]
+            # Fall back to one-by-one so a single bad review does not fail the batch
+            return [self._score([text], 1)[0] for text in texts]
 
     # <-- instance method
-    def extract_keywords(self, df, bank_col='bank_name', text_col='review_text', top_n=15, min_word_length=2):
+    @metrics.timed("extract_keywords")
+    def extract_keywords(self, df, bank_col='bank_name', text_col='review_text', top_n=15, min_word_length=2,
+                         index=None, start=None, end=None, corpus=None, workers=None):
           """
           Extract top meaningful keywords/phrases per bank using TF-IDF.
   
@@ -28,40 +242,37 @@ class SentimentAnalysis:
               text_col: column name for review text.
               top_n: number of top keywords/phrases to return per bank.
               min_word_length: minimum number of words in a phrase (to prefer multi-word phrases).
+              index: optional KeywordIndex; when given, answer from its stored counts
+                  for the banks in `df` instead of refitting a vectorizer.
+              start, end: optional date range (inclusive) for index queries.
+              corpus: optional TokenCorpus aligned with df rows (e.g. TopicModeling.corpus);
+                  when given, n-grams are built from its token ids instead of re-tokenizing.
+              workers: processes for the per-bank TF-IDF fits (default ANALYTICS_CONFIG['workers']).
   
           Returns:
               Dictionary with bank_name -> DataFrame of top keywords/phrases with TF-IDF scores.
           """
+          if index is not None:
+              return {
+                  bank: index.top_phrases(bank, start=start, end=end, top_n=top_n,
+                                          min_word_length=min_word_length)
+                  for bank in df[bank_col].unique()
+              }
+
           bank_keywords = {}
-          generic_words = {'app', 'bank', 'use', 'good', 'mobile', 'service', 'application'}
-  
-          for bank in df[bank_col].unique():
-              bank_reviews = df[df[bank_col] == bank][text_col].values
-  
-              vectorizer = TfidfVectorizer(
-                  stop_words='english',
-                  ngram_range=(1, 3),  # unigrams, bigrams, trigrams
-                  max_features=1000
-              )
-  
-              X = vectorizer.fit_transform(bank_reviews)
-              tfidf_scores = X.sum(axis=0).A1
-              feature_names = vectorizer.get_feature_names_out()
-  
-              tfidf_df = pd.DataFrame({
-                  'word': feature_names,
-                  'tfidf': tfidf_scores
-              }).sort_values(by='tfidf', ascending=False)
-  
-              # Filter out generic/common words
-              tfidf_df = tfidf_df[~tfidf_df['word'].isin(generic_words)]
-  
-              # Keep only phrases with at least `min_word_length` words
-              tfidf_df = tfidf_df[tfidf_df['word'].str.split().str.len() >= min_word_length]
-  
-              # Take top_n phrases
-              tfidf_df = tfidf_df.head(top_n).reset_index(drop=True)
-  
-              bank_keywords[bank] = tfidf_df
-  
-          return bank_keywords
\ No newline at end of file
+
+          if corpus is not None:
+              from Scripts.partitions import bank_groups
+
+              for bank, rows in bank_groups(df, bank_col).items():
+                  counts, names = corpus.ngram_matrix((1, 3), rows)  # unigrams, bigrams, trigrams
+                  columns, tfidf_scores = tfidf_column_sums(counts, max_features=1000)
+                  feature_names = [names[c] for c in columns]
+                  bank_keywords[bank] = rank_phrases(feature_names, tfidf_scores, top_n, min_word_length)
+              return bank_keywords
+
+          from Scripts.partitions import map_partitions
+
+          # One partition per bank, fitted in parallel when workers > 1
+          return map_partitions(bank_tfidf_keywords, df[[bank_col, text_col]], bank_col, workers,
+                                text_col=text_col, top_n=top_n, min_word_length=min_word_length)
@@ -0,0 +1,171 @@
+"""
+Shared Sentiment Scoring Server
+
+Holds one warm DistilBERT pipeline and serves it over localhost HTTP so that
+notebooks and batch jobs do not each load their own copy of the model.
+Concurrent requests are micro-batched: the batcher waits up to `max_wait_ms`
+or until `max_batch_size` texts are queued, then scores them in one call.
+
+Start it with:
+    python -m Scripts.cli serve-sentiment
+
+Clients pick it up transparently through SENTIMENT_SERVER_URL
+(e.g. http://127.0.0.1:8765), see SentimentAnalysis.
+"""
+
+import sys
+import os
+import json
+import time
+import queue
+import threading
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import SENTIMENT_CONFIG
+from Scripts.metrics import metrics
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class MicroBatcher:
+    """Collects concurrent scoring requests into batches for a single model"""
+
+    def __init__(self, score_fn, max_batch_size=None, max_wait_ms=None):
+        """
+        Args:
+            score_fn: callable taking a list of texts and returning a list of (label, score).
+            max_batch_size: flush as soon as this many texts are queued.
+            max_wait_ms: flush at the latest this long after the first queued request.
+        """
+        self.score_fn = score_fn
+        self.max_batch_size = max_batch_size or SENTIMENT_CONFIG['batch_size']
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else SENTIMENT_CONFIG['max_wait_ms']) / 1000.0
+        self.requests = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="sentiment-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, texts):
+        """Queue texts for scoring; returns a Future resolving to their results"""
+        future = Future()
+        self.requests.put((list(texts), future, time.perf_counter()))
+        return future
+
+    def _collect(self):
+        # Block for the first request, then fill the batch until size or deadline
+        batch = [self.requests.get()]
+        size = len(batch[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for item_texts, _, _ in batch for text in item_texts]
+            now = time.perf_counter()
+            for _, _, queued_at in batch:
+                metrics.observe("server_queue_wait_seconds", now - queued_at)
+            metrics.observe("server_batch_size", len(texts), buckets=BATCH_SIZE_BUCKETS)
+
+            try:
+                results = self.score_fn(texts)
+                if len(results) != len(texts):
+                    raise RuntimeError(f"Scorer returned {len(results)} results for {len(texts)} texts")
+            except Exception as e:
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future, _ in batch:
+                future.set_result(results[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+
+def make_handler(batcher, timeout):
+    """Build the request handler class bound to a batcher"""
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send_json(200, {'status': 'ok'})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != "/score":
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                texts = json.loads(self.rfile.read(length).decode("utf-8"))['texts']
+                if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                    raise ValueError("'texts' must be a list of strings")
+            except (ValueError, KeyError, TypeError) as e:
+                self._send_json(400, {'error': f"bad request: {e}"})
+                return
+
+            start = time.perf_counter()
+            try:
+                results = batcher.submit(texts).result(timeout=timeout)
+            except Exception as e:
+                metrics.inc("server_errors_total")
+                self._send_json(500, {'error': str(e)})
+                return
+            metrics.observe("server_request_seconds", time.perf_counter() - start)
+            metrics.inc("server_rows_total", len(texts))
+            self._send_json(200, {'results': [list(result) for result in results]})
+
+        def log_message(self, format, *args):
+            pass  # per-request access logs are covered by metrics
+
+    return ScoringHandler
+
+
+def serve(host=None, port=None, max_batch_size=None, max_wait_ms=None):
+    """Load the model once and serve it until interrupted"""
+    from Scripts.sentiment_analysis import SentimentAnalysis
+
+    host = host or SENTIMENT_CONFIG['server_host']
+    port = port or SENTIMENT_CONFIG['server_port']
+
+    # server_url=False forces a local model even if SENTIMENT_SERVER_URL is set
+    analyzer = SentimentAnalysis(server_url=False, batch_size=max_batch_size)
+    # Without --batch-size, batches follow the tuned size for this host (Scripts.autotune)
+    batcher = MicroBatcher(analyzer.analyze_batch, max_batch_size or analyzer.batch_size, max_wait_ms)
+    handler = make_handler(batcher, SENTIMENT_CONFIG['request_timeout'])
+
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"✅ Sentiment server listening on http://{host}:{port} "
+          f"(batch size {batcher.max_batch_size}, max wait {batcher.max_wait * 1000:.0f} ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nShutting down sentiment server...")
+    finally:
+        server.server_close()
+        metrics.flush()
+
+
+if __name__ == "__main__":
+    serve()
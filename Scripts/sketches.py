@@ -0,0 +1,298 @@
+"""
+Mergeable Streaming Sketches
+Fixed-size summaries that are updated one item at a time and merged exactly
+like the streams they summarise:
+
+- CountMinSketch: frequency estimates for any item (over-estimates only)
+- SpaceSaving: the top-k heavy hitters with guaranteed error bounds
+- HyperLogLog: number of distinct items (~1.6% error at precision 12)
+- TDigest: quantiles and CDF of a numeric stream, most accurate in the tails
+- BloomFilter: set membership (false positives only), e.g. reviews already counted
+
+Memory depends only on the sketch parameters, never on the stream length.
+`a.merge(b)` updates `a` in place so that it summarises both streams.
+"""
+
+import math
+import hashlib
+
+
+def hash64(item):
+    """Stable 64-bit hash of a string (same value in every process)"""
+    return int.from_bytes(hashlib.blake2b(str(item).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class CountMinSketch:
+    """depth x width counter table; estimate = min over the item's counters"""
+
+    def __init__(self, width=2048, depth=4):
+        import numpy as np
+
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self._rows = np.arange(depth)
+        self.total = 0
+
+    def _columns(self, item):
+        h = hash64(item)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1   # double hashing
+        return [(h1 + i * h2) % self.width for i in range(self.depth)]
+
+    def add(self, item, count=1):
+        self.table[self._rows, self._columns(item)] += count
+        self.total += count
+
+    def add_all(self, items):
+        """Add 1 for each item (vectorised over the items)"""
+        import numpy as np
+
+        if not items:
+            return
+        columns = np.array([self._columns(item) for item in items], dtype=np.int64)
+        np.add.at(self.table, (np.broadcast_to(self._rows, columns.shape), columns), 1)
+        self.total += len(items)
+
+    def estimate(self, item):
+        return int(self.table[self._rows, self._columns(item)].min())
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("Cannot merge count-min sketches of different shapes")
+        self.table += other.table
+        self.total += other.total
+        return self
+
+
+class SpaceSaving:
+    """Heavy-hitter summary keeping at most `capacity` monitored items"""
+
+    def __init__(self, capacity=200):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def _min_count(self):
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def add(self, item, count=1):
+        if item in self.counts:
+            self.counts[item] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+            return
+        # Replace the least frequent item; its count becomes the newcomer's error bound
+        victim = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(victim)
+        del self.errors[victim]
+        self.counts[item] = floor + count
+        self.errors[item] = floor
+
+    def merge(self, other):
+        """Mergeable summary merge (Agarwal et al.): absent items count as the other side's minimum"""
+        own_min, other_min = self._min_count(), other._min_count()
+        counts, errors = {}, {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = self.counts.get(item, own_min) + other.counts.get(item, other_min)
+            errors[item] = self.errors.get(item, own_min) + other.errors.get(item, other_min)
+        keep = sorted(counts, key=counts.get, reverse=True)[:self.capacity]
+        self.counts = {item: counts[item] for item in keep}
+        self.errors = {item: errors[item] for item in keep}
+        return self
+
+    def top(self, n=10):
+        """[(item, count upper bound, guaranteed lower bound)], most frequent first"""
+        items = sorted(self.counts, key=self.counts.get, reverse=True)[:n]
+        return [(item, self.counts[item], self.counts[item] - self.errors[item]) for item in items]
+
+
+class HyperLogLog:
+    """Distinct-count estimator with 2**precision one-byte registers"""
+
+    def __init__(self, precision=12):
+        import numpy as np
+
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, item):
+        h = hash64(item)
+        index = h >> (64 - self.precision)
+        rest = h & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self):
+        import numpy as np
+
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.exp2(-self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)   # linear counting for small cardinalities
+        return int(round(estimate))
+
+    def merge(self, other):
+        import numpy as np
+
+        if self.precision != other.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+
+class TDigest:
+    """Merging t-digest (Dunning) for quantiles of a numeric stream"""
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.means = []
+        self.weights = []
+        self.buffer = []
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, weight=1.0):
+        value = float(value)
+        if value != value:  # NaN
+            return
+        self.buffer.append((value, weight))
+        self.total += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self.buffer) >= 5 * self.compression:
+            self._compress()
+
+    def _k(self, q):
+        """k1 scale function: centroids are small near the tails, at most ~compression of them"""
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self):
+        if not self.buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self.buffer)
+        self.buffer = []
+
+        means, weights = [], []
+        cur_mean, cur_weight = points[0]
+        weight_before = 0.0
+        k_left = self._k(0.0)
+        for mean, weight in points[1:]:
+            proposed = cur_weight + weight
+            q_right = min((weight_before + proposed) / self.total, 1.0)
+            if self._k(q_right) - k_left <= 1:
+                cur_mean += (mean - cur_mean) * weight / proposed
+                cur_weight = proposed
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                weight_before += cur_weight
+                k_left = self._k(min(weight_before / self.total, 1.0))
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means, self.weights = means, weights
+
+    def merge(self, other):
+        other._compress()
+        self.buffer.extend(zip(other.means, other.weights))
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def mean(self):
+        self._compress()
+        if not self.total:
+            return None
+        return sum(m * w for m, w in zip(self.means, self.weights)) / self.total
+
+    def quantile(self, q):
+        """Estimated value at quantile q (0..1); None for an empty digest"""
+        self._compress()
+        if not self.means:
+            return None
+        if len(self.means) == 1:
+            return self.means[0]
+
+        target = q * self.total
+        cumulative = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            center = cumulative + weight / 2
+            if target < center:
+                span = center - prev_center
+                fraction = (target - prev_center) / span if span else 0.0
+                return prev_mean + fraction * (mean - prev_mean)
+            cumulative += weight
+            prev_center, prev_mean = center, mean
+        span = self.total - prev_center
+        fraction = (target - prev_center) / span if span else 1.0
+        return prev_mean + fraction * (self.max - prev_mean)
+
+    def cdf(self, value):
+        """Estimated fraction of the stream <= value"""
+        self._compress()
+        if not self.means:
+            return None
+        if value < self.min:
+            return 0.0
+        if value >= self.max:
+            return 1.0
+
+        cumulative = 0.0
+        prev_center, prev_mean = 0.0, self.min
+        for mean, weight in zip(self.means, self.weights):
+            center = cumulative + weight / 2
+            if value < mean:
+                span = mean - prev_mean
+                fraction = (value - prev_mean) / span if span else 1.0
+                return (prev_center + fraction * (center - prev_center)) / self.total
+            cumulative += weight
+            prev_center, prev_mean = center, mean
+        span = self.max - prev_mean
+        fraction = (value - prev_mean) / span if span else 1.0
+        return (prev_center + fraction * (self.total - prev_center)) / self.total
+
+
+class BloomFilter:
+    """Bit array membership test sized for `capacity` items at `error_rate` false positives"""
+
+    def __init__(self, capacity=1_000_000, error_rate=0.001):
+        import numpy as np
+
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _positions(self, item):
+        h = hash64(item)
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1   # double hashing
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] >> (p & 7) & 1 for p in self._positions(item))
+
+    def add(self, item):
+        """Add item; returns False if it was (probably) present already"""
+        positions = self._positions(item)
+        present = all(self.bits[p >> 3] >> (p & 7) & 1 for p in positions)
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        return not present
+
+    def merge(self, other):
+        import numpy as np
+
+        if (self.size, self.hashes) != (other.size, other.hashes):
+            raise ValueError("Cannot merge Bloom filters of different shapes")
+        np.bitwise_or(self.bits, other.bits, out=self.bits)
+        return self
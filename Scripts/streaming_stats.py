@@ -0,0 +1,282 @@
+"""
+Streaming Per-Bank Review Statistics
+Approximate dashboard numbers kept per (bank, day) as mergeable sketches.
+
+Every review added to a StreamingAggregator updates its (bank, day) bucket:
+- phrases (stopword-filtered 1..ngram_max grams): count-min sketch + Space-Saving top-k
+- distinct users: HyperLogLog
+- rating and sentiment score distributions: t-digests
+- review count, exact rating / sentiment label / theme counts (a handful of keys each)
+
+Producers (the scraper, the CSV loader) write their updates as shard files
+under DATA_PATHS['sketches']/<stream>/. `StreamingAggregator.load(stream)`
+merges all shards, and queries merge the buckets of any bank and date range,
+so memory and query time are independent of the number of reviews.
+
+Only HyperLogLog is unaffected by adding a review twice, so producers pass the
+review's id: a review already counted in the stream (a re-scrape of the newest
+reviews, a reloaded CSV) is skipped. The ids counted so far are kept as a
+Bloom filter per stream (<stream>/seen.bloom), updated under a file lock with
+every flush. discard() drops the updates of a failed run instead of flushing.
+
+Streams:
+    scraped  - reviews as they are scraped (no sentiment yet)
+    loaded   - analysed reviews as they are loaded into Postgres
+"""
+
+import sys
+import os
+import glob
+import time
+import pickle
+from collections import Counter
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, SKETCH_CONFIG
+from Scripts.metrics import metrics
+from Scripts.sketches import CountMinSketch, SpaceSaving, HyperLogLog, TDigest, BloomFilter
+from Scripts.file_lock import file_lock
+from Scripts.stopwords import ENGLISH_STOPWORDS
+from Scripts.token_corpus import TOKEN_PATTERN
+
+
+def day_key(value):
+    """'YYYY-MM-DD' for a date, datetime, pandas Timestamp or date-like string"""
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y-%m-%d")
+    return str(value)[:10]
+
+
+def _number(value):
+    """float(value), or None for missing values (None, '', NaN)"""
+    if value is None or value == "":
+        return None
+    value = float(value)
+    return None if value != value else value
+
+
+def phrases_of(text, ngram_max):
+    tokens = [token for token in TOKEN_PATTERN.findall(str(text).lower()) if token not in ENGLISH_STOPWORDS]
+    for n in range(1, ngram_max + 1):
+        for i in range(len(tokens) - n + 1):
+            yield " ".join(tokens[i:i + n])
+
+
+class ReviewSketch:
+    """All sketches for one bucket of reviews"""
+
+    def __init__(self):
+        self.reviews = 0
+        self.phrase_counts = CountMinSketch(SKETCH_CONFIG['cms_width'], SKETCH_CONFIG['cms_depth'])
+        self.top_phrases = SpaceSaving(SKETCH_CONFIG['top_k'])
+        self.users = HyperLogLog(SKETCH_CONFIG['hll_precision'])
+        self.rating = TDigest(SKETCH_CONFIG['tdigest_compression'])
+        self.sentiment_score = TDigest(SKETCH_CONFIG['tdigest_compression'])
+        self.ratings = Counter()
+        self.sentiment_labels = Counter()
+        self.themes = Counter()
+
+    def add(self, text=None, user=None, rating=None, sentiment_label=None, sentiment_score=None, theme=None):
+        self.reviews += 1
+        if text:
+            phrases = list(phrases_of(text, SKETCH_CONFIG['ngram_max']))
+            self.phrase_counts.add_all(phrases)
+            for phrase in phrases:
+                self.top_phrases.add(phrase)
+        if user:
+            self.users.add(user)
+        rating = _number(rating)
+        if rating is not None:
+            self.rating.add(rating)
+            self.ratings[int(rating)] += 1
+        if sentiment_label:
+            self.sentiment_labels[sentiment_label] += 1
+        sentiment_score = _number(sentiment_score)
+        if sentiment_score is not None:
+            self.sentiment_score.add(sentiment_score)
+        if theme:
+            self.themes[theme] += 1
+
+    def merge(self, other):
+        self.reviews += other.reviews
+        self.phrase_counts.merge(other.phrase_counts)
+        self.top_phrases.merge(other.top_phrases)
+        self.users.merge(other.users)
+        self.rating.merge(other.rating)
+        self.sentiment_score.merge(other.sentiment_score)
+        self.ratings.update(other.ratings)
+        self.sentiment_labels.update(other.sentiment_labels)
+        self.themes.update(other.themes)
+        return self
+
+    def summary(self, top_n=10):
+        """Dashboard numbers for this bucket"""
+        labelled = sum(self.sentiment_labels.values())
+        return {
+            'reviews': self.reviews,
+            'distinct_users': self.users.count(),
+            'rating_mean': self.rating.mean(),
+            'rating_median': self.rating.quantile(0.5),
+            'rating_distribution': dict(sorted(self.ratings.items())),
+            'sentiment_shares': {
+                label: count / labelled for label, count in self.sentiment_labels.most_common()
+            } if labelled else {},
+            'sentiment_score_quantiles': {
+                q: self.sentiment_score.quantile(q) for q in (0.1, 0.5, 0.9)
+            },
+            'top_themes': self.themes.most_common(top_n),
+            # Space-Saving and count-min both over-estimate: report the tighter bound
+            'top_phrases': [
+                (phrase, min(count, self.phrase_counts.estimate(phrase)))
+                for phrase, count, _ in self.top_phrases.top(top_n)
+            ]
+        }
+
+
+class StreamingAggregator:
+    """(bank, day) -> ReviewSketch buckets for one stream, persisted as mergeable shards"""
+
+    def __init__(self, stream, sketch_dir=None):
+        """
+        Args:
+            stream (str): stream name, e.g. 'scraped' or 'loaded'.
+            sketch_dir (str): root directory of all streams (default DATA_PATHS['sketches']).
+        """
+        self.stream = stream
+        self.sketch_dir = sketch_dir or DATA_PATHS['sketches']
+        self.stream_dir = os.path.join(self.sketch_dir, stream)
+        self.seen_path = os.path.join(self.stream_dir, "seen.bloom")
+        self.buckets = {}
+        self._seen = None
+        self._pending_ids = set()
+
+    # -----------------------------
+    # Updates
+    # -----------------------------
+    def _load_seen(self):
+        if os.path.exists(self.seen_path):
+            with open(self.seen_path, "rb") as f:
+                return pickle.load(f)
+        return BloomFilter(SKETCH_CONFIG['seen_capacity'], SKETCH_CONFIG['seen_error_rate'])
+
+    @property
+    def seen(self):
+        """Bloom filter of the review ids already flushed to this stream (loaded on first use)"""
+        if self._seen is None:
+            self._seen = self._load_seen()
+        return self._seen
+
+    def add(self, bank, day, review_id=None, **fields):
+        """
+        Add one review; fields are those of ReviewSketch.add.
+
+        Returns False (and adds nothing) if review_id was already counted in
+        this stream. Reviews without an id are always added.
+        """
+        if review_id is not None and review_id == review_id and review_id != "":
+            review_id = str(review_id)
+            if review_id in self._pending_ids or review_id in self.seen:
+                metrics.inc("sketch_duplicates_skipped_total", stream=self.stream)
+                return False
+            self._pending_ids.add(review_id)
+        key = (bank, day_key(day))
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = ReviewSketch()
+        bucket.add(**fields)
+        return True
+
+    def discard(self):
+        """Drop the updates since the last flush (e.g. of a scrape that failed)"""
+        self.buckets = {}
+        self._pending_ids = set()
+
+    def merge(self, other):
+        for key, bucket in other.buckets.items():
+            if key in self.buckets:
+                self.buckets[key].merge(bucket)
+            else:
+                self.buckets[key] = bucket
+        return self
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def flush(self):
+        """Write the buckets accumulated since the last flush as a new shard and reset"""
+        if not self.buckets:
+            return None
+        os.makedirs(self.stream_dir, exist_ok=True)
+        path = os.path.join(self.stream_dir, f"{time.time_ns()}-{os.getpid()}.pkl")
+        with file_lock(self.seen_path):
+            with open(path + ".tmp", "wb") as f:
+                pickle.dump(self.buckets, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(path + ".tmp", path)
+
+            # Other producers may have flushed meanwhile: merge into the current filter
+            if self._pending_ids:
+                seen = self._load_seen()
+                for review_id in self._pending_ids:
+                    seen.add(review_id)
+                with open(self.seen_path + ".tmp", "wb") as f:
+                    pickle.dump(seen, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(self.seen_path + ".tmp", self.seen_path)
+                self._seen = seen
+        metrics.inc("sketch_shards_written_total", stream=self.stream)
+        self.buckets = {}
+        self._pending_ids = set()
+        return path
+
+    def _shards(self):
+        return sorted(glob.glob(os.path.join(self.stream_dir, "*.pkl")))
+
+    @classmethod
+    def load(cls, stream, sketch_dir=None):
+        """Aggregator holding the merge of every shard written to the stream"""
+        aggregator = cls(stream, sketch_dir)
+        with metrics.timer("sketch_load", stream=stream) as t:
+            shards = aggregator._shards()
+            for path in shards:
+                with open(path, "rb") as f:
+                    aggregator.merge(cls._from_buckets(stream, sketch_dir, pickle.load(f)))
+            t.rows_in = len(shards)
+            t.rows_out = len(aggregator.buckets)
+        return aggregator
+
+    @classmethod
+    def _from_buckets(cls, stream, sketch_dir, buckets):
+        aggregator = cls(stream, sketch_dir)
+        aggregator.buckets = buckets
+        return aggregator
+
+    def compact(self):
+        """Merge all shards of the stream into one; shards written meanwhile are kept"""
+        shards = self._shards()
+        merged = StreamingAggregator.load(self.stream, self.sketch_dir)
+        merged.flush()
+        for path in shards:
+            os.remove(path)
+
+    # -----------------------------
+    # Queries
+    # -----------------------------
+    def banks(self):
+        return sorted({bank for bank, _ in self.buckets})
+
+    def merged(self, bank=None, start=None, end=None):
+        """One ReviewSketch merging the buckets of a bank (or all) and date range (inclusive)"""
+        start = day_key(start) if start is not None else None
+        end = day_key(end) if end is not None else None
+        result = ReviewSketch()
+        for (bucket_bank, day), bucket in self.buckets.items():
+            if bank is not None and bucket_bank != bank:
+                continue
+            if (start and day < start) or (end and day > end):
+                continue
+            result.merge(bucket)
+        return result
+
+    def summary(self, bank=None, start=None, end=None, top_n=10):
+        return self.merged(bank, start, end).summary(top_n)
@@ -0,0 +1,270 @@
+"""
+Bitmask Theme Encoding
+Multiple themes per review stored as one 64-bit integer.
+
+ThemeRegistry assigns every theme name a fixed bit (in registration order,
+never reused) and persists the mapping, so masks keep their meaning across
+runs. "Other" (no theme) is the empty mask 0. The predefined themes
+(Scripts.topic_modeling.THEME_KEYWORDS) are always registered first, in their
+canonical order.
+
+- ThemeRegistry: the mapping in a local JSON file, for the DataFrame
+  `theme_mask` column of the CSV pipeline. Updates are made under a file lock,
+  so processes on one machine agree.
+- DatabaseThemeRegistry: the mapping in the Postgres `theme_bits` table, for
+  the shared `reviews.theme_mask BIGINT` column. New bits are handed out in a
+  transaction holding a table lock, so every host and process agrees. The
+  loader and the backfill use it.
+
+Filters and pivots are integer array operations:
+    has_any(masks, ["Customer Support", "Transaction Performance"], registry)
+    has_all(masks, [...], registry)
+    theme_counts(masks, registry)     # reviews per theme (popcount of each bit)
+"""
+
+import sys
+import os
+import re
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS
+from Scripts.file_lock import file_lock
+
+# Bit 63 is the sign bit of a Postgres BIGINT; keep masks non-negative
+MAX_THEMES = 63
+NO_THEME = "Other"
+SEPARATORS = re.compile(r"\s*[,;]\s*")
+
+
+def _predefined_themes():
+    from Scripts.topic_modeling import THEME_KEYWORDS  # imports this module
+    return list(THEME_KEYWORDS)
+
+
+class ThemeRegistry:
+    """Stable theme name <-> bit mapping, kept in a local JSON file"""
+
+    def __init__(self, themes=(), path=None):
+        """
+        Args:
+            themes: theme names in bit order.
+            path (str): JSON file the registry is saved to when themes are added.
+        """
+        self.path = path
+        self._reset(themes)
+
+    def _reset(self, themes):
+        self.themes = []
+        self._bits = {}
+        for theme in themes:
+            self._add(theme)
+
+    @classmethod
+    def load(cls, path=None):
+        """Registry saved at path (default DATA_PATHS['theme_registry']), predefined themes first"""
+        registry = cls((), path or DATA_PATHS['theme_registry'])
+        registry._reset(registry._stored_themes())
+        registry.register(_predefined_themes())
+        return registry
+
+    def _stored_themes(self):
+        if not os.path.exists(self.path):
+            return []
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)['themes']
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({'themes': self.themes}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def _store(self, new_themes):
+        """Assign bits to new themes, re-reading the file under its lock first"""
+        if not self.path:
+            for theme in new_themes:
+                self._add(theme)
+            return
+        with file_lock(self.path):
+            # Another process may have added themes since we loaded; their bits stand
+            self._reset(self._stored_themes())
+            for theme in new_themes:
+                if theme not in self._bits:
+                    self._add(theme)
+            self.save()
+
+    def __len__(self):
+        return len(self.themes)
+
+    def _add(self, theme):
+        if len(self.themes) >= MAX_THEMES:
+            raise ValueError(f"A theme mask holds at most {MAX_THEMES} themes")
+        self._bits[theme] = len(self.themes)
+        self.themes.append(theme)
+
+    def register(self, themes):
+        """Give new theme names the next free bits (and store them); returns their bits"""
+        new_themes = [theme for theme in dict.fromkeys(themes) if theme != NO_THEME and theme not in self._bits]
+        if new_themes:
+            self._store(new_themes)
+        return [self._bits.get(theme) for theme in themes]
+
+    def bit(self, theme):
+        if theme not in self._bits:
+            raise KeyError(f"Unknown theme '{theme}'")
+        return self._bits[theme]
+
+    # -----------------------------
+    # Encoding
+    # -----------------------------
+    @staticmethod
+    def _names(value):
+        """Theme names from a list or a comma/semicolon separated string"""
+        if value is None or value != value:  # None / NaN
+            return []
+        if isinstance(value, str):
+            return [name for name in SEPARATORS.split(value.strip()) if name]
+        return list(value)
+
+    def mask_of(self, themes, register=True):
+        """Mask for a list of theme names (or a separated string)"""
+        names = [name for name in self._names(themes) if name != NO_THEME]
+        if register:
+            self.register(names)
+        mask = 0
+        for name in names:
+            mask |= 1 << self.bit(name)
+        return mask
+
+    def names_of(self, mask):
+        """Theme names set in a mask, in bit order"""
+        mask = int(mask)
+        return [theme for bit, theme in enumerate(self.themes) if mask >> bit & 1]
+
+    def encode(self, values, register=True):
+        """int64 mask per value (lists of names or separated strings)"""
+        import numpy as np
+
+        cache = {}
+        masks = np.zeros(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            key = value if isinstance(value, str) else tuple(self._names(value))
+            if key not in cache:
+                cache[key] = self.mask_of(value, register)
+            masks[i] = cache[key]
+        return masks
+
+    def decode(self, masks):
+        """List of theme names per mask"""
+        cache = {}
+        names = []
+        for mask in masks:
+            mask = int(mask)
+            if mask not in cache:
+                cache[mask] = self.names_of(mask)
+            names.append(cache[mask])
+        return names
+
+    def mask_for(self, themes):
+        """Combined mask of known theme names (for filters; unknown names raise KeyError)"""
+        mask = 0
+        for theme in ([themes] if isinstance(themes, str) else themes):
+            mask |= 1 << self.bit(theme)
+        return mask
+
+
+class DatabaseThemeRegistry(ThemeRegistry):
+    """Stable theme name <-> bit mapping, kept in the Postgres `theme_bits` table"""
+
+    def __init__(self, themes=(), connect=None):
+        """
+        Args:
+            themes: theme names in bit order.
+            connect: callable returning a new Postgres connection (default get_connection).
+        """
+        super().__init__(themes)
+        self._connect = connect
+
+    def _connection(self):
+        if self._connect is not None:
+            return self._connect()
+        from config.db_config import get_connection
+        return get_connection()
+
+    @classmethod
+    def load(cls, connect=None):
+        """Registry stored in `theme_bits`, predefined themes first"""
+        registry = cls((), connect)
+        conn = registry._connection()
+        try:
+            registry._reset(registry._stored_themes(conn.cursor()))
+            conn.commit()
+        finally:
+            conn.close()
+        registry.register(_predefined_themes())
+        return registry
+
+    @staticmethod
+    def _stored_themes(cur):
+        cur.execute("SELECT theme FROM theme_bits ORDER BY bit")
+        return [theme for theme, in cur.fetchall()]
+
+    def save(self):
+        """Bits are stored as they are assigned (see _store)"""
+
+    def _store(self, new_themes):
+        """Assign bits to new themes in one transaction holding the table lock"""
+        conn = self._connection()
+        try:
+            cur = conn.cursor()
+            # Readers are not blocked; concurrent registrations take turns
+            cur.execute("LOCK TABLE theme_bits IN EXCLUSIVE MODE")
+            self._reset(self._stored_themes(cur))
+            for theme in new_themes:
+                if theme not in self._bits:
+                    self._add(theme)
+                    cur.execute("INSERT INTO theme_bits (theme, bit) VALUES (%s, %s)", (theme, self._bits[theme]))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+
+
+# -----------------------------
+# Vectorised helpers
+# -----------------------------
+def _as_masks(masks):
+    import numpy as np
+    return np.asarray(masks, dtype=np.int64)
+
+
+def has_any(masks, themes, registry):
+    """Boolean array: review has at least one of the themes"""
+    return (_as_masks(masks) & registry.mask_for(themes)) != 0
+
+
+def has_all(masks, themes, registry):
+    """Boolean array: review has every one of the themes"""
+    wanted = registry.mask_for(themes)
+    return (_as_masks(masks) & wanted) == wanted
+
+
+def theme_counts(masks, registry):
+    """Number of reviews carrying each theme, as a Series indexed by theme name"""
+    import numpy as np
+    import pandas as pd
+
+    masks = np.ascontiguousarray(_as_masks(masks))
+    # One row of 64 bits per review (bit i of the mask = column i), summed per column
+    bits = np.unpackbits(masks.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    counts = bits.sum(axis=0, dtype=np.int64)
+    if sys.byteorder == "big":
+        counts = counts.reshape(8, 8)[::-1].ravel()
+    return pd.Series(counts[:len(registry)], index=registry.themes, name="reviews")
@@ -0,0 +1,150 @@
+"""
+Embedding Theme Classifier
+Multi-label theme assignment by similarity to theme centroids.
+
+Each theme is described by a few labelled seed reviews. A theme's centroid is
+the normalised mean of its seeds' embeddings, and every review is scored
+against all centroids with one matrix multiply:
+
+    scores = review_vectors (n x dim) @ centroids.T (dim x n_themes)
+
+A review gets every theme whose score reaches that theme's threshold; its
+primary theme is the best-scoring qualifying one ("Other" if none qualifies).
+Review embeddings are cached in the EmbeddingStore used by semantic search
+(keyed by review id and text hash, so an edited review is embedded again), so
+editing themes only re-embeds the seeds and repeats the multiply.
+
+Seeds file (JSON):
+    {"themes": {"Customer Support": ["the agent never answered", ...], ...},
+     "thresholds": {"Customer Support": 0.4}}
+Without a seeds file, each predefined theme's keywords (TopicModeling's
+THEME_KEYWORDS) serve as its seeds.
+"""
+
+import sys
+import os
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, THEME_CLASSIFIER_CONFIG
+from Scripts.metrics import metrics
+from Scripts.embeddings import EmbeddingStore, ReviewEmbedder
+from Scripts.topic_modeling import THEME_KEYWORDS
+
+OTHER_THEME = "Other"
+
+
+class EmbeddingThemeClassifier:
+    """Assigns one or more themes per review from seed-review centroids"""
+
+    def __init__(self, seeds, thresholds=None, embedder=None, store_dir=None):
+        """
+        Args:
+            seeds (dict): theme -> list of seed review texts (order = theme order).
+            thresholds (dict): theme -> minimum cosine similarity; missing themes use
+                THEME_CLASSIFIER_CONFIG['threshold'].
+            embedder: ReviewEmbedder; created on first use.
+            store_dir (str): embedding cache directory (default DATA_PATHS['embeddings']).
+        """
+        self.store = EmbeddingStore(store_dir)
+        self._embedder = embedder
+        self.themes = []
+        self.centroids = None
+        self.thresholds = None
+        self.set_themes(seeds, thresholds)
+
+    @classmethod
+    def from_file(cls, path=None, **kwargs):
+        """Classifier from a seeds file; the keyword themes if no path is given and none is saved"""
+        if path is None and not os.path.exists(DATA_PATHS['theme_seeds']):
+            print(f"No theme seeds at {DATA_PATHS['theme_seeds']}; using the predefined theme keywords")
+            return cls(THEME_KEYWORDS, **kwargs)
+        with open(path or DATA_PATHS['theme_seeds'], "r", encoding="utf-8") as f:
+            spec = json.load(f)
+        return cls(spec['themes'], spec.get('thresholds'), **kwargs)
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = ReviewEmbedder(self.store.meta['model'])
+        return self._embedder
+
+    # -----------------------------
+    # Themes
+    # -----------------------------
+    def set_themes(self, seeds, thresholds=None):
+        """(Re)build the centroid matrix; only the seed reviews are embedded"""
+        import numpy as np
+
+        self.themes = list(seeds)
+        centroids = []
+        for theme in self.themes:
+            if not seeds[theme]:
+                raise ValueError(f"Theme '{theme}' has no seed reviews")
+            centroid = self.embedder.encode(seeds[theme]).mean(axis=0)
+            centroids.append(centroid / max(np.linalg.norm(centroid), 1e-12))
+        self.centroids = np.vstack(centroids).astype(np.float32)
+
+        thresholds = thresholds or {}
+        default = THEME_CLASSIFIER_CONFIG['threshold']
+        self.thresholds = np.array([thresholds.get(theme, default) for theme in self.themes],
+                                   dtype=np.float32)
+
+    # -----------------------------
+    # Review embeddings (cached)
+    # -----------------------------
+    def review_vectors(self, df, id_col='review_id', text_col='review_text', bank_col='bank_name'):
+        """
+        float32 (len(df), dim) embeddings, encoding only reviews missing from the cache
+        or whose text changed since they were cached
+        """
+        import numpy as np
+
+        ids = df[id_col].astype(str).tolist()
+        texts = df[text_col].fillna("").astype(str).tolist()
+        last_row = {review_id: i for i, review_id in enumerate(ids)}
+        missing = sorted({last_row[ids[i]] for i in self.store.missing(ids, texts)})
+        if missing:
+            banks = df[bank_col].iloc[missing].tolist() if bank_col in df else [""] * len(missing)
+            vectors = self.embedder.encode([texts[i] for i in missing])
+            self.store.append([ids[i] for i in missing], banks, vectors, self.embedder.model_name,
+                              [texts[i] for i in missing])
+        metrics.cache_hit("embeddings", hit=not missing)
+
+        rows = np.fromiter((self.store.row_of(review_id) for review_id in ids), dtype=np.int64, count=len(ids))
+        return np.asarray(self.store.vectors[rows], dtype=np.float32)
+
+    # -----------------------------
+    # Classification
+    # -----------------------------
+    def scores(self, vectors):
+        """Cosine similarity of each review to each theme centroid (n x n_themes)"""
+        return vectors @ self.centroids.T
+
+    def classify(self, vectors):
+        """
+        Returns:
+            (primary theme per review, list of qualifying themes per review)
+        """
+        import numpy as np
+
+        scores = self.scores(vectors)
+        qualifies = scores >= self.thresholds
+        # Qualifying themes per review, best score first
+        order = np.argsort(-scores, axis=1, kind="stable")
+        labels = [
+            [self.themes[t] for t in row_order if row_qualifies[t]]
+            for row_order, row_qualifies in zip(order.tolist(), qualifies.tolist())
+        ]
+        # The best-scoring theme may miss its own threshold while a runner-up clears its
+        primary = [themes[0] if themes else OTHER_THEME for themes in labels]
+        return primary, labels
+
+    def assign_themes(self, df, id_col='review_id', text_col='review_text'):
+        """Set df['theme'] (primary theme) and df['themes'] (all qualifying themes)"""
+        with metrics.timer("classify_themes") as t:
+            vectors = self.review_vectors(df, id_col, text_col)
+            df["theme"], df["themes"] = self.classify(vectors)
+            t.rows_in = t.rows_out = len(df)
+        return df
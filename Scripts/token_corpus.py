@@ -0,0 +1,263 @@
+"""
+Shared Token Corpus
+Tokenize every review once into integer token ids with a shared vocabulary.
+
+Layout (CSR-style, memory-mappable):
+    ids.npy      int32   token ids of all reviews, concatenated
+    offsets.npy  int64   review i spans ids[offsets[i]:offsets[i + 1]]
+    vocab.json           token id -> token string
+
+Theme matching, keyword extraction and LDA all read this structure instead of
+re-tokenizing the review text. Tokens are lowercased words (letters, digits and
+apostrophes) with the bundled English stopwords removed.
+"""
+
+import sys
+import os
+import re
+import json
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from Scripts.stopwords import ENGLISH_STOPWORDS
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Up to three token ids are packed into one int64 to identify an n-gram
+NGRAM_BITS = 21
+
+
+class TokenCorpus:
+    """Integer-encoded token corpus aligned with the rows of a reviews DataFrame"""
+
+    def __init__(self, vocab, offsets, ids):
+        """
+        Args:
+            vocab (list): token strings; position = token id.
+            offsets (np.ndarray): int64 document boundaries, length n_docs + 1.
+            ids (np.ndarray): int32 token ids of all documents.
+        """
+        self.vocab = list(vocab)
+        self.offsets = offsets
+        self.ids = ids
+        self._token_index = None
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    # -----------------------------
+    # Building / persistence
+    # -----------------------------
+    @classmethod
+    def build(cls, texts, stop_words=ENGLISH_STOPWORDS):
+        """Tokenize texts once into a new corpus"""
+        import numpy as np
+
+        token_index = {}
+        vocab = []
+        ids = []
+        offsets = [0]
+        for text in texts:
+            if not isinstance(text, str):
+                text = "" if text is None or text != text else str(text)  # NaN check
+            for token in TOKEN_PATTERN.findall(text.lower()):
+                if token in stop_words:
+                    continue
+                token_id = token_index.get(token)
+                if token_id is None:
+                    token_id = token_index[token] = len(vocab)
+                    vocab.append(token)
+                ids.append(token_id)
+            offsets.append(len(ids))
+
+        corpus = cls(vocab, np.asarray(offsets, dtype=np.int64), np.asarray(ids, dtype=np.int32))
+        corpus._token_index = token_index
+        return corpus
+
+    def save(self, path):
+        """Write the corpus to a directory"""
+        import numpy as np
+
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, "ids.npy"), self.ids)
+        np.save(os.path.join(path, "offsets.npy"), self.offsets)
+        with open(os.path.join(path, "vocab.json"), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Load a corpus; with mmap=True the arrays are memory-mapped read-only"""
+        import numpy as np
+
+        mode = "r" if mmap else None
+        with open(os.path.join(path, "vocab.json"), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        return cls(
+            vocab,
+            np.load(os.path.join(path, "offsets.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "ids.npy"), mmap_mode=mode)
+        )
+
+    # -----------------------------
+    # Access
+    # -----------------------------
+    @property
+    def token_index(self):
+        if self._token_index is None:
+            self._token_index = {token: i for i, token in enumerate(self.vocab)}
+        return self._token_index
+
+    def doc(self, i):
+        """Token ids of document i"""
+        return self.ids[self.offsets[i]:self.offsets[i + 1]]
+
+    def tokens(self, i):
+        """Token strings of document i"""
+        return [self.vocab[token_id] for token_id in self.doc(i)]
+
+    def doc_index(self):
+        """Document number of every position in `ids`"""
+        import numpy as np
+        return np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.offsets))
+
+    def bows(self, rows=None, token2id=None):
+        """
+        Bag-of-words per document as gensim-style [(token_id, count), ...] lists.
+
+        Args:
+            token2id (dict): token -> id of another vocabulary (e.g. a trained model's
+                Dictionary.token2id); ids are translated and unknown tokens dropped,
+                like Dictionary.doc2bow.
+        """
+        import numpy as np
+
+        mapping = None
+        if token2id is not None:
+            mapping = np.fromiter((token2id.get(token, -1) for token in self.vocab),
+                                  dtype=np.int64, count=len(self.vocab))
+
+        rows = range(len(self)) if rows is None else rows
+        bows = []
+        for i in rows:
+            doc = self.doc(i)
+            if mapping is not None:
+                doc = mapping[doc]
+                doc = doc[doc >= 0]
+            token_ids, counts = np.unique(doc, return_counts=True)
+            bows.append(list(zip(token_ids.tolist(), counts.tolist())))
+        return bows
+
+    def gensim_dictionary(self):
+        """gensim Dictionary whose ids are this corpus' token ids"""
+        from gensim.corpora.dictionary import Dictionary
+        return Dictionary.from_corpus(self.bows(), id2word=dict(enumerate(self.vocab)))
+
+    # -----------------------------
+    # Analytics on token ids
+    # -----------------------------
+    def ngram_matrix(self, ngram_range=(1, 3), rows=None):
+        """
+        Document x n-gram count matrix over the given documents.
+
+        Returns:
+            (scipy.sparse.csr_matrix, list of n-gram strings)
+        """
+        import numpy as np
+        import scipy.sparse as sp
+
+        if len(self.vocab) >= 2 ** NGRAM_BITS - 1 or ngram_range[1] * NGRAM_BITS > 63:
+            raise ValueError("Vocabulary or n-gram size too large to pack n-grams")
+
+        if rows is None:
+            rows = np.arange(len(self))
+        rows = np.asarray(rows, dtype=np.int64)
+        starts, ends = self.offsets[rows], self.offsets[rows + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts - np.cumsum(np.r_[0, lengths[:-1]]), lengths) + np.arange(lengths.sum())
+        ids = self.ids[positions].astype(np.int64) + 1          # 0 is reserved for "no token"
+        docs = np.repeat(np.arange(len(rows)), lengths)
+
+        codes, code_docs = [], []
+        min_n, max_n = ngram_range
+        for n in range(min_n, max_n + 1):
+            if len(ids) < n:
+                continue
+            valid = docs[:len(ids) - n + 1] == docs[n - 1:]    # n-gram does not cross documents
+            code = np.zeros(len(ids) - n + 1, dtype=np.int64)
+            for k in range(n):
+                code |= ids[k:len(ids) - n + 1 + k] << (NGRAM_BITS * (max_n - 1 - k))
+            codes.append(code[valid])
+            code_docs.append(docs[:len(ids) - n + 1][valid])
+
+        if not codes:
+            return sp.csr_matrix((len(rows), 0), dtype=np.int64), []
+
+        codes = np.concatenate(codes)
+        code_docs = np.concatenate(code_docs)
+        unique_codes, columns = np.unique(codes, return_inverse=True)
+        matrix = sp.csr_matrix(
+            (np.ones(len(codes), dtype=np.int64), (code_docs, columns)),
+            shape=(len(rows), len(unique_codes))
+        )
+
+        mask = (1 << NGRAM_BITS) - 1
+        names = []
+        for code in unique_codes.tolist():
+            parts = [(code >> (NGRAM_BITS * (max_n - 1 - k))) & mask for k in range(max_n)]
+            names.append(" ".join(self.vocab[part - 1] for part in parts if part))
+        return matrix, names
+
+    def match_phrases(self, phrase_groups):
+        """
+        For each document, the index of the first group with a phrase occurring
+        as a substring of the document's space-joined tokens (-1 if none).
+
+        Same result as `any(k in " ".join(tokens) for k in group)` checked group by
+        group, but computed once per vocabulary entry and vectorized over documents.
+
+        Args:
+            phrase_groups (list of list of str): groups in priority order.
+        """
+        import numpy as np
+
+        n_docs = len(self)
+        no_match = len(phrase_groups)
+        best = np.full(n_docs, no_match, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.where(best == no_match, -1, best)
+
+        docs = self.doc_index()
+
+        # Single words match inside one token: resolve them on the vocabulary
+        term_group = np.full(len(self.vocab), no_match, dtype=np.int64)
+        for group_id in range(len(phrase_groups) - 1, -1, -1):
+            words = [phrase for phrase in phrase_groups[group_id] if " " not in phrase]
+            if not words:
+                continue
+            hits = np.fromiter(
+                (any(word in token for word in words) for token in self.vocab),
+                dtype=bool, count=len(self.vocab)
+            )
+            term_group[hits] = group_id
+        np.minimum.at(best, docs, term_group[self.ids])
+
+        # Multi-word phrases span consecutive tokens: the first token must end with the
+        # first word, middle tokens must equal the middle words, the last must start with the last word
+        for group_id, group in enumerate(phrase_groups):
+            for phrase in group:
+                words = phrase.split(" ")
+                if len(words) < 2 or len(self.ids) < len(words):
+                    continue
+                span = len(self.ids) - len(words) + 1
+                hit = docs[:span] == docs[len(words) - 1:]
+                for k, word in enumerate(words):
+                    if k == 0:
+                        allowed = [token.endswith(word) for token in self.vocab]
+                    elif k == len(words) - 1:
+                        allowed = [token.startswith(word) for token in self.vocab]
+                    else:
+                        allowed = [token == word for token in self.vocab]
+                    hit &= np.asarray(allowed, dtype=bool)[self.ids[k:k + span]]
+                np.minimum.at(best, docs[:span][hit], group_id)
+
+        return np.where(best == no_match, -1, best)
@@ -1,17 +1,43 @@
-import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from gensim.corpora.dictionary import Dictionary
-from gensim.models.ldamodel import LdaModel
-
-nltk.download("stopwords")
+from Scripts.metrics import metrics
+from Scripts.stopwords import ENGLISH_STOPWORDS
+from Scripts.token_corpus import TokenCorpus, TOKEN_PATTERN
+from Scripts.theme_bits import ThemeRegistry
+
+
+# Predefined themes and the keywords that identify them
+# (also the default seeds of Scripts.theme_classifier)
+THEME_KEYWORDS = {
+    "Account Access Issues": [
+        "login", "log", "crash", "crashes", "error", "issue",
+        "doesn", "work", "working", "not working", "fail",
+        "open", "connect", "unable", "developer", "problem"
+    ],
+    "Transaction Performance": [
+        "money", "transfer", "transaction", "send", "receive",
+        "history", "slow", "processing", "telebirr", "payment"
+    ],
+    "User Interface & Experience": [
+        "easy", "user", "friendly", "interface", "design",
+        "navigation", "layout", "feature", "good app",
+        "nice app", "mobile banking", "ui"
+    ],
+    "Customer Support": [
+        "support", "help", "service", "customer", "complain",
+        "contact", "response", "solve", "agent", "staff"
+    ],
+    "Feature Requests / General Satisfaction": [
+        "best", "super", "love", "amazing", "great",
+        "recommend", "request", "need", "feature",
+        "option", "improve", "update"
+    ],
+}
 
 
 class TopicModeling:
     """
     Handles:
     - text cleaning
-    - tokenization + stopword removal
+    - tokenization + stopword removal (once, into a shared TokenCorpus)
     - LDA topic modeling
     - auto-assigning 5 predefined themes per review
     """
@@ -19,57 +45,90 @@ class TopicModeling:
     def __init__(self, num_topics=3, num_words=10):
         self.num_topics = num_topics
         self.num_words = num_words
-        self.stop_words = set(stopwords.words("english"))
+        self.stop_words = set(ENGLISH_STOPWORDS)
+        self.corpus = None
+        self._corpus_key = None  # fingerprint of the reviews self.corpus was built from
         self.dictionary = None
         self.lda_model = None
 
         # ---------------------------------------------------------
         # NEW: predefined themes + their keyword grouping logic
         # ---------------------------------------------------------
-        self.theme_keywords = {
-            "Account Access Issues": [
-                "login", "log", "crash", "crashes", "error", "issue",
-                "doesn", "work", "working", "not working", "fail",
-                "open", "connect", "unable", "developer", "problem"
-            ],
-            "Transaction Performance": [
-                "money", "transfer", "transaction", "send", "receive",
-                "history", "slow", "processing", "telebirr", "payment"
-            ],
-            "User Interface & Experience": [
-                "easy", "user", "friendly", "interface", "design",
-                "navigation", "layout", "feature", "good app",
-                "nice app", "mobile banking", "ui"
-            ],
-            "Customer Support": [
-                "support", "help", "service", "customer", "complain",
-                "contact", "response", "solve", "agent", "staff"
-            ],
-            "Feature Requests / General Satisfaction": [
-                "best", "super", "love", "amazing", "great",
-                "recommend", "request", "need", "feature",
-                "option", "improve", "update"
-            ],
-        }
+        self.theme_keywords = {theme: list(keywords) for theme, keywords in THEME_KEYWORDS.items()}
+        self._theme_registry = None
+
+    @property
+    def theme_registry(self):
+        """Theme name -> bit of the theme_mask column, shared with the DB loaders (loaded on first use)"""
+        if self._theme_registry is None:
+            self._theme_registry = ThemeRegistry.load()
+            self._theme_registry.register(list(self.theme_keywords))
+        return self._theme_registry
 
     # ---------------------------------------------------------
     # 1. CLEAN TEXT → lowercase, tokenize, remove stopwords
     # ---------------------------------------------------------
-    def preprocess(self, df, text_col="review_text"):
-        df["clean_text"] = df[text_col].str.lower()
-        df["tokens"] = df["clean_text"].str.split()
-        df["tokens_nostop"] = df["tokens"].apply(
-            lambda words: [w for w in words if w not in self.stop_words]
-        )
+    def preprocess(self, df, text_col="review_text", corpus_path=None, columns=True):
+        """
+        Tokenize the reviews once into `self.corpus` (row i of df = document i).
+        Pass `corpus_path` to persist it as a memory-mappable corpus.
+
+        With `columns`, also sets df's `clean_text` (lowercased text), `tokens`
+        and `tokens_nostop` columns, tokenized as the corpus is. The models only
+        read the corpus, so pass columns=False to skip the per-review lists.
+        """
+        self.corpus = self._tokenize(df, text_col)
+        self._corpus_key = self._fingerprint(df, text_col)
+        if corpus_path:
+            self.corpus.save(corpus_path)
+        if columns:
+            df["clean_text"] = df[text_col].str.lower()
+            df["tokens"] = [
+                TOKEN_PATTERN.findall(text) if isinstance(text, str) else []
+                for text in df["clean_text"]
+            ]
+            df["tokens_nostop"] = [self.corpus.tokens(i) for i in range(len(self.corpus))]
         return df
 
+    def _tokenize(self, df, text_col="review_text"):
+        with metrics.timer("tokenize") as t:
+            corpus = TokenCorpus.build(df[text_col], stop_words=self.stop_words)
+            t.rows_in = t.rows_out = len(corpus)
+        return corpus
+
+    @staticmethod
+    def _fingerprint(df, text_col="review_text"):
+        """Hash of df's index and review texts: identifies the rows a corpus is aligned with"""
+        import hashlib
+        import pandas as pd
+
+        hashes = pd.util.hash_pandas_object(df[text_col], index=True).to_numpy()
+        return len(df), hashlib.blake2b(hashes.tobytes(), digest_size=16).hexdigest()
+
+    def _corpus_for(self, df, text_col="review_text"):
+        """
+        Corpus aligned with df's rows. The shared corpus is built on first use and
+        reused only for the same reviews; other DataFrames get their own corpus,
+        leaving `self.corpus` (and anything aligned with it) untouched.
+        """
+        if self.corpus is None:
+            self.preprocess(df, text_col, columns=False)
+            return self.corpus
+        if self._corpus_key == self._fingerprint(df, text_col):
+            return self.corpus
+        return self._tokenize(df, text_col)
+
     # ---------------------------------------------------------
     # 2. Train LDA Topic Model
     # ---------------------------------------------------------
+    @metrics.timed("fit_lda")
     def fit_lda(self, df):
-        tokens = df["tokens_nostop"].tolist()
-        self.dictionary = Dictionary(tokens)
-        corpus = [self.dictionary.doc2bow(tok) for tok in tokens]
+        # gensim is only needed for LDA, so it is imported on first use
+        from gensim.models.ldamodel import LdaModel
+
+        token_corpus = self._corpus_for(df)
+        self.dictionary = token_corpus.gensim_dictionary()
+        corpus = token_corpus.bows()
 
         self.lda_model = LdaModel(
             corpus=corpus,
@@ -81,6 +140,28 @@ class TopicModeling:
 
         return self.lda_model
 
+    # ---------------------------------------------------------
+    # 2b. Choose the number of topics
+    # ---------------------------------------------------------
+    def select_num_topics(self, df, num_topics_range, workers=None, coherence=None, output_dir=None):
+        """
+        Fit candidate topic counts in parallel, keep the most coherent model.
+
+        Sets num_topics, lda_model and dictionary to the best candidate and
+        returns the ranked table (see Scripts.topic_selection).
+        """
+        from Scripts.topic_selection import select_num_topics
+
+        ranking, best_model, dictionary = select_num_topics(
+            self._corpus_for(df), num_topics_range,
+            workers=workers, coherence=coherence, output_dir=output_dir
+        )
+        if best_model is not None:
+            self.lda_model = best_model
+            self.dictionary = dictionary
+            self.num_topics = best_model.num_topics
+        return ranking
+
     # ---------------------------------------------------------
     # 3. Return readable LDA topics with top words
     # ---------------------------------------------------------
@@ -102,8 +183,9 @@ class TopicModeling:
     # 4. Assign LDA topic to each review
     # ---------------------------------------------------------
     def assign_review_topics(self, df):
-        tokens = df["tokens_nostop"].tolist()
-        corpus = [self.dictionary.doc2bow(tok) for tok in tokens]
+        # Token ids are mapped through the model's dictionary (doc2bow semantics),
+        # so reviews the model was not trained on are scored with the right words
+        corpus = self._corpus_for(df).bows(token2id=self.dictionary.token2id)
 
         dominant_topics = []
         for bow in corpus:
@@ -119,7 +201,8 @@ class TopicModeling:
     # ---------------------------------------------------------
     def map_to_theme(self, tokens):
         """
-        Assign the theme that best matches the review tokens.
+        Assign the theme that best matches the review tokens
+        (e.g. one review's `tokens_nostop`; assign_themes does every review at once).
         """
         text = " ".join(tokens)
 
@@ -133,8 +216,28 @@ class TopicModeling:
     # ---------------------------------------------------------
     # 6. NEW: Apply themes to all reviews
     # ---------------------------------------------------------
-    def assign_themes(self, df):
-        df["theme"] = df["tokens_nostop"].apply(self.map_to_theme)
+    def assign_themes(self, df, classifier=None):
+        """
+        Same result as applying map_to_theme to every review, but keywords are
+        matched once per vocabulary entry of the shared corpus.
+
+        Pass an EmbeddingThemeClassifier to assign themes by embedding
+        similarity instead (also sets a multi-label `themes` column).
+
+        Also sets `theme_mask`, the themes as a bitmask (see Scripts.theme_bits).
+        """
+        if classifier is not None:
+            df = classifier.assign_themes(df)
+            df["theme_mask"] = self.theme_registry.encode(df["themes"].tolist())
+            return df
+
+        with metrics.timer("assign_themes") as t:
+            themes = list(self.theme_keywords) + ["Other"]
+            matches = self._corpus_for(df).match_phrases(list(self.theme_keywords.values()))
+            df["theme"] = [themes[i] for i in matches]  # -1 (no match) -> "Other"
+            masks = self.theme_registry.encode([[theme] for theme in themes])
+            df["theme_mask"] = masks[matches]
+            t.rows_in = t.rows_out = len(df)
         return df
 
     # ---------------------------------------------------------
@@ -0,0 +1,205 @@
+"""
+LDA Model Selection
+Choose the number of LDA topics by fitting candidates in parallel.
+
+- the TokenCorpus is saved once and memory-mapped by every worker process
+- each candidate is fitted on a training split and scored with topic coherence
+  (c_v or u_mass) and held-out perplexity
+- every candidate is first fitted for `warmup_passes`; once all warm-ups are
+  done, a candidate whose coherence is clearly below the best warm-up coherence
+  is stopped there and only the others are fitted to the end (the baseline is
+  the same whatever the number of workers or the order they finish in)
+- the best completed candidate (highest coherence) is persisted
+
+Usage:
+    python -m Scripts.cli select-topics --input data/processed/reviews_processed.csv --min 2 --max 12
+"""
+
+import sys
+import os
+import time
+import shutil
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import DATA_PATHS, TOPIC_SELECTION_CONFIG
+from Scripts.metrics import metrics
+from Scripts.token_corpus import TokenCorpus
+
+
+def _coherence(model, measure, dictionary, bows, texts):
+    from gensim.models.coherencemodel import CoherenceModel
+
+    if measure == "u_mass":
+        scorer = CoherenceModel(model=model, corpus=bows, dictionary=dictionary, coherence="u_mass")
+    else:
+        # processes=1: candidates already run one per worker process
+        scorer = CoherenceModel(model=model, texts=texts, dictionary=dictionary,
+                                coherence=measure, processes=1)
+    return float(scorer.get_coherence())
+
+
+def _perplexity(model, bows):
+    if not bows:
+        return None
+    return float(2 ** (-model.log_perplexity(bows)))
+
+
+def _load_split(work_dir, options):
+    """Dictionary, train/test bag-of-words and (for c_v) train token lists of a work dir"""
+    import numpy as np
+    from gensim.corpora.dictionary import Dictionary
+
+    corpus = TokenCorpus.load(os.path.join(work_dir, "corpus"), mmap=True)
+    dictionary = Dictionary.load(os.path.join(work_dir, "dictionary"))
+    split = np.load(os.path.join(work_dir, "split.npz"))
+    train = corpus.bows(split['train'])
+    test = corpus.bows(split['test'])
+    texts = None if options['coherence'] == "u_mass" else [corpus.tokens(i) for i in split['train']]
+    return dictionary, train, test, texts
+
+
+def _warm_up_candidate(task):
+    """Process-pool worker: fit one candidate number of topics for the warm-up passes"""
+    from gensim.models.ldamodel import LdaModel
+
+    num_topics, work_dir, options = task
+    start = time.perf_counter()
+    dictionary, train, test, texts = _load_split(work_dir, options)
+
+    warmup = min(options['warmup_passes'], options['passes'])
+    model = LdaModel(
+        corpus=train,
+        id2word=dictionary,
+        num_topics=num_topics,
+        passes=warmup,
+        random_state=options['random_state'],
+    )
+    model_path = os.path.join(work_dir, f"k{num_topics}", "lda.model")
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    model.save(model_path)
+
+    return {
+        'num_topics': num_topics,
+        'passes': warmup,
+        'status': "stopped",  # until _finish_candidate completes it
+        'coherence': _coherence(model, options['coherence'], dictionary, train, texts),
+        'perplexity': _perplexity(model, test),
+        'fit_seconds': time.perf_counter() - start,
+        'model_path': model_path
+    }
+
+
+def _finish_candidate(task):
+    """Process-pool worker: continue a warmed-up candidate to the full number of passes"""
+    from gensim.models.ldamodel import LdaModel
+
+    result, work_dir, options = task
+    start = time.perf_counter()
+    result = dict(result)
+
+    if options['passes'] > result['passes']:
+        dictionary, train, test, texts = _load_split(work_dir, options)
+        model = LdaModel.load(result['model_path'])
+        model.update(train, passes=options['passes'] - result['passes'])
+        model.save(result['model_path'])
+        result.update({
+            'passes': options['passes'],
+            'coherence': _coherence(model, options['coherence'], dictionary, train, texts),
+            'perplexity': _perplexity(model, test)
+        })
+
+    result['status'] = "complete"
+    result['fit_seconds'] += time.perf_counter() - start
+    return result
+
+
+def _survivors(results, margin):
+    """Warm-up results within `margin` of the best warm-up coherence"""
+    best = max(result['coherence'] for result in results)
+    return [result for result in results if result['coherence'] >= best - margin * abs(best)]
+
+
+def select_num_topics(corpus, num_topics_range, workers=None, coherence=None, passes=None,
+                      output_dir=None):
+    """
+    Fit one LDA model per candidate topic count and rank them.
+
+    Args:
+        corpus (TokenCorpus): tokenized reviews.
+        num_topics_range (iterable of int): candidate topic counts, e.g. range(2, 13).
+        workers (int): worker processes (default: one per CPU).
+        coherence (str): 'c_v' or 'u_mass'.
+        passes (int): LDA passes per completed candidate.
+        output_dir (str): where the best model, dictionary and ranking are saved.
+
+    Returns:
+        (ranking DataFrame, best LdaModel or None, gensim Dictionary)
+    """
+    import numpy as np
+    import pandas as pd
+    from concurrent.futures import ProcessPoolExecutor
+    from gensim.models.ldamodel import LdaModel
+
+    candidates = sorted(set(int(k) for k in num_topics_range))
+    options = {
+        'coherence': coherence or TOPIC_SELECTION_CONFIG['coherence'],
+        'passes': passes or TOPIC_SELECTION_CONFIG['passes'],
+        'warmup_passes': TOPIC_SELECTION_CONFIG['warmup_passes'],
+        'early_stop_margin': TOPIC_SELECTION_CONFIG['early_stop_margin'],
+        'random_state': 42
+    }
+    workers = workers or TOPIC_SELECTION_CONFIG['workers'] or os.cpu_count()
+    output_dir = output_dir or DATA_PATHS['lda_model']
+
+    rng = np.random.default_rng(options['random_state'])
+    rows = rng.permutation(len(corpus))
+    n_test = int(len(rows) * TOPIC_SELECTION_CONFIG['holdout_fraction'])
+
+    work_dir = tempfile.mkdtemp(prefix="lda_select_")
+    try:
+        corpus.save(os.path.join(work_dir, "corpus"))
+        dictionary = corpus.gensim_dictionary()
+        dictionary.save(os.path.join(work_dir, "dictionary"))
+        np.savez(os.path.join(work_dir, "split.npz"),
+                 train=np.sort(rows[n_test:]), test=np.sort(rows[:n_test]))
+
+        print(f"Fitting {len(candidates)} LDA candidates ({options['coherence']} coherence) "
+              f"with {workers} workers...")
+        with metrics.timer("select_num_topics") as t:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_warm_up_candidate, [(k, work_dir, options) for k in candidates]))
+                survivors = _survivors(results, options['early_stop_margin'])
+                finished = {
+                    result['num_topics']: result
+                    for result in pool.map(_finish_candidate, [(r, work_dir, options) for r in survivors])
+                }
+            results = [finished.get(result['num_topics'], result) for result in results]
+            t.rows_in = len(candidates)
+            t.rows_out = sum(result['status'] == "complete" for result in results)
+
+        ranking = pd.DataFrame(results, columns=[
+            'num_topics', 'status', 'coherence', 'perplexity', 'passes', 'fit_seconds', 'model_path'
+        ])
+        ranking['complete'] = ranking['status'] == "complete"
+        ranking = ranking.sort_values(
+            ['complete', 'coherence'], ascending=False, kind="mergesort"
+        ).reset_index(drop=True)
+
+        best_model = None
+        if ranking['complete'].any():
+            best = ranking.iloc[0]
+            best_model = LdaModel.load(best['model_path'])
+            os.makedirs(output_dir, exist_ok=True)
+            best_model.save(os.path.join(output_dir, "lda.model"))
+            dictionary.save(os.path.join(output_dir, "dictionary"))
+            print(f"✅ Best model: {best['num_topics']} topics "
+                  f"(coherence {best['coherence']:.4f}) saved to {output_dir}")
+
+        ranking = ranking.drop(columns=['complete', 'model_path'])
+        os.makedirs(output_dir, exist_ok=True)
+        ranking.to_csv(os.path.join(output_dir, "selection.csv"), index=False)
+        return ranking, best_model, dictionary
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -0,0 +1,433 @@
+"""
+Durable Work Queue
+Sharded execution of scraping and scoring across worker processes and nodes.
+
+Tasks live in a `work_tasks` table in SQLite (single box / local testing) or
+Postgres (many boxes, claimed with FOR UPDATE SKIP LOCKED). Each claim takes a
+time-limited lease, renewed by a heartbeat while the handler runs; a worker
+that dies simply lets its lease expire and the task is retried by someone
+else, up to `max_attempts`. Task keys are unique,
+so enqueueing is idempotent, and every handler writes its output keyed by the
+task (file per app, UPDATE by review_id), so re-running a task is harmless.
+
+Usage:
+    python -m Scripts.cli enqueue-scrape
+    python -m Scripts.cli enqueue-score --chunk-size 500
+    python -m Scripts.cli worker --kinds scrape,score     # start as many as you like
+"""
+
+import sys
+import os
+import json
+import time
+import socket
+import sqlite3
+import threading
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import WORK_QUEUE_CONFIG, APP_IDS, DATA_PATHS
+from Scripts.metrics import metrics
+
+SCHEMA = {
+    'sqlite': """
+        CREATE TABLE IF NOT EXISTS work_tasks (
+            task_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            task_key TEXT NOT NULL UNIQUE,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            worker_id TEXT,
+            lease_until REAL,
+            last_error TEXT,
+            result TEXT,
+            updated_at REAL
+        )
+    """,
+    'postgres': """
+        CREATE TABLE IF NOT EXISTS work_tasks (
+            task_id SERIAL PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            task_key VARCHAR(255) NOT NULL UNIQUE,
+            payload TEXT NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'pending',
+            attempts INT NOT NULL DEFAULT 0,
+            worker_id VARCHAR(255),
+            lease_until DOUBLE PRECISION,
+            last_error TEXT,
+            result TEXT,
+            updated_at DOUBLE PRECISION
+        )
+    """
+}
+
+
+class Task:
+    """A claimed task"""
+
+    def __init__(self, task_id, kind, task_key, payload, attempts):
+        self.task_id = task_id
+        self.kind = kind
+        self.task_key = task_key
+        self.payload = json.loads(payload)
+        self.attempts = attempts
+
+    def __repr__(self):
+        return f"Task({self.task_id}, {self.kind}, {self.task_key}, attempt {self.attempts})"
+
+
+class WorkQueue:
+    """Lease-based task queue on SQLite or Postgres"""
+
+    def __init__(self, backend=None, sqlite_path=None, lease_seconds=None, max_attempts=None):
+        """
+        Args:
+            backend: 'sqlite' or 'postgres' (default WORK_QUEUE_CONFIG['backend']).
+            sqlite_path: database file for the SQLite backend.
+            lease_seconds: how long a claim stays valid without completion.
+            max_attempts: attempts before a task is marked 'dead'.
+        """
+        self.backend = backend or WORK_QUEUE_CONFIG['backend']
+        self.sqlite_path = sqlite_path or WORK_QUEUE_CONFIG['sqlite_path']
+        self.lease_seconds = lease_seconds or WORK_QUEUE_CONFIG['lease_seconds']
+        self.max_attempts = max_attempts or WORK_QUEUE_CONFIG['max_attempts']
+
+        if self.backend == 'sqlite':
+            os.makedirs(os.path.dirname(self.sqlite_path) or ".", exist_ok=True)
+            # Autocommit mode; transactions are opened explicitly with BEGIN IMMEDIATE
+            self.conn = sqlite3.connect(self.sqlite_path, timeout=30, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        elif self.backend == 'postgres':
+            from config.db_config import get_connection
+            self.conn = get_connection()
+        else:
+            raise ValueError(f"Unknown work queue backend: {self.backend}")
+
+        self._execute(SCHEMA[self.backend])
+        self._commit()
+
+    # -----------------------------
+    # SQL helpers
+    # -----------------------------
+    def _sql(self, query):
+        return query.replace("%s", "?") if self.backend == 'sqlite' else query
+
+    def _execute(self, query, params=()):
+        cur = self.conn.cursor()
+        cur.execute(self._sql(query), params)
+        return cur
+
+    def _commit(self):
+        if self.backend == 'postgres':
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def reconnect(self):
+        """A new queue object with its own connection (connections are not shared across threads)"""
+        return WorkQueue(self.backend, self.sqlite_path, self.lease_seconds, self.max_attempts)
+
+    # -----------------------------
+    # Producer side
+    # -----------------------------
+    def enqueue(self, kind, task_key, payload):
+        """Add a task; returns False if a task with this key already exists"""
+        conflict = "OR IGNORE" if self.backend == 'sqlite' else ""
+        on_conflict = "" if self.backend == 'sqlite' else "ON CONFLICT (task_key) DO NOTHING"
+        cur = self._execute(f"""
+            INSERT {conflict} INTO work_tasks (kind, task_key, payload, updated_at)
+            VALUES (%s, %s, %s, %s) {on_conflict}
+        """, (kind, task_key, json.dumps(payload), time.time()))
+        self._commit()
+        created = cur.rowcount == 1
+        if created:
+            metrics.inc("queue_enqueued_total", kind=kind)
+        return created
+
+    # -----------------------------
+    # Worker side
+    # -----------------------------
+    def claim(self, worker_id, kinds):
+        """Lease the oldest runnable task of the given kinds; returns a Task or None"""
+        now = time.time()
+        kinds = list(kinds)
+        marks = ", ".join(["%s"] * len(kinds))
+
+        # Tasks whose last attempt timed out and have no attempts left are dead
+        reap = """
+            UPDATE work_tasks SET status = 'dead', last_error = COALESCE(last_error, 'lease expired')
+            WHERE status = 'running' AND lease_until < %s AND attempts >= %s
+        """
+        runnable = f"""
+            kind IN ({marks}) AND (
+                (status = 'pending' AND (lease_until IS NULL OR lease_until <= %s))
+                OR (status = 'running' AND lease_until < %s)
+            )
+        """
+        lease = (worker_id, now + self.lease_seconds, now)
+
+        if self.backend == 'postgres':
+            self._execute(reap, (now, self.max_attempts))
+            cur = self._execute(f"""
+                UPDATE work_tasks
+                SET status = 'running', worker_id = %s, lease_until = %s,
+                    attempts = attempts + 1, updated_at = %s
+                WHERE task_id = (
+                    SELECT task_id FROM work_tasks
+                    WHERE {runnable}
+                    ORDER BY task_id
+                    FOR UPDATE SKIP LOCKED
+                    LIMIT 1
+                )
+                RETURNING task_id, kind, task_key, payload, attempts
+            """, lease + tuple(kinds) + (now, now))
+            row = cur.fetchone()
+            self.conn.commit()
+        else:
+            # BEGIN IMMEDIATE takes the write lock, so the select + update is atomic
+            self._execute("BEGIN IMMEDIATE")
+            try:
+                self._execute(reap, (now, self.max_attempts))
+                row = self._execute(f"""
+                    SELECT task_id, kind, task_key, payload, attempts FROM work_tasks
+                    WHERE {runnable}
+                    ORDER BY task_id LIMIT 1
+                """, tuple(kinds) + (now, now)).fetchone()
+                if row:
+                    self._execute("""
+                        UPDATE work_tasks
+                        SET status = 'running', worker_id = %s, lease_until = %s,
+                            attempts = attempts + 1, updated_at = %s
+                        WHERE task_id = %s
+                    """, lease + (row[0],))
+                    row = row[:4] + (row[4] + 1,)
+                self._execute("COMMIT")
+            except Exception:
+                self._execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+        metrics.inc("queue_claimed_total", kind=row[1])
+        return Task(*row)
+
+    def extend_lease(self, task, worker_id, seconds=None):
+        """Heartbeat for long tasks; returns False if the lease was lost"""
+        now = time.time()
+        cur = self._execute("""
+            UPDATE work_tasks SET lease_until = %s, updated_at = %s
+            WHERE task_id = %s AND worker_id = %s AND status = 'running'
+        """, (now + (seconds or self.lease_seconds), now, task.task_id, worker_id))
+        self._commit()
+        return cur.rowcount == 1
+
+    def complete(self, task, worker_id, result=None):
+        """
+        Mark a task done. Only succeeds while this worker still holds the lease,
+        so a task that was re-claimed after a timeout is committed exactly once.
+        """
+        cur = self._execute("""
+            UPDATE work_tasks SET status = 'done', result = %s, lease_until = NULL, updated_at = %s
+            WHERE task_id = %s AND worker_id = %s AND status = 'running'
+        """, (json.dumps(result, default=str), time.time(), task.task_id, worker_id))
+        self._commit()
+        done = cur.rowcount == 1
+        metrics.inc("queue_completed_total" if done else "queue_lease_lost_total", kind=task.kind)
+        return done
+
+    def fail(self, task, worker_id, error):
+        """Record a failure; retry later with backoff or mark dead after max_attempts"""
+        dead = task.attempts >= self.max_attempts
+        retry_at = time.time() + WORK_QUEUE_CONFIG['retry_backoff_seconds'] * task.attempts
+        self._execute("""
+            UPDATE work_tasks SET status = %s, last_error = %s, lease_until = %s, updated_at = %s
+            WHERE task_id = %s AND worker_id = %s AND status = 'running'
+        """, ('dead' if dead else 'pending', str(error)[:2000], None if dead else retry_at,
+              time.time(), task.task_id, worker_id))
+        self._commit()
+        metrics.inc("queue_dead_total" if dead else "queue_retried_total", kind=task.kind)
+
+    def status_counts(self):
+        """Dictionary (kind, status) -> number of tasks"""
+        rows = self._execute("""
+            SELECT kind, status, COUNT(*) FROM work_tasks GROUP BY kind, status ORDER BY kind, status
+        """).fetchall()
+        self._commit()
+        return {(kind, status): count for kind, status, count in rows}
+
+
+# -----------------------------
+# Task handlers
+# -----------------------------
+def scrape_app_task(payload):
+    """
+    Scrape one app and write its reviews to a per-bank CSV.
+
+    Play Store continuation tokens are sequential, so an app is the smallest
+    independent shard; page ranges cannot be fetched out of order.
+    """
+    from Scripts.scraper import PlayStoreScraper
+
+    # Failures must reach the worker so the task is retried, not completed with partial output
+    scraper = PlayStoreScraper(raise_errors=True)
+    reviews = scraper.scrape_reviews_for_bank(payload['app_id'], payload['bank_code'])
+    output_dir = payload.get('output_dir') or DATA_PATHS['raw']
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Write then rename, so a retried task never leaves a half-written file
+    path = os.path.join(output_dir, f"reviews_raw_{payload['bank_code']}.csv")
+    reviews.to_dataframe().to_csv(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)
+    return {'path': path, 'rows': len(reviews)}
+
+
+_ANALYZER = None
+
+
+def score_chunk_task(payload):
+    """Score a chunk of review ids and write labels back by review_id (idempotent; raises if scoring fails)"""
+    global _ANALYZER
+    from psycopg2.extras import execute_batch
+    from config.db_config import get_connection
+    from Scripts.sentiment_analysis import SentimentAnalysis
+    from Scripts.query_cache import bump_table_version
+
+    if _ANALYZER is None:
+        _ANALYZER = SentimentAnalysis()  # one model per worker process
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT review_id, review_text FROM reviews WHERE review_id = ANY(%s)",
+            (payload['review_ids'],)
+        )
+        rows = cur.fetchall()
+        results = _ANALYZER.analyze_batch([text or "" for _, text in rows])
+        failed = sum(label == "ERROR" for label, _ in results)
+        if failed:
+            # Never store ERROR labels: the rows stay unscored and the queue retries the task
+            raise RuntimeError(f"Scoring failed for {failed}/{len(rows)} reviews")
+        execute_batch(cur, """
+            UPDATE reviews SET sentiment_label = %s, sentiment_score = %s WHERE review_id = %s
+        """, [(label, round(score, 2), review_id) for (review_id, _), (label, score) in zip(rows, results)])
+        conn.commit()
+        bump_table_version("reviews", conn=conn)
+        return {'rows': len(rows)}
+    finally:
+        conn.close()
+
+
+HANDLERS = {
+    'scrape': scrape_app_task,
+    'score': score_chunk_task
+}
+
+
+# -----------------------------
+# Enqueue helpers
+# -----------------------------
+def enqueue_scrape_tasks(queue, output_dir=None, run_id=None):
+    """One scrape task per app in APP_IDS; run_id separates repeated runs"""
+    run_id = run_id or time.strftime("%Y-%m-%d")
+    created = 0
+    for bank_code, app_id in APP_IDS.items():
+        created += queue.enqueue('scrape', f"scrape:{run_id}:{bank_code}", {
+            'bank_code': bank_code,
+            'app_id': app_id,
+            'output_dir': output_dir
+        })
+    return created
+
+
+def enqueue_scoring_tasks(queue, chunk_size=500):
+    """One score task per chunk of unscored review ids"""
+    from config.db_config import get_connection
+
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT review_id FROM reviews WHERE sentiment_label IS NULL ORDER BY review_id")
+        review_ids = [row[0] for row in cur.fetchall()]
+    finally:
+        conn.close()
+
+    created = 0
+    for i in range(0, len(review_ids), chunk_size):
+        chunk = review_ids[i:i + chunk_size]
+        created += queue.enqueue('score', f"score:{chunk[0]}-{chunk[-1]}", {'review_ids': chunk})
+    return created
+
+
+# -----------------------------
+# Worker loop
+# -----------------------------
+class LeaseHeartbeat:
+    """Renews a task's lease from a background thread while its handler runs"""
+
+    def __init__(self, queue, task, worker_id, interval=None):
+        self.queue = queue
+        self.task = task
+        self.worker_id = worker_id
+        # Several renewals per lease, so one slow renewal does not let it expire
+        self.interval = interval or queue.lease_seconds / 3
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-heartbeat", daemon=True)
+
+    def _run(self):
+        queue = self.queue.reconnect()
+        try:
+            while not self._stop.wait(self.interval):
+                if not queue.extend_lease(self.task, self.worker_id):
+                    self.lost = True  # complete() will refuse; counted there
+                    print(f"⚠ Lease lost for {self.task} while it was running")
+                    return
+        except Exception as e:
+            print(f"⚠ Lease heartbeat for {self.task} failed: {e}")
+        finally:
+            queue.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+
+def run_worker(queue, kinds=None, worker_id=None, exit_when_empty=False, handlers=None):
+    """Claim and run tasks until interrupted (or until the queue is empty)"""
+    handlers = handlers or HANDLERS
+    kinds = kinds or list(handlers)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    print(f"👷 Worker {worker_id} started for tasks: {', '.join(kinds)}")
+
+    processed = 0
+    while True:
+        task = queue.claim(worker_id, kinds)
+        if task is None:
+            if exit_when_empty:
+                break
+            time.sleep(WORK_QUEUE_CONFIG['poll_seconds'])
+            continue
+
+        print(f"→ {task}")
+        try:
+            with metrics.timer("queue_task", kind=task.kind), LeaseHeartbeat(queue, task, worker_id):
+                result = handlers[task.kind](task.payload)
+        except Exception as e:
+            print(f"❌ {task} failed: {e}")
+            queue.fail(task, worker_id, e)
+            continue
+
+        if queue.complete(task, worker_id, result):
+            processed += 1
+        else:
+            print(f"⚠ Lease lost for {task}; another worker owns it now")
+
+    print(f"Worker {worker_id} finished {processed} tasks")
+    return processed
@@ -0,0 +1,7 @@
+"""
+Project configuration.
+
+Settings live in config/settings.py and are re-exported here, so
+`from config import DATA_PATHS` works next to `from config.db_config import get_connection`.
+"""
+from config.settings import *  # noqa: F401,F403
@@ -0,0 +1,199 @@
+"""
+Configuration settings for Bank Reviews Analysis Project (re-exported by config/__init__.py)
+"""
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Google Play Store App IDs
+APP_IDS = {
+# env
+    'CBE': os.getenv('CBE_APP_ID', 'com.combanketh.mobilebanking'),
+    'Dashen': os.getenv('DASHEN_APP_ID', 'com.dashen.dashensuperapp'),
+    'Abyssinia': os.getenv('BOA_APP_ID', 'com.boa.boaMobileBanking')
+
+}
+
+# Bank Names Mapping
+BANK_NAMES = {
+    'CBE': 'Commercial Bank of Ethiopia',
+    'Dashen': 'Dashen Bank',
+    'Abyssinia': 'Abyssinia'
+}
+
+# Scraping Configuration
+SCRAPING_CONFIG = {
+    'reviews_per_bank': None,  # None means fetch all reviews
+    'max_retries': int(os.getenv('MAX_RETRIES', 3)),
+    'lang': 'en',
+    'country': 'et',  # Ethiopia
+    'page_size': int(os.getenv('SCRAPE_PAGE_SIZE', 200)),  # reviews per Play Store request
+    'archive_pages': os.getenv('SCRAPE_ARCHIVE_PAGES', '1') != '0',  # keep compressed raw pages
+    'archive_workers': int(os.getenv('ARCHIVE_WORKERS', 0)) or None,  # None = one per CPU
+    'archive_pages_per_task': int(os.getenv('ARCHIVE_PAGES_PER_TASK', 8))  # pages parsed per worker task
+}
+
+
+# Data directory at the repository root, whatever the working directory
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+# File Paths
+DATA_PATHS = {
+    'raw': os.path.join(DATA_DIR, 'raw'),
+    'processed': os.path.join(DATA_DIR, 'processed'),
+    'raw_reviews': os.path.join(DATA_DIR, 'raw/reviews_raw.csv'),
+    'processed_reviews': os.path.join(DATA_DIR, 'processed/reviews_processed.csv'),
+    'sentiment_results': os.path.join(DATA_DIR, 'processed/reviews_with_sentiment.csv'),
+    'final_results': os.path.join(DATA_DIR, 'processed/reviews_final.csv'),
+    'metrics': os.path.join(DATA_DIR, 'metrics'),
+    'keyword_index': os.path.join(DATA_DIR, 'index/keywords'),
+    'cascade_model': os.path.join(DATA_DIR, 'models/cascade_first_stage.pkl'),
+    'backfill_checkpoint': os.path.join(DATA_DIR, 'checkpoints/backfill.json'),
+    'page_archive': os.path.join(DATA_DIR, 'raw/pages'),
+    'lda_model': os.path.join(DATA_DIR, 'models/lda'),
+    'sketches': os.path.join(DATA_DIR, 'sketches'),
+    'embeddings': os.path.join(DATA_DIR, 'index/embeddings'),
+    'theme_seeds': os.path.join(DATA_DIR, 'models/theme_seeds.json'),
+    'theme_registry': os.path.join(DATA_DIR, 'models/theme_registry.json'),
+    'table_versions': os.path.join(DATA_DIR, 'cache/table_versions.json'),
+    'table_versions_seen': os.path.join(DATA_DIR, 'cache/table_versions_seen.json'),
+    'query_cache': os.path.join(DATA_DIR, 'cache/queries'),
+    'change_exports': os.path.join(DATA_DIR, 'exports/changes'),
+    'autotune': os.path.join(DATA_DIR, 'models/autotune.json')
+}
+
+# Instrumentation / Profiling Configuration
+METRICS_CONFIG = {
+    'enabled': os.getenv('METRICS_ENABLED', '1') != '0',
+    'json_log': os.getenv('METRICS_JSON_LOG', os.path.join(DATA_DIR, 'metrics/metrics.jsonl')),
+    'prometheus_file': os.getenv('METRICS_PROM_FILE', os.path.join(DATA_DIR, 'metrics/metrics.prom')),
+    # Comma separated stage names to profile, or 'all'
+    'profile_stages': os.getenv('PROFILE_STAGES', ''),
+    'profiler': os.getenv('PROFILER', 'cprofile'),  # 'cprofile' or 'pyinstrument'
+    'profile_dir': os.getenv('PROFILE_DIR', os.path.join(DATA_DIR, 'metrics/profiles'))
+}
+
+# Command-line Configuration
+CLI_CONFIG = {
+    # Warn when a subcommand spends longer than this importing its modules
+    'import_budget_seconds': float(os.getenv('IMPORT_BUDGET_SECONDS', 1.0))
+}
+
+# Sentiment Model Configuration
+SENTIMENT_CONFIG = {
+    'model': os.getenv('SENTIMENT_MODEL', 'distilbert-base-uncased-finetuned-sst-2-english'),
+    'max_chars': 512,
+    'batch_size': int(os.getenv('SENTIMENT_BATCH_SIZE', 32)),
+    # Shared scoring server: when SENTIMENT_SERVER_URL is set, SentimentAnalysis runs as a client
+    'server_url': os.getenv('SENTIMENT_SERVER_URL'),
+    'server_host': os.getenv('SENTIMENT_SERVER_HOST', '127.0.0.1'),
+    'server_port': int(os.getenv('SENTIMENT_SERVER_PORT', 8765)),
+    'max_wait_ms': float(os.getenv('SENTIMENT_MAX_WAIT_MS', 10)),
+    'request_timeout': float(os.getenv('SENTIMENT_REQUEST_TIMEOUT', 60)),
+    # Cascade mode: first-stage confidence needed to skip the transformer
+    'cascade_threshold': float(os.getenv('CASCADE_THRESHOLD', 0.9)),
+    # Fraction of confidently-labelled reviews re-scored by the transformer to measure agreement
+    'cascade_audit_rate': float(os.getenv('CASCADE_AUDIT_RATE', 0.05)),
+    # 'off': fixed batch_size; 'saved': apply settings tuned on this host; 'on': also tune when none are saved
+    'autotune': os.getenv('SENTIMENT_AUTOTUNE', 'saved')
+}
+
+# Sentiment Autotuning Configuration
+AUTOTUNE_CONFIG = {
+    'sample_size': int(os.getenv('AUTOTUNE_SAMPLE_SIZE', 128)),   # reviews scored per candidate setting
+    'batch_sizes': (4, 8, 16, 32, 64, 128),
+    'tolerance': 0.05,        # settings within 5% of the best count as ties (smaller one wins)
+    'max_memory_mb': float(os.getenv('AUTOTUNE_MAX_MEMORY_MB', 0)),  # 0 = no budget
+    'slow_factor': 2.0        # a batch taking this many times the tuned latency halves the batch size
+}
+
+# Distributed Work Queue Configuration
+WORK_QUEUE_CONFIG = {
+    'backend': os.getenv('WORK_QUEUE_BACKEND', 'sqlite'),  # 'sqlite' or 'postgres'
+    'sqlite_path': os.getenv('WORK_QUEUE_PATH', os.path.join(DATA_DIR, 'queue/work_queue.db')),
+    'lease_seconds': int(os.getenv('WORK_QUEUE_LEASE_SECONDS', 600)),
+    'max_attempts': int(os.getenv('WORK_QUEUE_MAX_ATTEMPTS', 3)),
+    'retry_backoff_seconds': int(os.getenv('WORK_QUEUE_RETRY_BACKOFF', 30)),
+    'poll_seconds': float(os.getenv('WORK_QUEUE_POLL_SECONDS', 2))
+}
+
+# Database Backfill Configuration
+BACKFILL_CONFIG = {
+    'chunk_size': int(os.getenv('BACKFILL_CHUNK_SIZE', 1000))
+}
+
+# LDA Topic Count Selection Configuration
+TOPIC_SELECTION_CONFIG = {
+    'coherence': os.getenv('TOPIC_COHERENCE', 'c_v'),  # 'c_v' or 'u_mass'
+    'passes': int(os.getenv('TOPIC_PASSES', 10)),
+    # Candidates are compared after this many passes; clearly worse ones stop there
+    'warmup_passes': int(os.getenv('TOPIC_WARMUP_PASSES', 2)),
+    # Stop if warm-up coherence < best warm-up coherence - margin * |best|
+    'early_stop_margin': float(os.getenv('TOPIC_EARLY_STOP_MARGIN', 0.2)),
+    'holdout_fraction': 0.2,  # documents held out for perplexity
+    'workers': int(os.getenv('TOPIC_WORKERS', 0)) or None  # None = one per CPU
+}
+
+# Streaming Sketch Configuration (per bank and day)
+SKETCH_CONFIG = {
+    'enabled': os.getenv('SKETCHES_ENABLED', '1') != '0',
+    'cms_width': 2048,        # count-min counters per row
+    'cms_depth': 4,           # count-min rows (hash functions)
+    'top_k': 200,             # phrases tracked by Space-Saving
+    'hll_precision': 12,      # 4096 HyperLogLog registers, ~1.6% error
+    'tdigest_compression': 100,
+    'ngram_max': 2,           # phrases are 1..ngram_max word n-grams
+    # Review ids already counted per stream (Bloom filter; ~0.1% of new reviews are missed)
+    'seen_capacity': int(os.getenv('SKETCH_SEEN_CAPACITY', 2_000_000)),
+    'seen_error_rate': 0.001
+}
+
+# Review Embedding / Semantic Search Configuration
+EMBEDDING_CONFIG = {
+    'model': os.getenv('EMBEDDING_MODEL', 'sentence-transformers/all-MiniLM-L6-v2'),
+    'batch_size': int(os.getenv('EMBEDDING_BATCH_SIZE', 64)),
+    'max_length': 128,                 # tokens per review
+    'hnsw_m': 16,                      # graph degree
+    'hnsw_ef_construction': 200,
+    'hnsw_ef': int(os.getenv('HNSW_EF', 64)),  # query-time accuracy / speed trade-off
+    'scan_chunk_rows': 65536           # rows per block in the brute-force fallback
+}
+
+# Embedding Theme Classifier Configuration
+THEME_CLASSIFIER_CONFIG = {
+    # Default minimum cosine similarity to a theme centroid (per-theme overrides live in the seeds file)
+    'threshold': float(os.getenv('THEME_THRESHOLD', 0.35))
+}
+
+# Change-Data Export Configuration
+CHANGE_EXPORT_CONFIG = {
+    'chunk_size': int(os.getenv('CHANGE_EXPORT_CHUNK_SIZE', 5000)),  # rows per fetch and per Parquet part
+    'compression': os.getenv('CHANGE_EXPORT_COMPRESSION', 'snappy')
+}
+
+# Per-Bank Analytics Configuration
+ANALYTICS_CONFIG = {
+    # Processes for per-bank stages (preprocessing, keyword extraction); 1 = in-process
+    'workers': int(os.getenv('ANALYTICS_WORKERS', 1))
+}
+
+# Play Store HTTP Transport Configuration
+HTTP_CONFIG = {
+    # Override to point the scraper at a local fake Play Store (e.g. http://127.0.0.1:9000)
+    'base_url': os.getenv('PLAY_STORE_BASE_URL'),
+    'timeout': float(os.getenv('HTTP_TIMEOUT', 30)),
+    'pool_size': int(os.getenv('HTTP_POOL_SIZE', 4)),
+    'cache_dir': os.getenv('HTTP_CACHE_DIR', os.path.join(DATA_DIR, 'cache/http')),
+    'app_info_ttl': int(os.getenv('APP_INFO_CACHE_TTL', 24 * 3600))
+}
+
+# Query Result Cache Configuration
+QUERY_CACHE_CONFIG = {
+    # 'postgres': table versions are Postgres sequences (seen by every node)
+    # 'local': a JSON file on this machine, for running without the sequences from models/tables.py
+    'versions': os.getenv('TABLE_VERSIONS_BACKEND', 'postgres'),
+    # Seconds a machine trusts the table versions it last read from Postgres
+    'versions_ttl': int(os.getenv('TABLE_VERSIONS_TTL', 60))
+}
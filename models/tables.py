@@ -22,11 +22,64 @@ def create_tables():
         sentiment_label VARCHAR(20),
         sentiment_score NUMERIC(3,2),
         theme VARCHAR(50),
-        source VARCHAR(50)
+        theme_mask BIGINT NOT NULL DEFAULT 0,
+        source VARCHAR(50),
+        updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        updated_xid XID8 NOT NULL DEFAULT pg_current_xact_id()
     );
     """)
 
+    # Databases created before theme_mask / updated_at / updated_xid existed
+    cur.execute("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS theme_mask BIGINT NOT NULL DEFAULT 0;")
+    cur.execute("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT now();")
+    cur.execute("ALTER TABLE reviews ADD COLUMN IF NOT EXISTS updated_xid XID8 NOT NULL DEFAULT pg_current_xact_id();")
+
+    # updated_at = start of the writing transaction, updated_xid = its transaction id,
+    # on insert (defaults) and on every update
+    cur.execute("""
+    CREATE OR REPLACE FUNCTION reviews_set_updated_at() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := now();
+        NEW.updated_xid := pg_current_xact_id();
+        RETURN NEW;
+    END;
+    $$ LANGUAGE plpgsql;
+    """)
+    cur.execute("DROP TRIGGER IF EXISTS reviews_updated_at ON reviews;")
+    cur.execute("""
+    CREATE TRIGGER reviews_updated_at
+        BEFORE UPDATE ON reviews
+        FOR EACH ROW EXECUTE FUNCTION reviews_set_updated_at();
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS reviews_updated_xid_idx ON reviews (updated_xid, review_id);")
+    # Unscored rows in id order, for the backfill (Scripts/backfill.py)
+    cur.execute("CREATE INDEX IF NOT EXISTS reviews_unscored_idx ON reviews (review_id) WHERE sentiment_label IS NULL;")
+
+    # Per-consumer high-water marks of the change export (Scripts/cdc_export.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS export_watermarks (
+        consumer VARCHAR(100) PRIMARY KEY,
+        xid_bound XID8 NOT NULL DEFAULT '0',
+        batch INT NOT NULL DEFAULT 0,
+        rows_exported BIGINT NOT NULL DEFAULT 0,
+        exported_at TIMESTAMPTZ
+    );
+    """)
+
+    # Theme name -> bit of reviews.theme_mask, shared by every loader (Scripts/theme_bits.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS theme_bits (
+        theme VARCHAR(50) PRIMARY KEY,
+        bit SMALLINT NOT NULL UNIQUE CHECK (bit BETWEEN 0 AND 62)
+    );
+    """)
+
+    # Version of each cached table: the loaders call nextval() after each commit and
+    # query results cached on any node are keyed by these (Scripts/query_cache.py)
+    for table in ("banks", "reviews"):
+        cur.execute(f"CREATE SEQUENCE IF NOT EXISTS {table}_version_seq;")
+
     conn.commit()
     cur.close()
     conn.close()
-    print("Tables 'banks' and 'reviews' created successfully!")
+    print("Tables 'banks', 'reviews', 'export_watermarks', 'theme_bits' and the table version sequences created successfully!")
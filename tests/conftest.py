@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# Make `config` and `Scripts` importable when pytest is run from any directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Tests must not append to the metrics log / Prometheus file of a real run
+os.environ.setdefault("METRICS_ENABLED", "0")
+
+
+@pytest.fixture(autouse=True)
+def _tmp_data_paths(tmp_path, monkeypatch):
+    """Files a test saves under DATA_PATHS (theme registry, caches, ...) go to a temporary directory"""
+    from config import DATA_PATHS, DATA_DIR
+
+    for key, path in DATA_PATHS.items():
+        monkeypatch.setitem(DATA_PATHS, key, os.path.join(str(tmp_path), "data", os.path.relpath(path, DATA_DIR)))
@@ -0,0 +1,28 @@
+from Scripts import autotune
+from Scripts.autotune import AdaptiveBatchSize
+
+MB = 2 ** 20
+
+
+def test_batch_size_recovers_after_memory_spike(monkeypatch):
+    rss = [500 * MB]
+    monkeypatch.setattr(autotune, "current_rss_bytes", lambda: rss[0])
+    adaptive = AdaptiveBatchSize(32, batch_seconds=1.0, max_memory_mb=1000)
+
+    rss[0] = 1500 * MB  # one batch spikes memory past the budget...
+    assert adaptive.record(32, 0.5) == 16
+
+    # ...and RSS stays there, but fast batches that do not grow it regrow the size
+    sizes = [adaptive.record(adaptive.batch_size, 0.1 * adaptive.batch_size / 32) for _ in range(6)]
+    assert sizes[-1] == 32
+    assert min(sizes) == 16
+
+
+def test_batch_size_keeps_halving_while_memory_rises(monkeypatch):
+    rss = [500 * MB]
+    monkeypatch.setattr(autotune, "current_rss_bytes", lambda: rss[0])
+    adaptive = AdaptiveBatchSize(32, batch_seconds=1.0, max_memory_mb=1000)
+
+    for expected in (16, 8, 4):
+        rss[0] += 600 * MB
+        assert adaptive.record(adaptive.batch_size, 0.5) == expected
@@ -0,0 +1,103 @@
+import csv
+import io
+
+import pytest
+
+from Scripts import backfill
+from Scripts.backfill import SentimentBackfill
+from Scripts.theme_bits import ThemeRegistry
+
+
+class FakeReviewsDB:
+    """Just enough of a Postgres connection for SentimentBackfill.run"""
+
+    def __init__(self, reviews):
+        self.labels = {review_id: None for review_id in reviews}
+        self.texts = dict(reviews)
+        self.pending = []
+        self.rowcount = 0
+        self.result = []
+
+    # connection
+    def cursor(self):
+        return self
+
+    def commit(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+    # cursor
+    def execute(self, query, params=None):
+        if "FROM reviews" in query and "LIMIT" in query:
+            after, limit = params
+            ids = sorted(i for i, label in self.labels.items() if label is None and i > after)[:limit]
+            self.result = [(i, self.texts[i]) for i in ids]
+        elif query.startswith("SELECT nextval"):
+            self.result = [(1,)]
+        elif "UPDATE reviews" in query:
+            unscored = [row for row in self.pending if self.labels[int(row[0])] is None]
+            for row in unscored:
+                self.labels[int(row[0])] = row[1]
+            self.rowcount = len(unscored)
+
+    def copy_expert(self, sql, buffer):
+        self.pending = list(csv.reader(io.StringIO(buffer.read())))
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0]
+
+
+class FlakyAnalyzer:
+    """Scores everything as positive until `down` is set"""
+
+    down = False
+
+    def analyze_batch(self, texts):
+        return [("ERROR", 0.0) if self.down else ("positive", 0.9) for _ in texts]
+
+
+class KeywordTopics:
+    stop_words = set()
+    theme_keywords = {'Account Access Issues': ["login"]}
+
+
+@pytest.fixture
+def job(tmp_path):
+    return SentimentBackfill(chunk_size=2, checkpoint_path=str(tmp_path / "backfill.json"),
+                             analyzer=FlakyAnalyzer(), topic_model=KeywordTopics(),
+                             theme_registry=ThemeRegistry())
+
+
+def _connect(monkeypatch, db):
+    monkeypatch.setattr(backfill, "get_connection", lambda: db)
+
+
+def test_failed_chunk_is_not_written_and_is_resumed(job, monkeypatch):
+    db = FakeReviewsDB({i: f"login problem {i}" for i in range(1, 6)})
+    _connect(monkeypatch, db)
+
+    job.analyzer.down = True
+    with pytest.raises(RuntimeError):
+        job.run()
+    assert all(label is None for label in db.labels.values())
+
+    job.analyzer.down = False
+    assert job.run() == 5
+    assert set(db.labels.values()) == {"positive"}
+    assert job.load_checkpoint()['rows_updated'] == 5
+
+
+def test_rows_committed_below_a_scored_id_are_picked_up(job, monkeypatch):
+    db = FakeReviewsDB({i: "slow app" for i in (1, 2, 5, 6)})
+    _connect(monkeypatch, db)
+    assert job.run() == 4
+
+    # Review 3 commits late, after 5 and 6 were already scored
+    db.labels[3], db.texts[3] = None, "late review"
+    assert job.run() == 1
+    assert db.labels[3] == "positive"
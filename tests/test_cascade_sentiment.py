@@ -0,0 +1,78 @@
+import pytest
+
+from Scripts.cascade_sentiment import CascadeSentiment, HashedLogisticClassifier, LexiconScorer
+
+
+class FixedFirstStage:
+    """First stage returning a preset P(POSITIVE) per text"""
+
+    def __init__(self, probabilities):
+        self.probabilities = probabilities
+
+    def predict_proba(self, texts):
+        return [self.probabilities[text] for text in texts]
+
+
+class RecordingAnalyzer:
+    """Stands in for the transformer: NEGATIVE unless the text says 'love'"""
+
+    def __init__(self):
+        self.calls = []
+
+    def analyze_batch(self, texts):
+        self.calls.append(list(texts))
+        return [("POSITIVE" if "love" in text else "NEGATIVE", 0.99) for text in texts]
+
+
+PROBABILITIES = {"love it": 0.97, "awful": 0.02, "meh": 0.55, "love but slow": 0.4}
+
+
+def test_only_uncertain_reviews_reach_the_transformer():
+    analyzer = RecordingAnalyzer()
+    cascade = CascadeSentiment(threshold=0.9, audit_rate=0.0, first_stage=FixedFirstStage(PROBABILITIES),
+                               analyzer=analyzer)
+
+    results = cascade.analyze_batch(list(PROBABILITIES))
+
+    assert analyzer.calls == [["meh", "love but slow"]]
+    assert results == [("POSITIVE", 0.97), ("NEGATIVE", 0.98), ("NEGATIVE", 0.99), ("POSITIVE", 0.99)]
+    report = cascade.report()
+    assert report['first_stage_fraction'] == report['transformer_fraction'] == 0.5
+    assert report['agreement_rate'] is None
+
+
+def test_audited_reviews_measure_agreement_without_changing_results():
+    analyzer = RecordingAnalyzer()
+    first_stage = FixedFirstStage({"love it": 0.97, "awful": 0.02, "love the bugs": 0.05})
+    cascade = CascadeSentiment(threshold=0.9, audit_rate=1.0, first_stage=first_stage, analyzer=analyzer)
+
+    results = cascade.analyze_batch(["love it", "awful", "love the bugs"])
+
+    assert analyzer.calls == [["love it", "awful", "love the bugs"]]
+    assert [label for label, _ in results] == ["POSITIVE", "NEGATIVE", "NEGATIVE"]
+    assert cascade.report()['agreement_rate'] == pytest.approx(2 / 3)
+
+
+def test_confident_batches_never_load_the_transformer():
+    cascade = CascadeSentiment(threshold=0.9, audit_rate=0.0, first_stage=FixedFirstStage(PROBABILITIES))
+    assert cascade.analyze_batch(["love it", "awful"]) == [("POSITIVE", 0.97), ("NEGATIVE", 0.98)]
+    assert cascade._analyzer is None
+
+
+def test_lexicon_scorer_handles_negation():
+    scorer = LexiconScorer()
+    assert scorer.score("great and fast app") > 0.9
+    assert scorer.score("the app is not good") < 0.5
+    assert scorer.score("not bad at all") > 0.5
+    assert scorer.score("") == 0.5
+
+
+def test_trained_first_stage_follows_transformer_labels(tmp_path):
+    texts = [f"love this app {i}" for i in range(20)] + [f"hate the crashes {i}" for i in range(20)]
+    cascade = CascadeSentiment(first_stage=LexiconScorer(), analyzer=RecordingAnalyzer())
+
+    agreement = cascade.train_first_stage(texts, save_path=str(tmp_path / "cascade.pkl"))
+
+    assert agreement == 1.0
+    loaded = HashedLogisticClassifier.load(str(tmp_path / "cascade.pkl"))
+    assert loaded.predict_proba(["love this app"])[0] > 0.5 > loaded.predict_proba(["hate the crashes"])[0]
@@ -0,0 +1,143 @@
+import os
+
+import pandas as pd
+import pytest
+
+from Scripts import cdc_export
+from Scripts.cdc_export import CHANGES_QUERY, UPPER_BOUND_QUERY, ChangeExporter
+
+COLUMNS = ["review_id", "bank_name", "updated_xid"]
+
+
+class FakeChangesDB:
+    """reviews (review_id, bank_name, updated_xid) and export_watermarks, with a settable snapshot xmin"""
+
+    def __init__(self):
+        self.reviews = []
+        self.marks = {}
+        self.xmin = 1
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.pending = None
+
+    def cursor(self, name=None):
+        return FakeCursor(self)
+
+    def set_session(self, **kwargs):
+        pass
+
+    def commit(self):
+        if self.pending:
+            bound, batch, rows_exported, consumer = self.pending
+            self.db.marks[consumer] = (bound, batch, rows_exported)
+        self.pending = None
+
+    def rollback(self):
+        self.pending = None
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.db = conn.db
+        self.result = []
+        self.description = [(column,) for column in COLUMNS]
+
+    def execute(self, query, params=None):
+        if query.startswith("INSERT INTO export_watermarks"):
+            self.db.marks.setdefault(params[0], ("0", 0, 0))
+        elif query == UPPER_BOUND_QUERY:
+            self.result = [(str(self.db.xmin),)]
+        elif "FOR UPDATE" in query:
+            self.result = [self.db.marks[params[0]]]
+        elif query == CHANGES_QUERY:
+            low, high = (int(bound) for bound in params)
+            self.result = sorted((row for row in self.db.reviews if low <= row[2] < high), key=lambda r: (r[2], r[0]))
+        elif "UPDATE export_watermarks" in query:
+            self.conn.pending = params
+
+    def fetchone(self):
+        return self.result[0]
+
+    def fetchmany(self, size):
+        rows, self.result = self.result[:size], self.result[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+def write_csv_chunk(self, rows, columns, staging_dir, part):
+    os.makedirs(staging_dir, exist_ok=True)
+    pd.DataFrame(rows, columns=columns).to_csv(os.path.join(staging_dir, f"part-{part:05d}.csv"), index=False)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = FakeChangesDB()
+    monkeypatch.setattr(cdc_export, "get_connection", db.connect)
+    monkeypatch.setattr(ChangeExporter, "_write_chunk", write_csv_chunk)
+    return db
+
+
+def exported_ids(batch_dir):
+    parts = sorted(os.listdir(batch_dir))
+    return pd.concat(pd.read_csv(os.path.join(batch_dir, part)) for part in parts)["review_id"].tolist()
+
+
+def test_watermark_advances_past_finished_transactions(db, tmp_path):
+    exporter = ChangeExporter("warehouse", output_dir=str(tmp_path), chunk_size=2)
+    db.reviews = [(1, "CBE", 5), (2, "Dashen", 6), (3, "CBE", 7)]
+    db.xmin = 7  # transaction 7 is still running
+
+    exported, batch_dir = exporter.export()
+    assert (exported, os.path.basename(batch_dir)) == (2, "batch=000001")
+    assert exported_ids(batch_dir) == [1, 2]
+    assert db.marks["warehouse"] == ("7", 1, 2)
+
+    db.reviews.append((1, "CBE", 8))  # review 1 updated again
+    db.xmin = 9
+    exported, batch_dir = exporter.export()
+    assert exported_ids(batch_dir) == [3, 1]
+    assert db.marks["warehouse"] == ("9", 2, 4)
+
+
+def test_empty_window_publishes_nothing(db, tmp_path):
+    exporter = ChangeExporter("warehouse", output_dir=str(tmp_path))
+    db.reviews = [(1, "CBE", 12)]
+    db.xmin = 10
+
+    assert exporter.export() == (0, None)
+    assert db.marks["warehouse"] == ("10", 0, 0)
+    assert os.listdir(tmp_path / "warehouse") == []
+
+
+def test_failed_run_keeps_the_mark_and_is_resumed(db, tmp_path, monkeypatch):
+    exporter = ChangeExporter("warehouse", output_dir=str(tmp_path), chunk_size=1)
+    db.reviews = [(1, "CBE", 5), (2, "CBE", 6)]
+    db.xmin = 10
+
+    def fail_second_part(self, rows, columns, staging_dir, part):
+        if part == 1:
+            raise OSError("disk full")
+        write_csv_chunk(self, rows, columns, staging_dir, part)
+
+    monkeypatch.setattr(ChangeExporter, "_write_chunk", fail_second_part)
+    with pytest.raises(OSError):
+        exporter.export()
+    assert db.marks["warehouse"] == ("0", 0, 0)
+    assert os.listdir(tmp_path / "warehouse") == []  # staging removed, nothing published
+
+    monkeypatch.setattr(ChangeExporter, "_write_chunk", write_csv_chunk)
+    exported, batch_dir = exporter.export()
+    assert (exported, os.path.basename(batch_dir)) == (2, "batch=000001")
+    assert exported_ids(batch_dir) == [1, 2]
@@ -0,0 +1,19 @@
+import pytest
+
+from Scripts import cli
+
+
+def test_cli_imports_and_builds_parser():
+    parser = cli.build_parser()
+    args = parser.parse_args(["preprocess", "--workers", "2"])
+    assert args.func is cli.cmd_preprocess
+    assert args.workers == 2
+
+
+@pytest.mark.parametrize("command", [
+    ["scrape"], ["load"], ["queue-status"], ["backfill"], ["sketch-summary"],
+    ["export-changes", "--consumer", "warehouse"],
+])
+def test_subcommands_parse(command):
+    args = cli.build_parser().parse_args(command)
+    assert callable(args.func)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from config import EMBEDDING_CONFIG
+
+from Scripts import embeddings
+from Scripts.embeddings import SemanticSearch
+
+WORDS = ["login", "transfer", "slow", "crash", "support", "otp"]
+
+
+class FakeEmbedder:
+    """Bag-of-words vectors over WORDS, L2-normalised"""
+    model_name = "fake"
+
+    def encode(self, texts):
+        vectors = np.array([[str(t).split().count(w) for w in WORDS] + [0.1] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+class FilterFailingIndex:
+    """Stands in for hnswlib.Index: fails filtered queries below `min_ef`"""
+
+    def __init__(self, search, min_ef):
+        self.search = search
+        self.min_ef = min_ef
+        self.efs = []
+
+    def set_ef(self, ef):
+        self.efs.append(ef)
+
+    def knn_query(self, query, k, filter=None):
+        if self.efs[-1] < self.min_ef:
+            raise RuntimeError("Cannot return the results in a contiguous 2D array. Probably ef or M is too small")
+        rows, scores = self.search._brute_force(query, self.search.store.current_rows(), len(self.search.store))
+        rows = [row for row in rows if filter is None or filter(row)][:k]
+        return np.array([rows]), 1.0 - np.array([scores[:len(rows)]])
+
+
+@pytest.fixture
+def search(tmp_path):
+    search = SemanticSearch(str(tmp_path / "store"), embedder=FakeEmbedder())
+    search.add(["c1", "c2", "d1", "d2"],
+               ["login crash", "slow transfer", "otp login", "support slow"],
+               ["CBE", "CBE", "Dashen", "Dashen"])
+    return search
+
+
+def test_brute_force_search_reads_current_rows_of_the_bank(search):
+    assert search.add(["c1"], ["transfer transfer"], ["CBE"]) == 1  # edited review
+    assert search.add(["c2"], ["slow transfer"], ["CBE"]) == 0  # unchanged
+
+    results = search.search("login", bank="CBE", k=5).set_index('review_id')
+    assert sorted(results.index) == ["c1", "c2"]
+    assert results.loc["c1", 'score'] < 0.1  # the edited text no longer mentions login
+
+    assert search.search("login", bank="Dashen", k=1)['review_id'].tolist() == ["d1"]
+    assert search.search("login", bank="Unknown").empty
+
+
+def test_bank_row_index_is_rebuilt_only_after_appends(search):
+    rows = search.store.current_rows("Dashen")
+    assert rows.tolist() == [2, 3]
+    assert search.store.current_rows("Dashen") is rows
+
+    search.add(["d3"], ["crash"], ["Dashen"])
+    assert search.store.current_rows("Dashen").tolist() == [2, 3, 4]
+    assert search.store.current_rows().tolist() == [0, 1, 2, 3, 4]
+
+
+@pytest.mark.parametrize("min_ef", [100, 10 ** 6])  # the retry succeeds / falls back to a scan
+def test_filtered_hnsw_query_retries_then_falls_back(search, monkeypatch, min_ef):
+    monkeypatch.setitem(EMBEDDING_CONFIG, 'hnsw_ef', 64)
+    monkeypatch.setattr(embeddings, "hnswlib", object())
+    search._index = index = FilterFailingIndex(search, min_ef)
+
+    results = search.search("slow", bank="Dashen", k=5)
+    assert index.efs == [64, 256]
+    assert results['review_id'].tolist() == ["d2", "d1"]
+    assert set(results['bank_name']) == {"Dashen"}
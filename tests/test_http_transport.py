@@ -0,0 +1,76 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from google_play_scraper.exceptions import ExtraHTTPError
+
+from Scripts.http_transport import HttpTransport
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    requests = []
+
+    def _reply(self, status, body=b"", headers=()):
+        self.send_response(status)
+        for key, value in headers:
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        Handler.requests.append((method, self.path))
+        if self.path == "/old":
+            self._reply(302, b"moved", [("Location", "/new")])
+        elif self.path == "/post-old":
+            self._reply(303, b"", [("Location", "/new")])
+        elif self.path == "/new":
+            self._reply(200, b"fresh page")
+        else:
+            self._reply(500, b"server error")
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    Handler.requests = []
+    yield f"http://127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_get_follows_redirects_and_caches_the_final_page(server, tmp_path):
+    transport = HttpTransport(cache_dir=str(tmp_path), cache_ttl=3600)
+    assert transport.get(f"{server}/old") == "fresh page"
+    assert transport.get(f"{server}/old") == "fresh page"
+    # Second call is served from the cache
+    assert Handler.requests == [("GET", "/old"), ("GET", "/new")]
+
+
+def test_post_303_becomes_get(server, tmp_path):
+    transport = HttpTransport(cache_dir=str(tmp_path))
+    status, _, text = transport.request("POST", f"{server}/post-old", body="f.req=1",
+                                        headers={"Content-Type": "application/x-www-form-urlencoded"})
+    assert (status, text) == (200, "fresh page")
+    assert Handler.requests == [("POST", "/post-old"), ("GET", "/new")]
+
+
+def test_errors_are_raised_and_not_cached(server, tmp_path):
+    transport = HttpTransport(cache_dir=str(tmp_path), cache_ttl=3600)
+    with pytest.raises(ExtraHTTPError):
+        transport.get(f"{server}/broken")
+    assert not any(tmp_path.iterdir())
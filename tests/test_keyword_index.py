@@ -0,0 +1,96 @@
+import sqlite3
+from datetime import date, datetime
+
+import pandas as pd
+import pytest
+
+from Scripts.keyword_index import KeywordIndex
+
+
+def _reviews(ids):
+    texts = {
+        1: "money transfer is very slow today",
+        2: "login error after the update",
+        3: "customer support never answered my call",
+        4: "money transfer failed again",
+    }
+    return pd.DataFrame({
+        'review_id': ids,
+        'bank_name': ["CBE" if i % 2 else "Dashen" for i in ids],
+        'review_text': [texts[i] for i in ids],
+        'review_date': ["2024-05-01", "2024-05-01", "2024-05-02", "2024-05-02"][:len(ids)],
+    })
+
+
+def _snapshot(index):
+    return {
+        bank: index.top_phrases(bank, min_word_length=1, top_n=50).to_dict("records")
+        for bank in ("CBE", "Dashen")
+    }, index.buckets()
+
+
+def test_update_is_idempotent(tmp_path):
+    once = KeywordIndex(str(tmp_path / "once"))
+    assert once.update(_reviews([1, 2, 3, 4])) == 4
+
+    twice = KeywordIndex(str(tmp_path / "twice"))
+    twice.update(_reviews([1, 2, 3]))
+    # Same CSV again, then an overlapping one (fresh instance: ids are read back from disk)
+    assert twice.update(_reviews([1, 2, 3])) == 0
+    assert KeywordIndex(str(tmp_path / "twice")).update(_reviews([1, 2, 3, 4])) == 1
+
+    assert _snapshot(KeywordIndex(str(tmp_path / "twice"))) == _snapshot(once)
+
+
+def test_interrupted_update_leaves_nothing_to_double_count(tmp_path, monkeypatch):
+    once = KeywordIndex(str(tmp_path / "once"))
+    once.update(_reviews([1, 2, 3, 4]))
+
+    crashed = KeywordIndex(str(tmp_path / "crashed"))
+    crashed.update(_reviews([1]))
+    # Fail after the bucket counts were written, before the review ids are recorded
+    monkeypatch.setattr(crashed, "_conn", FailingIdsConnection(crashed.conn))
+    with pytest.raises(sqlite3.OperationalError):
+        crashed.update(_reviews([1, 2, 3, 4]))
+    monkeypatch.undo()
+
+    retry = KeywordIndex(str(tmp_path / "crashed"))
+    assert retry.update(_reviews([1, 2, 3, 4])) == 3
+    assert _snapshot(retry) == _snapshot(once)
+
+
+class FailingIdsConnection:
+    """sqlite3 connection whose review id insert fails"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def executemany(self, sql, rows):
+        if sql.startswith("INSERT INTO review_ids"):
+            raise sqlite3.OperationalError("disk I/O error")
+        return self._conn.executemany(sql, rows)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_queries_read_only_the_candidate_phrases(tmp_path):
+    KeywordIndex(str(tmp_path)).update(_reviews([1, 2, 3, 4]))
+
+    index = KeywordIndex(str(tmp_path))
+    words = set(index.top_phrases("CBE", min_word_length=1, top_n=100)['word'])
+    assert {"money transfer", "customer support"} <= words
+    assert "" not in words  # every candidate id resolved to its phrase
+    assert index.phrases_of([KeywordIndex.feature_id("login error")]) == {
+        KeywordIndex.feature_id("login error"): "login error"
+    }
+
+
+def test_datetime_range_includes_the_start_day(tmp_path):
+    index = KeywordIndex(str(tmp_path))
+    index.update(_reviews([1, 2, 3, 4]))
+
+    for start in (datetime(2024, 5, 2), pd.Timestamp("2024-05-02"), date(2024, 5, 2), "2024-05-02"):
+        assert set(index.buckets(start=start, end=pd.Timestamp("2024-05-02 18:30"))) == {
+            ("CBE", "2024-05-02"), ("Dashen", "2024-05-02")
+        }
@@ -0,0 +1,75 @@
+import json
+
+from Scripts.metrics import MetricsRegistry
+
+
+def registry(tmp_path, **config):
+    return MetricsRegistry({
+        'enabled': True,
+        'json_log': str(tmp_path / "metrics.jsonl"),
+        'prometheus_file': str(tmp_path / "metrics.prom"),
+        'profile_dir': str(tmp_path / "profiles"),
+        **config
+    })
+
+
+def test_stage_timer_records_rows_and_logs_an_event(tmp_path):
+    metrics = registry(tmp_path)
+    with metrics.timer("scrape", bank="CBE") as t:
+        t.rows_in, t.rows_out = 10, 7
+
+    labels = (('bank', 'CBE'), ('stage', 'scrape'))
+    assert metrics.counters[("rows_in_total", labels)] == 10
+    assert metrics.counters[("rows_out_total", labels)] == 7
+    assert metrics.histograms[("stage_seconds", labels)].count == 1
+    assert metrics.gauges[("rows_per_second", labels)] > 0
+
+    with open(tmp_path / "metrics.jsonl", encoding="utf-8") as f:
+        event = json.loads(f.readline())
+    assert event['event'] == "stage" and event['stage'] == "scrape"
+    assert event['bank'] == "CBE" and event['rows_out'] == 7
+
+
+def test_prometheus_export(tmp_path):
+    metrics = registry(tmp_path)
+    metrics.inc("pages_total", 2, app_id="a")
+    metrics.inc("pages_total", app_id="a")
+    metrics.observe("latency", 0.3, buckets=(0.1, 0.5))
+    metrics.cache_hit("embeddings", hit=True)
+    metrics.cache_hit("embeddings", hit=False)
+    assert metrics.cache_hit_rate("embeddings") == 0.5
+
+    metrics.flush()
+    text = (tmp_path / "metrics.prom").read_text(encoding="utf-8")
+    assert '# TYPE webscraper_pages_total counter' in text
+    assert 'webscraper_pages_total{app_id="a"} 3' in text
+    assert 'webscraper_latency_bucket{le="0.1"} 0' in text
+    assert 'webscraper_latency_bucket{le="0.5"} 1' in text
+    assert 'webscraper_latency_bucket{le="+Inf"} 1' in text
+    assert 'webscraper_cache_hit_rate{cache="embeddings"} 0.5' in text
+
+
+def test_disabled_registry_records_nothing(tmp_path):
+    metrics = registry(tmp_path, enabled=False)
+    with metrics.timer("scrape") as t:
+        t.rows_out = 1
+    metrics.inc("pages_total")
+    metrics.flush()
+
+    assert not (metrics.counters or metrics.gauges or metrics.histograms)
+    assert not (tmp_path / "metrics.jsonl").exists() and not (tmp_path / "metrics.prom").exists()
+
+
+def test_opted_in_stages_are_profiled(tmp_path):
+    metrics = registry(tmp_path, profile_stages="fit_lda")
+
+    @metrics.timed()
+    def fit_lda():
+        return sum(range(1000))
+
+    assert fit_lda() == sum(range(1000))
+    with metrics.timer("scrape"):
+        pass
+
+    profiles = list((tmp_path / "profiles").iterdir())
+    assert len(profiles) == 1 and profiles[0].name.startswith("fit_lda-") and profiles[0].suffix == ".prof"
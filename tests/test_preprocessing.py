@@ -0,0 +1,43 @@
+import pandas as pd
+
+from Scripts.preprocessing import ReviewPreprocessor
+
+
+def raw_reviews(n=60):
+    banks = [("CBE", "Commercial Bank of Ethiopia"), ("Dashen", "Dashen Bank"), ("Abyssinia", "Abyssinia")]
+    rows = []
+    for i in range(n):
+        code, name = banks[i % 3]
+        rows.append({
+            'review_id': f"r{i}",
+            # Few distinct days, so most reviews tie on (bank, date)
+            'review_text': "" if i % 11 == 0 else f"  review   number {i} ",
+            'rating': 6 if i % 13 == 0 else 1 + i % 5,
+            'review_date': f"2024-05-0{1 + i % 2} 1{i % 10}:00:00",
+            'user_name': None if i % 7 == 0 else f"user{i}",
+            'thumbs_up': i % 4,
+            'reply_content': None,
+            'bank_code': code,
+            'bank_name': name,
+            'app_version': "1.0",
+            'source': "Google Play",
+        })
+    return pd.DataFrame(rows)
+
+
+def test_parallel_partitions_match_the_sequential_steps(tmp_path):
+    input_path = tmp_path / "raw.csv"
+    raw_reviews().to_csv(input_path, index=False)
+
+    outputs = []
+    for workers in (1, 3):
+        output_path = tmp_path / f"processed_{workers}.csv"
+        preprocessor = ReviewPreprocessor(str(input_path), str(output_path), workers=workers)
+        assert preprocessor.process()
+        outputs.append((pd.read_csv(output_path), preprocessor.stats))
+
+    (sequential, sequential_stats), (parallel, parallel_stats) = outputs
+    pd.testing.assert_frame_equal(sequential, parallel)
+    for key in ('empty_reviews_removed', 'count_after_cleaning', 'invalid_ratings_removed'):
+        assert sequential_stats[key] == parallel_stats[key]
+    assert sequential['review_text'].iloc[0] == sequential['review_text'].iloc[0].strip()
@@ -0,0 +1,89 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from Scripts import query_cache
+from Scripts.query_cache import QueryCache, bump_table_version, table_versions
+
+
+def test_concurrent_local_bumps_are_not_lost(tmp_path):
+    path = str(tmp_path / "table_versions.json")
+    tables = [f"table_{i}" for i in range(16)]
+    threads = [threading.Thread(target=bump_table_version, args=(table,), kwargs={'path': path, 'backend': "local"})
+               for table in tables]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    versions = table_versions(tables, path, backend="local")
+    assert all(version > 0 for version in versions.values())
+
+
+def test_local_bump_invalidates_cached_result(tmp_path, monkeypatch):
+    monkeypatch.setitem(query_cache.QUERY_CACHE_CONFIG, 'versions', "local")
+    cache = QueryCache(str(tmp_path / "queries"))
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return pd.DataFrame({'review_id': [len(calls)]})
+
+    assert cache.get_or_compute("reviews", {}, ["reviews"], compute)['review_id'].tolist() == [1]
+    assert cache.get_or_compute("reviews", {}, ["reviews"], compute)['review_id'].tolist() == [1]
+    bump_table_version("reviews")
+    assert cache.get_or_compute("reviews", {}, ["reviews"], compute)['review_id'].tolist() == [2]
+
+
+class FakeSequenceConnection:
+    """Postgres connection whose nextval() counts up from 100"""
+
+    def __init__(self):
+        self.value = 100
+        self.commits = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        assert query == "SELECT nextval(%s)" and params == ("reviews_version_seq",)
+        self.value += 1
+
+    def fetchone(self):
+        return (self.value,)
+
+    def commit(self):
+        self.commits += 1
+
+
+def test_postgres_versions_are_read_once_per_ttl(monkeypatch):
+    reads = []
+
+    def read(tables):
+        reads.append(list(tables))
+        return {'reviews': 7}
+
+    monkeypatch.setattr(query_cache, "_postgres_versions", read)
+    assert table_versions(["reviews", "banks"], backend="postgres", max_age=60) == {'reviews': 7, 'banks': 0}
+    assert table_versions(["reviews", "banks"], backend="postgres", max_age=60) == {'reviews': 7, 'banks': 0}
+    assert reads == [["reviews", "banks"]]
+
+    table_versions(["reviews"], backend="postgres", max_age=0)
+    assert len(reads) == 2
+
+
+def test_postgres_bump_uses_the_sequence_and_is_seen_locally(monkeypatch):
+    monkeypatch.setattr(query_cache, "_postgres_versions", lambda tables: {'reviews': 7})
+    assert table_versions(["reviews"], backend="postgres", max_age=60) == {'reviews': 7}
+
+    conn = FakeSequenceConnection()
+    bump_table_version("reviews", conn=conn, backend="postgres")
+    assert conn.commits == 1
+    # No new read within the TTL, but this machine's own bump is seen at once
+    assert table_versions(["reviews"], backend="postgres", max_age=60) == {'reviews': 101}
+
+
+def test_unknown_table_has_no_version_sequence():
+    with pytest.raises(ValueError):
+        bump_table_version("users", conn=FakeSequenceConnection(), backend="postgres")
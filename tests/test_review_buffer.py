@@ -0,0 +1,69 @@
+from datetime import datetime, timezone, timedelta
+
+import pandas as pd
+import pytest
+
+from config import BANK_NAMES
+from Scripts.review_buffer import COLUMNS, ReviewColumns
+
+
+def store_review(i, **overrides):
+    review = {
+        'reviewId': f"r{i}",
+        'score': 1 + i % 5,
+        'at': datetime(2024, 5, 1, 12, 30, i),
+        'userName': f"user{i}",
+        'thumbsUpCount': i,
+        'replyContent': None,
+        'reviewCreatedVersion': "2.1.0",
+    }
+    review.update(overrides)
+    return review
+
+
+def test_store_reviews_round_trip_to_the_scraper_columns():
+    buffer = ReviewColumns(BANK_NAMES)
+    buffer.append_store_review(store_review(0), "CBE", "fast app")
+    buffer.append_store_review(store_review(1, replyContent="Thanks!", reviewCreatedVersion=None), "Dashen", "ok")
+
+    df = buffer.to_dataframe()
+    assert list(df.columns) == COLUMNS
+    assert df['reply_content'].isna().tolist() == [True, False]
+    assert df.drop(columns='reply_content').to_dict('records') == [
+        {'review_id': "r0", 'review_text': "fast app", 'rating': 1, 'review_date': pd.Timestamp("2024-05-01 12:30:00"),
+         'user_name': "user0", 'thumbs_up': 0, 'bank_code': "CBE",
+         'bank_name': BANK_NAMES['CBE'], 'app_version': "2.1.0", 'source': "Google Play"},
+        {'review_id': "r1", 'review_text': "ok", 'rating': 2, 'review_date': pd.Timestamp("2024-05-01 12:30:01"),
+         'user_name': "user1", 'thumbs_up': 1, 'bank_code': "Dashen",
+         'bank_name': BANK_NAMES['Dashen'], 'app_version': "N/A", 'source': "Google Play"},
+    ]
+    assert list(df['bank_code'].cat.categories) == list(BANK_NAMES)
+
+
+def test_timezone_aware_dates_are_stored_as_wall_clock_time():
+    buffer = ReviewColumns(BANK_NAMES)
+    aware = datetime(2024, 5, 1, 12, 0, tzinfo=timezone(timedelta(hours=3)))
+    buffer.append("r1", "text", 5, aware, "CBE")
+    assert buffer.to_dataframe()['review_date'].iloc[0] == pd.Timestamp("2024-05-01 12:00:00")
+
+
+def test_extend_remaps_sources_and_rejects_other_bank_tables():
+    first = ReviewColumns(BANK_NAMES)
+    first.append("r1", "a", 5, datetime(2024, 5, 1), "CBE")
+    second = ReviewColumns(BANK_NAMES, sources=("App Store", "Google Play"))
+    second.append("r2", "b", 4, datetime(2024, 5, 2), "Abyssinia", source="Google Play")
+    second.append("r3", "c", 3, datetime(2024, 5, 3), "Abyssinia", source="App Store")
+
+    first.extend(second)
+    df = first.to_dataframe()
+    assert df['source'].tolist() == ["Google Play", "Google Play", "App Store"]
+    assert df['bank_code'].tolist() == ["CBE", "Abyssinia", "Abyssinia"]
+    assert len(first) == 3
+
+    with pytest.raises(ValueError):
+        first.extend(ReviewColumns({'X': "Other bank"}))
+
+
+def test_empty_buffer_has_the_scraper_columns():
+    df = ReviewColumns(BANK_NAMES).to_dataframe()
+    assert df.empty and list(df.columns) == COLUMNS
@@ -0,0 +1,72 @@
+import json
+import os
+from datetime import datetime
+
+import pytest
+
+from Scripts.page_archive import PageArchive, _encode
+from Scripts.scraper import PlayStoreScraper
+
+
+def review(review_id, at, content="Transfers are quick and the app is easy to use"):
+    return {'reviewId': review_id, 'content': content, 'score': 4, 'at': at, 'userName': review_id}
+
+
+def write_segment(archive, app_id, day, pages):
+    """Store pages as the segment of `day` (PageArchive.append always writes today's)"""
+    path = archive.segment_path(app_id, day)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "ab") as f:
+        for page in pages:
+            line = json.dumps({'app_id': app_id, 'reviews': page}, default=_encode).encode("utf-8") + b"\n"
+            f.write(archive._compress(line))
+
+
+@pytest.fixture
+def scraper(tmp_path, monkeypatch):
+    # Workers are forked, so they see the patched filter too
+    monkeypatch.setattr(PlayStoreScraper, "is_meaningful_english", lambda self, text: True)
+    archive = PageArchive(str(tmp_path / "pages"), codec="gzip")
+    scraper = PlayStoreScraper(archive=archive, sketches=False)
+    scraper.app_ids = {'CBE': 'cbe.app', 'Dashen': 'dashen.app'}
+    return scraper
+
+
+def test_rebuild_keeps_the_newest_reviews_and_their_latest_copy(scraper):
+    scraper.min_reviews_per_bank = 3
+    archive = scraper.archive
+    # Each day's scrape fetched newest first; r2 was edited between the two days
+    write_segment(archive, 'cbe.app', "2024-05-01", [
+        [review("r2", datetime(2024, 4, 30), "Old text of the review"), review("r1", datetime(2024, 4, 29))],
+    ])
+    write_segment(archive, 'cbe.app', "2024-05-03", [
+        [review("r4", datetime(2024, 5, 3)), review("r3", datetime(2024, 5, 2))],
+        [review("r2", datetime(2024, 4, 30), "Edited text of the review")],
+    ])
+    write_segment(archive, 'dashen.app', "2024-05-01", [[review("d1", datetime(2024, 5, 1))]])
+
+    df = scraper.scrape_from_archive(workers=2, pages_per_task=1)
+
+    assert list(df['review_id']) == ["r4", "r3", "r2", "d1"]
+    assert df.set_index('review_id').loc["r2", 'review_text'] == "Edited text of the review"
+
+
+def test_rebuild_is_independent_of_the_task_split(scraper):
+    archive = scraper.archive
+    for day in range(1, 6):
+        write_segment(archive, 'cbe.app', f"2024-05-0{day}", [
+            [review(f"r{day}-{page}-{i}", datetime(2024, 5, day, page, i)) for i in range(5)]
+            for page in range(4)
+        ])
+
+    tasks = list(scraper.archive_tasks(archive, pages_per_task=3))
+    assert [len(records) for _, records in tasks] == [3, 1] * 5
+
+    expected = scraper.scrape_from_archive(workers=1, pages_per_task=100)
+    split = scraper.scrape_from_archive(workers=3, pages_per_task=1)
+    assert expected.equals(split)
+    assert len(split) == 100 and split['review_date'].is_monotonic_decreasing
+
+
+def test_empty_archive(scraper):
+    assert scraper.scrape_from_archive(workers=1).empty
@@ -0,0 +1,78 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from Scripts.sentiment_server import MicroBatcher, make_handler
+
+
+class RecordingScorer:
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        if "boom" in texts:
+            raise RuntimeError("model failed")
+        return [("POSITIVE", float(len(text))) for text in texts]
+
+
+def test_concurrent_requests_are_scored_in_one_batch():
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=100, max_wait_ms=300)
+    futures = [batcher.submit([f"text {i}", f"more {i}"]) for i in range(3)]
+
+    results = [future.result(timeout=5) for future in futures]
+    assert scorer.batches == [["text 0", "more 0", "text 1", "more 1", "text 2", "more 2"]]
+    assert results[1] == [("POSITIVE", 6.0), ("POSITIVE", 6.0)]
+
+
+def test_batches_flush_at_the_size_limit():
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=4, max_wait_ms=300)
+    futures = [batcher.submit(["a", "b"]) for _ in range(3)]
+
+    assert [future.result(timeout=5) for future in futures] == [[("POSITIVE", 1.0)] * 2] * 3
+    assert [len(batch) for batch in scorer.batches] == [4, 2]
+
+
+def test_a_failed_batch_fails_its_requests_only():
+    scorer = RecordingScorer()
+    batcher = MicroBatcher(scorer, max_batch_size=1, max_wait_ms=0)
+
+    with pytest.raises(RuntimeError, match="model failed"):
+        batcher.submit(["boom"]).result(timeout=5)
+    assert batcher.submit(["fine"]).result(timeout=5) == [("POSITIVE", 4.0)]
+
+
+@pytest.fixture
+def server_url():
+    batcher = MicroBatcher(RecordingScorer(), max_batch_size=8, max_wait_ms=5)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(batcher, timeout=5))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def post(url, body):
+    request = urllib.request.Request(url + "/score", data=json.dumps(body).encode("utf-8"), method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_score_endpoint(server_url):
+    assert post(server_url, {'texts': ["good", "bad app"]}) == (200, {'results': [["POSITIVE", 4.0], ["POSITIVE", 7.0]]})
+
+
+@pytest.mark.parametrize("body", [{'texts': "one string"}, {'texts': ["ok", 3]}, {'text': ["ok"]}, ["ok"]])
+def test_score_endpoint_rejects_anything_but_a_list_of_strings(server_url, body):
+    status, payload = post(server_url, body)
+    assert status == 400 and payload['error'].startswith("bad request")
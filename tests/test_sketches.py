@@ -0,0 +1,90 @@
+import random
+from collections import Counter
+
+import pytest
+
+from Scripts.sketches import BloomFilter, CountMinSketch, HyperLogLog, SpaceSaving, TDigest
+
+
+def zipf_stream(n, vocabulary, seed):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, vocabulary + 1)]
+    return [f"w{i}" for i in rng.choices(range(vocabulary), weights, k=n)]
+
+
+def test_count_min_merge_equals_one_sketch_and_never_underestimates():
+    left, right = zipf_stream(5000, 500, 1), zipf_stream(5000, 500, 2)
+    a, b, whole = CountMinSketch(512, 4), CountMinSketch(512, 4), CountMinSketch(512, 4)
+    a.add_all(left)
+    for item in right:
+        b.add(item)
+    whole.add_all(left + right)
+
+    a.merge(b)
+    assert (a.table == whole.table).all() and a.total == whole.total == 10000
+    counts = Counter(left + right)
+    errors = [a.estimate(item) - count for item, count in counts.items()]
+    assert min(errors) >= 0
+    assert sum(errors) / len(errors) <= a.total / a.width  # expected error of a single row
+
+
+def test_space_saving_merge_keeps_the_heavy_hitters():
+    left, right = zipf_stream(20000, 2000, 3), zipf_stream(20000, 2000, 4)
+    a, b = SpaceSaving(50), SpaceSaving(50)
+    for item in left:
+        a.add(item)
+    for item in right:
+        b.add(item)
+    a.merge(b)
+
+    counts = Counter(left + right)
+    true = {item: counts[item] for item in ("w0", "w1", "w2")}
+    top = {item: (upper, lower) for item, upper, lower in a.top(10)}
+    for item, count in true.items():
+        upper, lower = top[item]
+        assert lower <= count <= upper
+
+
+def test_hyperloglog_accuracy_and_merge_of_overlapping_streams():
+    a, b = HyperLogLog(12), HyperLogLog(12)
+    for i in range(30000):
+        a.add(f"user{i}")
+    for i in range(20000, 50000):
+        b.add(f"user{i}")
+    assert a.count() == pytest.approx(30000, rel=0.05)
+
+    a.merge(b)
+    assert a.count() == pytest.approx(50000, rel=0.05)
+    with pytest.raises(ValueError):
+        a.merge(HyperLogLog(10))
+
+
+def test_tdigest_quantiles_and_merge():
+    rng = random.Random(5)
+    values = [rng.gauss(0, 1) for _ in range(20000)]
+    a, b = TDigest(100), TDigest(100)
+    for value in values[:10000]:
+        a.add(value)
+    for value in values[10000:]:
+        b.add(value)
+    a.merge(b)
+
+    ordered = sorted(values)
+    for q in (0.01, 0.1, 0.5, 0.9, 0.99):
+        assert a.quantile(q) == pytest.approx(ordered[int(q * len(ordered))], abs=0.05)
+    assert a.mean() == pytest.approx(sum(values) / len(values), abs=1e-9)
+    assert (a.min, a.max) == (ordered[0], ordered[-1])
+
+
+def test_bloom_filter_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(capacity=10000, error_rate=0.01)
+    assert sum(bloom.add(f"id{i}") for i in range(10000)) > 9900  # a few collide on the way
+    assert all(f"id{i}" in bloom for i in range(10000))
+    assert not bloom.add("id5")
+
+    false_positives = sum(f"other{i}" in bloom for i in range(10000))
+    assert false_positives < 200
+
+    other = BloomFilter(capacity=10000, error_rate=0.01)
+    other.add("late")
+    assert "late" in bloom.merge(other)
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from Scripts import scraper
+from Scripts.streaming_stats import StreamingAggregator
+
+
+def add_review(aggregator, review_id, rating=5):
+    return aggregator.add("CBE", "2024-05-01", review_id=review_id, text="fast transfer", user=review_id,
+                          rating=rating)
+
+
+def test_reviews_are_counted_once_per_stream(tmp_path):
+    first = StreamingAggregator("scraped", str(tmp_path))
+    assert add_review(first, "r1") and add_review(first, "r2")
+    assert not add_review(first, "r1")
+    first.flush()
+
+    # A later run re-scrapes r2 (and sees one new review)
+    second = StreamingAggregator("scraped", str(tmp_path))
+    assert not add_review(second, "r2")
+    assert add_review(second, "r3")
+    second.flush()
+
+    summary = StreamingAggregator.load("scraped", str(tmp_path)).summary("CBE")
+    assert summary['reviews'] == 3
+    assert summary['rating_distribution'] == {5: 3}
+    assert dict(summary['top_phrases'])["fast transfer"] == 3
+
+
+def test_discarded_updates_are_not_persisted_or_remembered(tmp_path):
+    aggregator = StreamingAggregator("scraped", str(tmp_path))
+    add_review(aggregator, "r1")
+    aggregator.discard()
+    assert aggregator.flush() is None
+
+    assert add_review(aggregator, "r1")  # not marked as seen either
+    aggregator.flush()
+    assert StreamingAggregator.load("scraped", str(tmp_path)).summary()['reviews'] == 1
+
+
+def test_failed_scrape_leaves_no_sketch_updates(tmp_path, monkeypatch):
+    def pages_then_error(self, app_id):
+        yield [{'reviewId': "r1", 'content': "The transfer is fast and the app works well",
+                'score': 5, 'at': datetime(2024, 5, 1), 'userName': "a"}]
+        raise ConnectionError("reset by peer")
+
+    monkeypatch.setattr(scraper.PlayStoreScraper, "iter_review_pages", pages_then_error)
+    monkeypatch.setitem(scraper.SCRAPING_CONFIG, 'archive_pages', False)
+    monkeypatch.setattr(scraper.PlayStoreScraper, "is_meaningful_english", lambda self, text: True)
+    sketches = StreamingAggregator("scraped", str(tmp_path))
+
+    reviews = scraper.PlayStoreScraper(sketches=sketches).scrape_reviews_for_bank("x", "CBE")
+    assert len(reviews) == 0
+    assert sketches.buckets == {}
+    assert sketches.flush() is None
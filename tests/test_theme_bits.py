@@ -0,0 +1,87 @@
+import numpy as np
+
+from Scripts.theme_bits import DatabaseThemeRegistry, ThemeRegistry, has_all, has_any, theme_counts
+from Scripts.topic_modeling import THEME_KEYWORDS
+
+
+def test_encode_decode_and_filters():
+    registry = ThemeRegistry(["Login", "Speed", "UI"])
+    masks = registry.encode([["Login"], "Speed; UI", [], "Other", "Login, UI"])
+
+    assert masks.tolist() == [0b001, 0b110, 0, 0, 0b101]
+    assert registry.decode(masks) == [["Login"], ["Speed", "UI"], [], [], ["Login", "UI"]]
+    assert has_any(masks, ["Speed", "Login"], registry).tolist() == [True, True, False, False, True]
+    assert has_all(masks, ["Login", "UI"], registry).tolist() == [False, False, False, False, True]
+    assert theme_counts(masks, registry).to_dict() == {"Login": 2, "Speed": 1, "UI": 2}
+
+
+def test_highest_bit_stays_a_positive_bigint():
+    registry = ThemeRegistry([f"theme {i}" for i in range(63)])
+    mask = registry.encode([["theme 62"]])
+    assert mask.dtype == np.int64 and mask[0] == 2 ** 62
+    assert theme_counts(mask, registry)["theme 62"] == 1
+
+
+def test_local_registries_agree_on_bits(tmp_path):
+    path = str(tmp_path / "theme_registry.json")
+    first, second = ThemeRegistry.load(path), ThemeRegistry.load(path)
+    assert first.themes == second.themes == list(THEME_KEYWORDS)
+
+    # Each registers a different new theme: the second sees the first's bit
+    first.register(["Fees"])
+    second.register(["Notifications", "Fees"])
+    assert second.bit("Fees") == first.bit("Fees") == len(THEME_KEYWORDS)
+    assert ThemeRegistry.load(path).themes == list(THEME_KEYWORDS) + ["Fees", "Notifications"]
+
+
+class FakeThemeBitsTable:
+    """theme_bits rows shared by every connection"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, table):
+        self.table = table
+        self.pending = {}
+        self.result = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        if query.startswith("SELECT theme FROM theme_bits"):
+            self.result = [(theme,) for theme, _ in sorted(self.table.rows.items(), key=lambda item: item[1])]
+        elif query.startswith("INSERT INTO theme_bits"):
+            theme, bit = params
+            assert bit not in self.table.rows.values() and bit not in self.pending.values()
+            self.pending[theme] = bit
+
+    def fetchall(self):
+        return self.result
+
+    def commit(self):
+        self.table.rows.update(self.pending)
+        self.pending = {}
+
+    def rollback(self):
+        self.pending = {}
+
+    def close(self):
+        pass
+
+
+def test_database_registries_share_bits():
+    table = FakeThemeBitsTable()
+    first = DatabaseThemeRegistry.load(table.connect)
+    second = DatabaseThemeRegistry.load(table.connect)
+
+    # Bits assigned in a different order on each side still resolve to one mapping
+    first.register(["Fees"])
+    second.register(["Notifications", "Fees"])
+    assert second.bit("Fees") == first.bit("Fees")
+    assert table.rows == {theme: bit for bit, theme in enumerate(list(THEME_KEYWORDS) + ["Fees", "Notifications"])}
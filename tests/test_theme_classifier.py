@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from config import DATA_PATHS
+from Scripts.theme_classifier import EmbeddingThemeClassifier
+from Scripts.topic_modeling import THEME_KEYWORDS
+
+
+class FakeEmbedder:
+    model_name = "fake"
+
+    def encode(self, texts):
+        vectors = np.array([[len(str(t)), str(t).count("a") + 1, 1.0] for t in texts], dtype=np.float32)
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_missing_seeds_file_falls_back_to_theme_keywords(tmp_path, monkeypatch):
+    monkeypatch.setitem(DATA_PATHS, 'theme_seeds', str(tmp_path / "missing.json"))
+    classifier = EmbeddingThemeClassifier.from_file(embedder=FakeEmbedder(), store_dir=str(tmp_path / "store"))
+    assert classifier.themes == list(THEME_KEYWORDS)
+    assert classifier.centroids.shape == (len(THEME_KEYWORDS), 3)
+
+
+class CountingEmbedder(FakeEmbedder):
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts):
+        self.encoded.extend(texts)
+        return super().encode(texts)
+
+
+def test_primary_theme_is_the_best_qualifying_theme(tmp_path):
+    classifier = EmbeddingThemeClassifier({'A': ["a"], 'B': ["b"]}, {'A': 0.9, 'B': 0.1},
+                                          embedder=FakeEmbedder(), store_dir=str(tmp_path))
+    classifier.centroids = np.eye(2, 3, dtype=np.float32)
+    vectors = np.array([
+        [0.8, 0.5, 0.0],   # A scores best but misses its threshold; B qualifies
+        [0.95, 0.2, 0.0],  # both qualify, A first
+        [0.0, 0.05, 1.0],  # nothing qualifies
+    ], dtype=np.float32)
+
+    primary, labels = classifier.classify(vectors)
+    assert primary == ["B", "A", "Other"]
+    assert labels == [["B"], ["A", "B"], []]
+
+
+def test_edited_reviews_are_embedded_again(tmp_path):
+    embedder = CountingEmbedder()
+    classifier = EmbeddingThemeClassifier({'A': ["a"]}, embedder=embedder, store_dir=str(tmp_path / "store"))
+    df = pd.DataFrame({'review_id': ["r1", "r2"], 'review_text': ["slow app", "bad"], 'bank_name': ["CBE", "CBE"]})
+    classifier.review_vectors(df)
+
+    embedder.encoded.clear()
+    df.loc[1, 'review_text'] = "bad login and a crash"
+    vectors = classifier.review_vectors(df)
+    assert embedder.encoded == ["bad login and a crash"]
+    np.testing.assert_allclose(vectors[1], embedder.encode(["bad login and a crash"])[0], atol=1e-3)
+
+    # The cache survives a reload and keeps a single live row per review
+    reloaded = EmbeddingThemeClassifier({'A': ["a"]}, embedder=embedder, store_dir=str(tmp_path / "store"))
+    embedder.encoded.clear()
+    np.testing.assert_array_equal(reloaded.review_vectors(df), vectors)
+    assert embedder.encoded == []
+    assert reloaded.store.live_count("CBE") == 2 and len(reloaded.store) == 3
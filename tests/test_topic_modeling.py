@@ -0,0 +1,72 @@
+import pandas as pd
+
+from config import DATA_PATHS
+
+from Scripts.topic_modeling import TopicModeling
+
+TRAIN = pd.DataFrame({'review_text': [
+    "app crashes at login every time",
+    "login error app crashes again",
+    "money transfer slow and failed",
+    "transfer money to telebirr is slow",
+    "great app easy interface",
+    "easy friendly interface great design",
+]})
+
+
+def _fitted():
+    model = TopicModeling(num_topics=2)
+    model.fit_lda(TRAIN)
+    return model
+
+
+def test_new_reviews_are_scored_through_the_model_dictionary():
+    model = _fitted()
+    shared = model.corpus
+
+    new = pd.DataFrame({'review_text': ["zebra unicorn rainbow", "login crashes", "slow transfer"]})
+    model.assign_review_topics(new)
+
+    expected = [
+        max(model.lda_model.get_document_topics(model.dictionary.doc2bow(text.split())), key=lambda x: x[1])[0]
+        for text in new['review_text']
+    ]
+    assert new['topic_id'].tolist() == expected
+    # Unknown words map to nothing instead of to unrelated training tokens
+    assert model._corpus_for(new).bows(token2id=model.dictionary.token2id)[0] == []
+    # The shared corpus (used by extract_keywords) still belongs to the training reviews
+    assert model.corpus is shared
+
+
+def test_same_length_dataframe_does_not_reuse_the_corpus():
+    model = _fitted()
+    other = pd.DataFrame({'review_text': ["customer support never helped"] * len(TRAIN)})
+
+    model.assign_themes(other)
+    assert set(other['theme']) == {"Customer Support"}
+
+    model.assign_themes(TRAIN)
+    assert "Customer Support" not in set(TRAIN['theme'])
+
+
+def test_constructor_writes_no_theme_registry(tmp_path, monkeypatch):
+    registry_path = tmp_path / "theme_registry.json"
+    monkeypatch.setitem(DATA_PATHS, 'theme_registry', str(registry_path))
+    model = TopicModeling()
+    assert not registry_path.exists()
+    assert model.theme_registry.themes == list(model.theme_keywords)
+    assert registry_path.exists()
+
+
+def test_preprocess_keeps_token_columns_and_themes_match_map_to_theme():
+    model = TopicModeling()
+    df = model.preprocess(pd.concat([TRAIN, pd.DataFrame({'review_text': [None, "The blog is NICE"]})],
+                                    ignore_index=True))
+
+    assert df.loc[0, 'clean_text'] == "app crashes at login every time"
+    assert df.loc[0, 'tokens'] == ["app", "crashes", "at", "login", "every", "time"]
+    assert df.loc[0, 'tokens_nostop'] == ["app", "crashes", "login", "every", "time"]
+    assert df.loc[6, 'tokens_nostop'] == []
+
+    expected = df['tokens_nostop'].apply(model.map_to_theme).tolist()
+    assert model.assign_themes(df)['theme'].tolist() == expected
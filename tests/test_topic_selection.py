@@ -0,0 +1,61 @@
+import pytest
+
+from config import TOPIC_SELECTION_CONFIG
+
+from Scripts import topic_selection
+from Scripts.token_corpus import TokenCorpus
+
+TEXTS = [
+    "app crashes at login every time",
+    "login error app crashes again",
+    "money transfer slow and failed",
+    "transfer money to telebirr is slow",
+    "great app easy interface",
+    "easy friendly interface great design",
+    "otp code never arrives at login",
+    "customer support never answers calls",
+] * 4
+
+
+@pytest.fixture
+def corpus(monkeypatch):
+    monkeypatch.setitem(TOPIC_SELECTION_CONFIG, 'warmup_passes', 1)
+    monkeypatch.setitem(TOPIC_SELECTION_CONFIG, 'early_stop_margin', 0.0)
+    return TokenCorpus.build(TEXTS)
+
+
+def select(corpus, tmp_path, workers):
+    ranking, _, _ = topic_selection.select_num_topics(
+        corpus, range(2, 6), workers=workers, coherence="u_mass", passes=3,
+        output_dir=str(tmp_path / f"lda{workers}")
+    )
+    return ranking.drop(columns=['fit_seconds'])
+
+
+def test_early_stopping_compares_against_every_warm_up(corpus, tmp_path, monkeypatch):
+    warmups = []
+    survivors = topic_selection._survivors
+
+    def spy(results, margin):
+        warmups.extend(results)
+        return survivors(results, margin)
+
+    monkeypatch.setattr(topic_selection, "_survivors", spy)
+    ranking = select(corpus, tmp_path, workers=2)
+
+    # Pruning happens once, after all four warm-ups, against the best of them
+    assert sorted(result['num_topics'] for result in warmups) == [2, 3, 4, 5]
+    best_warmup = max(warmups, key=lambda result: result['coherence'])
+    complete = ranking[ranking['status'] == "complete"]
+    assert complete['num_topics'].tolist() == [best_warmup['num_topics']]
+    assert complete['passes'].tolist() == [3]
+    stopped = ranking[ranking['status'] == "stopped"]
+    assert (stopped['passes'] == 1).all()
+    assert (stopped['coherence'] < best_warmup['coherence']).all()
+
+
+def test_selection_does_not_depend_on_the_number_of_workers(corpus, tmp_path):
+    sequential = select(corpus, tmp_path, workers=1)
+    parallel = select(corpus, tmp_path, workers=4)
+    assert sequential.equals(parallel)
+    assert sequential['status'].iloc[0] == "complete"
@@ -0,0 +1,160 @@
+import threading
+import time
+
+import pytest
+
+from config import WORK_QUEUE_CONFIG
+from Scripts import work_queue
+from Scripts.work_queue import WorkQueue, run_worker
+
+
+@pytest.fixture
+def queue_path(tmp_path):
+    return str(tmp_path / "queue.db")
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setitem(WORK_QUEUE_CONFIG, 'retry_backoff_seconds', 0)
+
+
+def make_queue(path, **kwargs):
+    return WorkQueue('sqlite', path, **kwargs)
+
+
+def test_enqueue_is_idempotent(queue_path):
+    queue = make_queue(queue_path)
+    assert queue.enqueue('score', 'score:1-10', {'review_ids': [1]})
+    assert not queue.enqueue('score', 'score:1-10', {'review_ids': [1]})
+    assert queue.status_counts() == {('score', 'pending'): 1}
+
+
+def test_claim_is_exclusive_until_completed(queue_path):
+    queue = make_queue(queue_path)
+    queue.enqueue('score', 'a', {'n': 1})
+
+    task = queue.claim('w1', ['score'])
+    assert task.payload == {'n': 1} and task.attempts == 1
+    assert make_queue(queue_path).claim('w2', ['score']) is None
+    assert queue.complete(task, 'w1', {'rows': 1})
+    assert queue.claim('w1', ['score']) is None
+    assert queue.status_counts() == {('score', 'done'): 1}
+
+
+def test_expired_lease_is_reclaimed_and_completed_once(queue_path):
+    queue = make_queue(queue_path, lease_seconds=0.05)
+    queue.enqueue('score', 'a', {})
+
+    first = queue.claim('w1', ['score'])
+    time.sleep(0.1)
+    second = make_queue(queue_path, lease_seconds=0.05).claim('w2', ['score'])
+    assert second is not None and second.attempts == 2
+
+    # The original worker lost the lease: its completion is rejected
+    assert not queue.complete(first, 'w1')
+    assert queue.complete(second, 'w2')
+
+
+def test_failures_retry_until_max_attempts(queue_path):
+    queue = make_queue(queue_path, max_attempts=2)
+    queue.enqueue('score', 'a', {})
+
+    task = queue.claim('w1', ['score'])
+    queue.fail(task, 'w1', RuntimeError("boom"))
+    assert queue.status_counts() == {('score', 'pending'): 1}
+
+    task = queue.claim('w1', ['score'])
+    assert task.attempts == 2
+    queue.fail(task, 'w1', RuntimeError("boom"))
+    assert queue.status_counts() == {('score', 'dead'): 1}
+    assert queue.claim('w1', ['score']) is None
+
+
+def test_worker_records_handler_errors(queue_path):
+    queue = make_queue(queue_path, max_attempts=1)
+    queue.enqueue('scrape', 'a', {})
+
+    def failing(payload):
+        raise RuntimeError("store unavailable")
+
+    assert run_worker(queue, ['scrape'], 'w1', exit_when_empty=True, handlers={'scrape': failing}) == 0
+    assert queue.status_counts() == {('scrape', 'dead'): 1}
+
+
+def test_heartbeat_keeps_long_tasks_leased(queue_path):
+    queue = make_queue(queue_path, lease_seconds=0.2)
+    queue.enqueue('scrape', 'a', {})
+    started = threading.Event()
+    stolen = []
+
+    def slow(payload):
+        started.set()
+        time.sleep(0.6)  # three lease lengths
+        return {'ok': True}
+
+    def try_steal():
+        started.wait()
+        time.sleep(0.4)
+        stolen.append(make_queue(queue_path, lease_seconds=0.2).claim('w2', ['scrape']))
+
+    thief = threading.Thread(target=try_steal)
+    thief.start()
+    assert run_worker(queue, ['scrape'], 'w1', exit_when_empty=True, handlers={'scrape': slow}) == 1
+    thief.join()
+    assert stolen == [None]
+
+
+def test_scrape_task_failure_propagates(monkeypatch, tmp_path):
+    from Scripts import scraper
+
+    def broken_pages(self, app_id):
+        raise ConnectionError("reset by peer")
+        yield
+
+    monkeypatch.setattr(scraper.PlayStoreScraper, "iter_review_pages", broken_pages)
+    monkeypatch.setitem(scraper.SCRAPING_CONFIG, 'archive_pages', False)
+    monkeypatch.setitem(scraper.SKETCH_CONFIG, 'enabled', False)
+
+    with pytest.raises(ConnectionError):
+        work_queue.scrape_app_task({'app_id': 'x', 'bank_code': 'CBE', 'output_dir': str(tmp_path)})
+    assert not list(tmp_path.iterdir())
+
+
+class FakeReviewsConnection:
+    def __init__(self):
+        self.queries = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+
+    def fetchall(self):
+        return [(1, "app keeps crashing"), (2, "great app")]
+
+    def commit(self):
+        raise AssertionError("nothing may be written when scoring fails")
+
+    def close(self):
+        pass
+
+
+class DownAnalyzer:
+    def analyze_batch(self, texts):
+        return [("ERROR", 0.0)] * len(texts)
+
+
+def test_score_task_fails_instead_of_storing_errors(monkeypatch, queue_path):
+    from config import db_config
+
+    conn = FakeReviewsConnection()
+    monkeypatch.setattr(db_config, "get_connection", lambda: conn)
+    monkeypatch.setattr(work_queue, "_ANALYZER", DownAnalyzer())
+
+    queue = make_queue(queue_path, max_attempts=2)
+    queue.enqueue('score', 'score:1-2', {'review_ids': [1, 2]})
+    assert run_worker(queue, ['score'], 'w1', exit_when_empty=True) == 0
+
+    assert not any("UPDATE" in query for query in conn.queries)
+    assert queue.status_counts() == {('score', 'dead'): 1}